@@ -0,0 +1,376 @@
+# finnews_sentiment/analysis/backtest.py
+import hashlib
+import itertools
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .sentiment_report import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "backtest_cache"
+OUT_PATH = DATA_DIR / "backtest_sweep.csv"
+TRADING_DAYS = 252
+
+# One backtest = one point of this grid; sweep() takes lists for any of them
+DEFAULTS = {
+    "threshold": 0.05,     # long if signal > threshold, short if < -threshold
+    "holding": 5,          # trading days each day's portfolio is held (overlapping cohorts)
+    "halflife": 0.0,       # decay of the signal in trading days (0 = that day's articles only)
+    "min_articles": 1.0,   # decayed article count a name needs to be traded
+    "cap": 0.1,            # max weight per name (fraction of capital)
+    "weighting": "equal",  # "equal" or "signal" (proportional to |signal|) within each leg
+    "cost_bps": 10.0,      # cost per unit of turnover, in basis points
+}
+
+# Filled by _init_worker: mmap'd matrices plus decayed signals per halflife
+_CACHE: dict = {}
+
+
+# --- inputs -------------------------------------------------------------------
+
+def _calendar_index(dates: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    Row of the trading day on which news from calendar day `days` can first
+    be traded: the first trading date strictly after it (positions are set
+    at that day's close). len(dates) if there is none.
+    """
+    return np.searchsorted(dates, days.astype("datetime64[D]"), side="right")
+
+
+def price_matrix(store=None, column: str = "adj_close"):
+    """
+    (dates datetime64[D], tickers, prices T×N) from the price store, with NaN
+    where a ticker has no bar. `column` falls back to close where it is NaN.
+    """
+    from .. import price_store
+
+    store = store or price_store.open_store()
+    counts = [end - start for start, end in map(store.span, store.tickers)]
+    days = np.asarray(store.column("date")).view("datetime64[ns]").astype("datetime64[D]")
+    px = np.asarray(store.column(column), dtype=np.float64)
+    if column != "close":
+        px = np.where(np.isnan(px), np.asarray(store.column("close")), px)
+
+    dates = np.unique(days)
+    rows = np.searchsorted(dates, days)
+    cols = np.repeat(np.arange(len(store.tickers)), counts)
+    prices = np.full((len(dates), len(store.tickers)), np.nan)
+    prices[rows, cols] = px
+    return dates, list(store.tickers), prices
+
+
+def signal_counts(events: pd.DataFrame, dates: np.ndarray, tickers: list[str]):
+    """
+    Article count and sentiment sum per (trading day, ticker) from rows of
+    (ticker, day, n, sum), each moved to its first tradable day.
+    """
+    col = pd.Index(tickers).get_indexer(events["ticker"])
+    row = _calendar_index(dates, events["day"].to_numpy(dtype="datetime64[ns]"))
+    ok = (col >= 0) & (row < len(dates))
+    n = np.zeros((len(dates), len(tickers)))
+    s = np.zeros((len(dates), len(tickers)))
+    np.add.at(n, (row[ok], col[ok]), events["n"].to_numpy(dtype=np.float64)[ok])
+    np.add.at(s, (row[ok], col[ok]), events["sum"].to_numpy(dtype=np.float64)[ok])
+    return n, s
+
+
+def load_events(source: str = "daily") -> pd.DataFrame:
+    """
+    Sentiment events (ticker, day, n, sum): per-cell aggregates from
+    ticker_daily_sentiment ("daily") or one row per (article, ticker) of
+    the model dataset ("model").
+    """
+    if source == "daily":
+        from sqlalchemy import text
+        from ..db import get_engine
+        with get_engine().connect() as conn:
+            df = pd.read_sql(text("SELECT ticker, day, n_articles AS n, sum_sentiment AS sum "
+                                  "FROM ticker_daily_sentiment"), conn, parse_dates=["day"])
+        return df
+    if source == "model":
+        from .sentiment_report import load_or_join
+        df = load_or_join().dropna(subset=["ticker", "published_at", "sentiment"])
+        return pd.DataFrame({"ticker": df["ticker"],
+                             "day": pd.to_datetime(df["published_at"]).dt.normalize(),
+                             "n": 1.0, "sum": df["sentiment"].astype(float)})
+    raise ValueError(f"Unknown source {source!r}, expected 'daily' or 'model'")
+
+
+def build_inputs(source: str = "daily", events: pd.DataFrame | None = None, store=None) -> dict:
+    """Date × ticker matrices for the backtest: returns, tradable mask, article counts, sentiment sums."""
+    dates, tickers, prices = price_matrix(store)
+    events = load_events(source) if events is None else events
+    n, s = signal_counts(events, dates, tickers)
+    # ret[t] = return from close t-1 to close t; 0 where either close is missing
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = prices / np.vstack([np.full((1, len(tickers)), np.nan), prices[:-1]]) - 1.0
+    ret = np.where(np.isfinite(ret), ret, 0.0)
+    return {"dates": dates, "tickers": tickers, "ret": ret, "tradable": ~np.isnan(prices), "n": n, "s": s}
+
+
+def save_inputs(inputs: dict, cache_dir: Path = CACHE_DIR) -> Path:
+    """Write the matrices as .npy under a content-hashed directory (workers mmap them)."""
+    h = hashlib.sha256()
+    for k in ("ret", "tradable", "n", "s"):
+        h.update(np.ascontiguousarray(inputs[k]).tobytes())
+    h.update(json.dumps(inputs["tickers"]).encode())
+    path = Path(cache_dir) / h.hexdigest()[:16]
+    if (path / "meta.json").exists():
+        return path
+    # Per-process temp dir: concurrent sweeps may write the same inputs at once
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    for k in ("dates", "ret", "tradable", "n", "s"):
+        np.save(tmp / f"{k}.npy", np.ascontiguousarray(inputs[k]))
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"tickers": inputs["tickers"]}, f)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another sweep finished the same inputs first; its content is identical
+        if not (path / "meta.json").exists():
+            raise
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def load_inputs(path: Path) -> dict:
+    path = Path(path)
+    with open(path / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    out = {k: np.load(path / f"{k}.npy", mmap_mode="r") for k in ("dates", "ret", "tradable", "n", "s")}
+    out["tickers"] = meta["tickers"]
+    return out
+
+
+# --- engine -------------------------------------------------------------------
+
+def decayed_signal(n: np.ndarray, s: np.ndarray, halflife: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (signal, count): article-weighted mean sentiment with exponential decay
+    of `halflife` trading days, and the decayed article count. Runs one
+    vector update per day over all tickers.
+    """
+    if not halflife:
+        n = np.asarray(n, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, s / n, np.nan), n
+    a = 0.5 ** (1.0 / halflife)
+    dn = np.empty(n.shape)
+    ds = np.empty(n.shape)
+    acc_n = np.zeros(n.shape[1])
+    acc_s = np.zeros(n.shape[1])
+    for t in range(n.shape[0]):
+        acc_n = a * acc_n + n[t]
+        acc_s = a * acc_s + s[t]
+        dn[t], ds[t] = acc_n, acc_s
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(dn > 1e-12, ds / dn, np.nan), dn
+
+
+def target_weights(signal: np.ndarray, count: np.ndarray, tradable: np.ndarray, threshold: float,
+                   min_articles: float = 1.0, cap: float | None = None, weighting: str = "equal") -> np.ndarray:
+    """
+    Daily target portfolio (T×N): 0.5 of capital long the names with
+    signal > threshold, 0.5 short those below -threshold, equal- or
+    |signal|-weighted within each leg and clipped at `cap` per name
+    (the clipped remainder stays in cash). A day with one empty leg
+    holds only the other.
+    """
+    eligible = tradable & (count >= min_articles)
+    with np.errstate(invalid="ignore"):
+        long = eligible & (signal > threshold)
+        short = eligible & (signal < -threshold)
+    if weighting == "equal":
+        raw_l, raw_s = long.astype(np.float64), short.astype(np.float64)
+    elif weighting == "signal":
+        mag = np.nan_to_num(np.abs(signal))
+        raw_l, raw_s = np.where(long, mag, 0.0), np.where(short, mag, 0.0)
+    else:
+        raise ValueError(f"Unknown weighting {weighting!r}, expected 'equal' or 'signal'")
+
+    # Row-wise scale factors instead of full-size divisions
+    tot_l = raw_l.sum(axis=1)
+    tot_s = raw_s.sum(axis=1)
+    w = raw_l * (0.5 / np.where(tot_l > 0, tot_l, 1.0))[:, None]
+    w -= raw_s * (0.5 / np.where(tot_s > 0, tot_s, 1.0))[:, None]
+    if cap and cap < 0.5:
+        np.clip(w, -cap, cap, out=w)
+    return w
+
+
+def hold(weights: np.ndarray, holding: int, cumulative: np.ndarray | None = None) -> np.ndarray:
+    """
+    Positions when each day's target is held for `holding` days:
+    the average of the last `holding` targets (overlapping cohorts).
+    `cumulative` (np.cumsum(weights, axis=0)) can be passed in when several
+    holding periods are run on the same weights.
+    """
+    if holding <= 1:
+        return weights
+    cum = np.cumsum(weights, axis=0) if cumulative is None else cumulative
+    pos = np.empty_like(cum)
+    pos[:holding] = cum[:holding]
+    np.subtract(cum[holding:], cum[:-holding], out=pos[holding:])
+    pos /= holding
+    return pos
+
+
+def simulate(weights: np.ndarray, ret: np.ndarray, holding: int, cumulative: np.ndarray | None = None) -> dict:
+    """
+    Daily gross P&L and turnover of `weights` held for `holding` days.
+    Positions set at the close of day t earn ret[t + 1]; turnover is the
+    sum of absolute position changes (drift between rebalances ignored).
+    """
+    pos = hold(weights, holding, cumulative)[:-1]
+    gross = np.einsum("ij,ij->i", pos, ret[1:])
+    change = np.empty_like(pos)
+    change[0] = pos[0]
+    np.subtract(pos[1:], pos[:-1], out=change[1:])
+    turnover = np.abs(change, out=change).sum(axis=1)
+    return {"gross": gross, "turnover": turnover,
+            "n_long": np.count_nonzero(pos > 1e-12, axis=1), "n_short": np.count_nonzero(pos < -1e-12, axis=1),
+            "exposure": np.abs(pos).sum(axis=1)}
+
+
+def metrics(net: np.ndarray, turnover: np.ndarray, sim: dict) -> dict:
+    """Annualized return/vol/Sharpe, drawdown, turnover and breadth of a daily net return series."""
+    active = sim["exposure"] > 0
+    mean, std = float(net.mean()) if len(net) else 0.0, float(net.std(ddof=1)) if len(net) > 1 else 0.0
+    equity = np.cumprod(1.0 + net)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    return {
+        "days": int(len(net)),
+        "active_days": int(active.sum()),
+        "total_return": float(equity[-1] - 1.0) if len(equity) else 0.0,
+        "ann_return": mean * TRADING_DAYS,
+        "ann_vol": std * np.sqrt(TRADING_DAYS),
+        "sharpe": mean / std * np.sqrt(TRADING_DAYS) if std > 0 else np.nan,
+        "max_drawdown": float((equity / peak - 1.0).min()) if len(equity) else 0.0,
+        "hit_rate": float((net[active] > 0).mean()) if active.any() else np.nan,
+        "turnover": float(turnover.mean()) if len(turnover) else 0.0,
+        "avg_long": float(sim["n_long"][active].mean()) if active.any() else 0.0,
+        "avg_short": float(sim["n_short"][active].mean()) if active.any() else 0.0,
+        "exposure": float(sim["exposure"][active].mean()) if active.any() else 0.0,
+    }
+
+
+def backtest(inputs: dict, daily: bool = False, **config):
+    """
+    Run one configuration (see DEFAULTS) on `inputs` from build_inputs().
+    Returns the metrics dict, plus a daily frame (gross, cost, net,
+    turnover, positions) with daily=True.
+    """
+    cfg = {**DEFAULTS, **config}
+    signal, count = decayed_signal(inputs["n"], inputs["s"], cfg["halflife"])
+    w = target_weights(signal, count, np.asarray(inputs["tradable"]), cfg["threshold"], cfg["min_articles"],
+                       cfg["cap"], cfg["weighting"])
+    sim = simulate(w, np.asarray(inputs["ret"]), int(cfg["holding"]))
+    cost = sim["turnover"] * cfg["cost_bps"] / 1e4
+    net = sim["gross"] - cost
+    result = {**cfg, **metrics(net, sim["turnover"], sim)}
+    if not daily:
+        return result
+    frame = pd.DataFrame({"gross": sim["gross"], "cost": cost, "net": net, "turnover": sim["turnover"],
+                          "n_long": sim["n_long"], "n_short": sim["n_short"], "exposure": sim["exposure"]},
+                         index=pd.DatetimeIndex(np.asarray(inputs["dates"])[1:], name="date"))
+    return result, frame
+
+
+# --- parameter sweep ----------------------------------------------------------
+
+def _init_worker(cache_path: str):
+    _CACHE.clear()
+    _CACHE.update(load_inputs(cache_path))
+    _CACHE["signals"] = {}
+
+
+def _run_group(task: dict) -> list[dict]:
+    """
+    One target portfolio evaluated at every holding period and cost level:
+    the weights (and their cumulative sum) are computed once per group, the
+    P&L once per holding period, and each cost level is one subtraction.
+    """
+    cfg = task["config"]
+    signals = _CACHE["signals"]
+    if cfg["halflife"] not in signals:
+        signals[cfg["halflife"]] = decayed_signal(_CACHE["n"], _CACHE["s"], cfg["halflife"])
+    signal, count = signals[cfg["halflife"]]
+    w = target_weights(signal, count, _CACHE["tradable"], cfg["threshold"], cfg["min_articles"],
+                       cfg["cap"], cfg["weighting"])
+    cumulative = np.cumsum(w, axis=0) if max(task["holding"]) > 1 else None
+    rows = []
+    for holding in task["holding"]:
+        sim = simulate(w, _CACHE["ret"], int(holding), cumulative)
+        for bps in task["cost_bps"]:
+            net = sim["gross"] - sim["turnover"] * bps / 1e4
+            rows.append({**cfg, "holding": holding, "cost_bps": bps, **metrics(net, sim["turnover"], sim)})
+    return rows
+
+
+def _grid(grid: dict) -> tuple[list[dict], list[int], list[float]]:
+    """Target-portfolio configs (cartesian product, halflife-major), holding periods and cost levels."""
+    grid = {k: v if isinstance(v, (list, tuple)) else [v] for k, v in {**DEFAULTS, **grid}.items()}
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown backtest parameter(s) {sorted(unknown)}; known: {sorted(DEFAULTS)}")
+    costs = [float(c) for c in grid.pop("cost_bps")]
+    holdings = [int(h) for h in grid.pop("holding")]
+    keys = ["halflife", *[k for k in grid if k != "halflife"]]
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    return configs, holdings, costs
+
+
+def sweep(grid: dict, inputs: dict | None = None, source: str = "daily", workers: int | None = None) -> pd.DataFrame:
+    """
+    Backtest every combination of the lists in `grid` (missing keys use
+    DEFAULTS), e.g. {"threshold": [0.05, 0.1], "holding": [1, 5, 20]}.
+
+    The matrices are cached as .npy files that worker processes memory-map;
+    tasks are sent halflife-major so each worker decays the signal once per
+    halflife, holding periods share one set of target weights and cost
+    levels share one simulation. Runs on `workers`
+    processes (default: all cores; 1 runs inline). Returns one row per
+    configuration, best Sharpe first.
+    """
+    inputs = build_inputs(source) if inputs is None else inputs
+    cache_path = save_inputs(inputs)
+    configs, holdings, costs = _grid(grid)
+    tasks = [{"config": c, "holding": holdings, "cost_bps": costs} for c in configs]
+
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(str(cache_path))
+        groups = [_run_group(t) for t in tasks]
+    else:
+        workers = workers or os.cpu_count()
+        chunk = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(cache_path),)) as ex:
+            groups = list(ex.map(_run_group, tasks, chunksize=chunk))
+
+    results = pd.DataFrame([row for g in groups for row in g])
+    return results.sort_values("sharpe", ascending=False, na_position="last").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Long/short backtest sweep on the sentiment signal")
+    parser.add_argument("--source", choices=("daily", "model"), default="daily")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.0, 0.05, 0.1, 0.2])
+    parser.add_argument("--holding", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--halflife", type=float, nargs="+", default=[0.0, 3.0, 10.0])
+    parser.add_argument("--cost-bps", type=float, nargs="+", default=[0.0, 10.0])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    res = sweep({"threshold": args.threshold, "holding": args.holding, "halflife": args.halflife,
+                 "cost_bps": args.cost_bps}, source=args.source, workers=args.workers)
+    res.to_csv(OUT_PATH, index=False)
+    print(res.head(20).to_string(index=False))
+    print(f"Saved {len(res)} configurations to {OUT_PATH}")
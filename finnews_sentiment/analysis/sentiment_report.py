@@ -0,0 +1,362 @@
+# finnews_sentiment/analysis/sentiment_report.py
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path("data")
+FIG_DIR = Path("figures")
+RET_PATH = DATA_DIR / "dataset.parquet"
+SENT_PATH = DATA_DIR / "dataset_with_sentiment.parquet"
+MODEL_PATH = DATA_DIR / "model_dataset.parquet"
+
+RET_COLS = ["ret_1d", "ret_2d", "ret_5d"]
+LABELS = ["Negative", "Neutral", "Positive"]
+MANIFEST_NAME = ".report_manifest.json"
+
+# Anything here changes the look of a figure, so it is part of the cache key
+PLOT_PARAMS = {"figsize": (7, 5), "dpi": 150, "n_boot": 1000, "ci": 0.95, "seed": 0}
+
+
+def load_or_join() -> pd.DataFrame:
+    """Load model_dataset if available, otherwise join returns + sentiment by article_id."""
+    if MODEL_PATH.exists():
+        print(f"Loading {MODEL_PATH}")
+        return pd.read_parquet(MODEL_PATH)
+
+    if not RET_PATH.exists():
+        raise FileNotFoundError(f"Missing returns file: {RET_PATH}")
+    if not SENT_PATH.exists():
+        raise FileNotFoundError(f"Missing sentiment file: {SENT_PATH}")
+
+    print(f"Joining {RET_PATH.name} + {SENT_PATH.name}")
+    returns = pd.read_parquet(RET_PATH)
+    sent = pd.read_parquet(SENT_PATH)
+
+    if "article_id" not in returns.columns or "article_id" not in sent.columns:
+        raise ValueError("Both datasets must contain 'article_id' column.")
+
+    df = returns.merge(sent[["article_id", "sentiment"]], on="article_id", how="inner")
+    df = df.dropna(subset=["sentiment"]).copy()
+
+    df.to_parquet(MODEL_PATH, index=False)
+    print(f"Saved merged dataset -> {MODEL_PATH} ({len(df)} rows)")
+    return df
+
+
+def add_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Add `sentiment_label` (Negative/Neutral/Positive) once, vectorized."""
+    s = df["sentiment"].to_numpy(dtype=float)
+    df["sentiment_label"] = pd.Categorical(
+        np.select([s > 0, s < 0], ["Positive", "Negative"], default="Neutral"),
+        categories=LABELS,
+    )
+    return df
+
+
+def basic_report(df: pd.DataFrame):
+    print("\n===== BASIC REPORT =====")
+    cols_ret = [c for c in RET_COLS if c in df.columns]
+    print(f"Rows: {len(df)} | Tickers: {df['ticker'].nunique() if 'ticker' in df else 'n/a'}")
+    print(f"Date range: {df['published_at'].min()} → {df['published_at'].max()}" if "published_at" in df else "Date col missing")
+
+    for c in cols_ret:
+        sub = df[["sentiment", c]].dropna()
+        if len(sub) > 2:
+            corr = sub.corr().iloc[0, 1]
+            print(f"Correlation(sentiment, {c}): {corr:.3f}  (n={len(sub)})")
+        else:
+            print(f"Correlation(sentiment, {c}): n<3")
+
+    if "sentiment_label" not in df.columns:
+        add_labels(df)
+    counts = df["sentiment_label"].value_counts()
+    print("\nCounts by sentiment label:")
+    print(counts.to_string())
+
+
+def _bootstrap_means(values: np.ndarray, codes: np.ndarray, n_groups: int,
+                     n_boot: int, rng: np.random.Generator,
+                     max_cells: int = 5_000_000) -> np.ndarray:
+    """
+    Bootstrap the mean of every group at once.
+
+    Values are sorted by group code; each resample draws, for every row,
+    a random row from the same group and sums the draws per group with
+    np.add.reduceat. Resamples are processed in batches so the index
+    matrix stays under `max_cells` entries.
+    Returns an (n_boot, n_groups) array of resampled means (NaN for empty groups).
+    """
+    order = np.argsort(codes, kind="stable")
+    v = values[order]
+    c = codes[order]
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    nonempty = counts > 0
+
+    out = np.full((n_boot, n_groups), np.nan)
+    if len(v) == 0:
+        return out
+
+    row_start = starts[c]
+    row_count = counts[c]
+    batch = max(1, max_cells // len(v))
+    for b0 in range(0, n_boot, batch):
+        b = min(batch, n_boot - b0)
+        idx = row_start + (rng.random((b, len(v))) * row_count).astype(np.int64)
+        sums = np.add.reduceat(v[idx], starts[nonempty], axis=1)
+        out[b0:b0 + b, nonempty] = sums / counts[nonempty]
+    return out
+
+
+def group_stats(df: pd.DataFrame, ret_cols=None, by=("sentiment_label",),
+                n_boot: int = PLOT_PARAMS["n_boot"], ci: float = PLOT_PARAMS["ci"],
+                seed: int = PLOT_PARAMS["seed"]) -> pd.DataFrame:
+    """
+    Tidy per-group statistics for each return column:
+    n, mean, std, normal-approx 95% half-width and bootstrap CI bounds.
+    `by` is a tuple of grouping columns, e.g. ("ticker", "sentiment_label").
+    """
+    if "sentiment_label" not in df.columns:
+        add_labels(df)
+    ret_cols = [c for c in (ret_cols or RET_COLS) if c in df.columns]
+    by = list(by)
+    rng = np.random.default_rng(seed)
+    alpha = (1 - ci) / 2
+
+    out = []
+    for ret_col in ret_cols:
+        sub = df[by + [ret_col]].dropna(subset=[ret_col])
+        if sub.empty:
+            continue
+        codes, keys = pd.MultiIndex.from_frame(sub[by].astype(str)).factorize()
+        values = sub[ret_col].to_numpy(dtype=float)
+        n_groups = len(keys)
+
+        counts = np.bincount(codes, minlength=n_groups)
+        sums = np.bincount(codes, weights=values, minlength=n_groups)
+        sq = np.bincount(codes, weights=values ** 2, minlength=n_groups)
+        means = sums / counts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.where(counts > 1, (sq - counts * means ** 2) / (counts - 1), np.nan)
+        std = np.sqrt(np.clip(var, 0, None))
+
+        boot = _bootstrap_means(values, codes, n_groups, n_boot, rng)
+        lo, hi = np.nanquantile(boot, [alpha, 1 - alpha], axis=0)
+        small = counts < 2
+
+        stats = keys.to_frame(index=False)
+        stats.columns = by
+        stats["ret_col"] = ret_col
+        stats["n"] = counts
+        stats["mean"] = means
+        stats["std"] = std
+        stats["err_95"] = np.where(small, np.nan, 1.96 * std / np.sqrt(counts))
+        stats["ci_low"] = np.where(small, np.nan, lo)
+        stats["ci_high"] = np.where(small, np.nan, hi)
+        out.append(stats)
+
+    if not out:
+        return pd.DataFrame(columns=by + ["ret_col", "n", "mean", "std", "err_95", "ci_low", "ci_high"])
+    return pd.concat(out, ignore_index=True)
+
+
+# ----------------------------------------------------------------------------
+# Rendering (runs in worker processes with the Agg backend)
+# ----------------------------------------------------------------------------
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render(spec: dict) -> str:
+    """Draw one figure described by `spec` and save it to spec['path']."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    params = spec["params"]
+    ret_col = spec["ret_col"]
+    prefix = f"{spec['ticker']}: " if spec.get("ticker") else ""
+    fig = plt.figure(figsize=params["figsize"])
+
+    if spec["kind"] == "scatter":
+        x, y = spec["x"], spec["y"]
+        plt.scatter(x, y, alpha=0.6)
+        try:
+            m, b = np.polyfit(x, y, 1)
+            xs = np.linspace(x.min(), x.max(), 100)
+            plt.plot(xs, m * xs + b)
+        except Exception:
+            pass
+        plt.axhline(0, linewidth=0.8)
+        plt.axvline(0, linewidth=0.8)
+        plt.xlabel("Sentiment (compound)")
+        plt.ylabel(f"{ret_col}")
+        plt.title(f"{prefix}Sentiment vs. {ret_col}")
+
+    elif spec["kind"] == "box":
+        plt.boxplot(spec["groups"], showfliers=False)
+        plt.xticks(np.arange(1, len(LABELS) + 1), LABELS)
+        plt.axhline(0, linewidth=0.8)
+        plt.ylabel(ret_col)
+        plt.title(f"{prefix}{ret_col} distribution by sentiment label")
+
+    elif spec["kind"] == "means":
+        means, lo, hi, ns = spec["means"], spec["ci_low"], spec["ci_high"], spec["ns"]
+        yerr = np.vstack([means - lo, hi - means])
+        x = np.arange(len(LABELS))
+        plt.bar(x, means, yerr=yerr, capsize=4)
+        plt.axhline(0, linewidth=0.8)
+        plt.xticks(x, LABELS)
+        plt.ylabel(f"Mean {ret_col}")
+        pct = int(round(params["ci"] * 100))
+        plt.title(f"{prefix}Mean {ret_col} by sentiment label (bootstrap {pct}% CI)\nN={dict(zip(LABELS, ns))}")
+
+    out = Path(spec["path"])
+    out.parent.mkdir(parents=True, exist_ok=True)
+    plt.tight_layout()
+    plt.savefig(out, dpi=params["dpi"])
+    plt.close(fig)
+    return str(out)
+
+
+def _data_hash(kind: str, ret_col: str, ticker, sentiment: np.ndarray,
+               ret: np.ndarray, params: dict, *drawn: np.ndarray) -> str:
+    """
+    Hash of a figure's inputs. `params` holds the bootstrap seed and count;
+    `drawn` are derived arrays the figure shows as well (the means figure's
+    CI bounds come from a bootstrap over every scope at once, so they can
+    change while this scope's x and y do not).
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([kind, ret_col, ticker, params], sort_keys=True, default=str).encode())
+    for arr in (sentiment, ret, *drawn):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _figure_specs(df: pd.DataFrame, stats: pd.DataFrame, fig_dir: Path,
+                  ret_cols, per_ticker: bool, params: dict) -> list[dict]:
+    """Build one spec per figure: (overall + optionally each ticker) × ret_col × kind."""
+    scopes = [(None, df, fig_dir)]
+    if per_ticker and "ticker" in df.columns:
+        for t, sub in df.groupby("ticker", sort=True, observed=True):
+            scopes.append((t, sub, fig_dir / "tickers" / str(t)))
+
+    stats_idx = stats.set_index(["ticker", "sentiment_label", "ret_col"]) if not stats.empty else stats
+    specs = []
+    for ticker, sub, out_dir in scopes:
+        for ret_col in ret_cols:
+            part = sub[["sentiment", "sentiment_label", ret_col]].dropna(subset=["sentiment", ret_col])
+            if part.empty:
+                continue
+            x = part["sentiment"].to_numpy(dtype=float)
+            y = part[ret_col].to_numpy(dtype=float)
+            labels = part["sentiment_label"].to_numpy()
+
+            base = {"ret_col": ret_col, "ticker": ticker, "params": params}
+            specs.append({**base, "kind": "scatter", "x": x, "y": y,
+                          "path": out_dir / f"scatter_sent_{ret_col}.png"})
+            specs.append({**base, "kind": "box",
+                          "groups": [y[labels == g] for g in LABELS],
+                          "path": out_dir / f"box_{ret_col}_by_label.png"})
+
+            key = "__all__" if ticker is None else str(ticker)
+            rows = [stats_idx.loc[(key, g, ret_col)] if (key, g, ret_col) in stats_idx.index else None
+                    for g in LABELS]
+            specs.append({**base, "kind": "means",
+                          "means": np.array([r["mean"] if r is not None else np.nan for r in rows]),
+                          "ci_low": np.array([r["ci_low"] if r is not None else np.nan for r in rows]),
+                          "ci_high": np.array([r["ci_high"] if r is not None else np.nan for r in rows]),
+                          "ns": [int(r["n"]) if r is not None else 0 for r in rows],
+                          "path": out_dir / f"means_{ret_col}_by_label.png"})
+
+            for s in specs[-3:]:
+                drawn = [s["means"], s["ci_low"], s["ci_high"], s["ns"]] if s["kind"] == "means" else []
+                s["hash"] = _data_hash(s["kind"], ret_col, ticker, x, y, params, *drawn)
+    return specs
+
+
+def _load_manifest(fig_dir: Path) -> dict:
+    path = fig_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(fig_dir: Path, manifest: dict) -> None:
+    path = fig_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def build_report(df: pd.DataFrame, fig_dir: Path = FIG_DIR, per_ticker: bool = False,
+                 workers: int | None = None, force: bool = False,
+                 params: dict | None = None) -> pd.DataFrame:
+    """
+    Compute grouped statistics once and render all figures.
+
+    Figures whose input data and plot parameters hash to the value recorded
+    in the manifest (and whose PNG still exists) are skipped. The remaining
+    figures are rendered in parallel across `workers` processes (default:
+    all cores; 1 renders inline). Returns the tidy statistics table, which
+    is also written to <fig_dir>/group_stats.csv.
+    """
+    fig_dir = Path(fig_dir)
+    fig_dir.mkdir(parents=True, exist_ok=True)
+    params = {**PLOT_PARAMS, **(params or {})}
+    ret_cols = [c for c in RET_COLS if c in df.columns]
+
+    if "sentiment_label" not in df.columns:
+        add_labels(df)
+
+    # Overall groups are stats for the pseudo-ticker "__all__"
+    frames = [df.assign(ticker="__all__")]
+    if per_ticker and "ticker" in df.columns:
+        frames.append(df)
+    stats = group_stats(pd.concat(frames, ignore_index=True), ret_cols,
+                        by=("ticker", "sentiment_label"),
+                        n_boot=params["n_boot"], ci=params["ci"], seed=params["seed"])
+    stats.to_csv(fig_dir / "group_stats.csv", index=False)
+
+    specs = _figure_specs(df, stats, fig_dir, ret_cols, per_ticker, params)
+    manifest = _load_manifest(fig_dir)
+    todo = [s for s in specs
+            if force or manifest.get(str(s["path"])) != s["hash"] or not Path(s["path"]).exists()]
+
+    if todo:
+        if workers == 1 or len(todo) == 1:
+            _init_worker()
+            done = [_render(s) for s in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+                done = list(ex.map(_render, todo, chunksize=max(1, len(todo) // (8 * (workers or os.cpu_count() or 1)))))
+        for s in todo:
+            manifest[str(s["path"])] = s["hash"]
+        _save_manifest(fig_dir, manifest)
+    else:
+        done = []
+
+    print(f"Rendered {len(done)} figure(s), {len(specs) - len(todo)} unchanged (skipped)")
+    return stats
+
+
+def main(per_ticker: bool = False, workers: int | None = None, force: bool = False):
+    df = load_or_join()
+    add_labels(df)
+    basic_report(df)
+    build_report(df, FIG_DIR, per_ticker=per_ticker, workers=workers, force=force)
+    print(f"\nAnalysis done. See {FIG_DIR}/ for PNGs.")
+
+
+if __name__ == "__main__":
+    main()
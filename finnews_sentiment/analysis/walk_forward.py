@@ -0,0 +1,230 @@
+# finnews_sentiment/analysis/walk_forward.py
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .sentiment_report import DATA_DIR, RET_COLS, load_or_join
+
+CACHE_DIR = DATA_DIR / "feature_cache"
+DEFAULT_FEATURES = ("sentiment",)
+
+# Filled once per worker process by _init_worker (memory-mapped, shared pages)
+_CACHE: dict = {}
+
+
+def _horizon_days(horizon: str) -> int:
+    """'ret_5d' -> 5"""
+    return int(re.search(r"(\d+)", horizon).group(1))
+
+
+def _cache_key(df: pd.DataFrame, features, horizons) -> str:
+    cols = ["published_at", *features, *horizons]
+    h = hashlib.sha256()
+    h.update(json.dumps([list(features), list(horizons)]).encode())
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def build_feature_cache(df: pd.DataFrame, features=DEFAULT_FEATURES,
+                        horizons=RET_COLS, cache_dir: Path = CACHE_DIR) -> Path:
+    """
+    Sort the model dataset by published_at and save the feature matrix,
+    timestamps and forward returns as .npy files under a content-hashed
+    directory. Folds and workers then memory-map these instead of
+    reloading and re-merging the parquets per experiment.
+    """
+    features = list(features)
+    horizons = [h for h in horizons if h in df.columns]
+    path = Path(cache_dir) / _cache_key(df, features, horizons)
+    if (path / "meta.json").exists():
+        return path
+
+    data = df.dropna(subset=["published_at", *features]).sort_values("published_at", kind="stable")
+    # Per-process temp dir: concurrent runs may build the same cache at once
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    np.save(tmp / "X.npy", data[features].to_numpy(dtype=np.float64))
+    np.save(tmp / "ts.npy", pd.to_datetime(data["published_at"]).to_numpy(dtype="datetime64[ns]").astype(np.int64))
+    for h in horizons:
+        np.save(tmp / f"{h}.npy", data[h].to_numpy(dtype=np.float64, na_value=np.nan))
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"features": features, "horizons": horizons, "rows": int(len(data))}, f)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another run finished the same cache first; its content is identical
+        if not (path / "meta.json").exists():
+            raise
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def _load_cache(path: Path) -> dict:
+    path = Path(path)
+    with open(path / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    cache = {"meta": meta,
+             "X": np.load(path / "X.npy", mmap_mode="r"),
+             "ts": np.load(path / "ts.npy", mmap_mode="r")}
+    for h in meta["horizons"]:
+        cache[h] = np.load(path / f"{h}.npy", mmap_mode="r")
+    return cache
+
+
+def walk_forward_splits(ts: np.ndarray, n_splits: int = 5, mode: str = "expanding",
+                        window_days: int | None = None, embargo_days: int = 0,
+                        initial_frac: float = 0.5) -> list[dict]:
+    """
+    Time-ordered train/test splits over sorted int64-ns timestamps.
+
+    The last (1 - initial_frac) of the time range is cut into `n_splits`
+    equal-length test periods. For each one, training uses rows published
+    before test_start - embargo_days: all of them ("expanding") or only the
+    last `window_days` ("rolling"). The embargo keeps rows whose forward
+    return is not yet known at test_start out of training.
+    Returns row-offset bounds; ts must be sorted so each set is a slice.
+    """
+    if mode not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown mode {mode!r}, expected 'expanding' or 'rolling'")
+    if mode == "rolling" and not window_days:
+        raise ValueError("mode='rolling' requires window_days")
+    if len(ts) == 0:
+        return []
+
+    day = np.int64(86_400 * 10**9)
+    t0, t1 = int(ts[0]), int(ts[-1]) + 1
+    edges = np.linspace(t0 + (t1 - t0) * initial_frac, t1, n_splits + 1).astype(np.int64)
+
+    splits = []
+    for k in range(n_splits):
+        test_start, test_end = edges[k], edges[k + 1]
+        train_end = test_start - embargo_days * day
+        train_start = train_end - window_days * day if mode == "rolling" else ts[0]
+        lo, hi, tlo, thi = np.searchsorted(ts, [train_start, train_end, test_start, test_end], side="left")
+        if hi <= lo or thi <= tlo:
+            continue
+        splits.append({"fold": k, "train": (int(lo), int(hi)), "test": (int(tlo), int(thi)),
+                       "train_start": int(ts[lo]), "train_end": int(ts[hi - 1]),
+                       "test_start": int(ts[tlo]), "test_end": int(ts[thi - 1])})
+    return splits
+
+
+def _init_worker(cache_path: str):
+    _CACHE.clear()
+    _CACHE.update(_load_cache(cache_path))
+
+
+def _run_fold(task: dict) -> dict:
+    """Fit one (horizon, params, fold) combination on the cached arrays."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    cache = _CACHE
+    features = cache["meta"]["features"]
+    cols = [features.index(f) for f in task["features"]]
+    ret = cache[task["horizon"]]
+
+    def take(bounds):
+        lo, hi = bounds
+        r = np.asarray(ret[lo:hi])
+        ok = ~np.isnan(r)
+        return np.asarray(cache["X"][lo:hi][:, cols])[ok], (r[ok] > 0).astype(int)
+
+    X_train, y_train = take(task["train"])
+    X_test, y_test = take(task["test"])
+
+    row = {"horizon": task["horizon"], "params": task["params_key"], "fold": task["fold"],
+           "train_start": task["train_start"], "train_end": task["train_end"],
+           "test_start": task["test_start"], "test_end": task["test_end"],
+           "n_train": len(y_train), "n_test": len(y_test),
+           "base_rate": float(y_test.mean()) if len(y_test) else np.nan,
+           "accuracy": np.nan, "auc": np.nan}
+    if len(np.unique(y_train)) < 2 or len(y_test) == 0:
+        return row
+
+    model = LogisticRegression(**task["model_params"])
+    model.fit(X_train, y_train)
+    row["accuracy"] = accuracy_score(y_test, model.predict(X_test))
+    if len(np.unique(y_test)) == 2:
+        row["auc"] = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+    return row
+
+
+def evaluate(df: pd.DataFrame | None = None, features=DEFAULT_FEATURES, horizons=RET_COLS,
+             param_grid: dict | None = None, n_splits: int = 5, mode: str = "expanding",
+             window_days: int | None = None, embargo_days: int | None = None,
+             initial_frac: float = 0.5, workers: int | None = None) -> pd.DataFrame:
+    """
+    Walk-forward evaluation of a logistic model predicting sign(ret_h).
+
+    `param_grid` is a sklearn-style grid; the special key "features" selects
+    feature subsets, every other key is passed to LogisticRegression.
+    Folds × horizons × grid points run in parallel across `workers`
+    processes (default: all cores; 1 runs inline). By default the embargo is
+    the horizon in calendar days plus 3 (a weekend) so training labels are
+    already realized at the start of each test period.
+    Returns one tidy row per (horizon, params, fold).
+    """
+    from sklearn.model_selection import ParameterGrid
+
+    if df is None:
+        df = load_or_join()
+    features = list(features)
+    # Cache every column any grid point may ask for
+    grid_features = [f for fs in (param_grid or {}).get("features", []) for f in fs]
+    all_features = list(dict.fromkeys(features + grid_features))
+    horizons = [h for h in horizons if h in df.columns]
+    cache_path = build_feature_cache(df, all_features, horizons)
+    ts = np.load(cache_path / "ts.npy", mmap_mode="r")
+
+    grid = list(ParameterGrid(param_grid or {"C": [1.0]}))
+    tasks = []
+    for h in horizons:
+        emb = embargo_days if embargo_days is not None else _horizon_days(h) + 3
+        splits = walk_forward_splits(ts, n_splits=n_splits, mode=mode, window_days=window_days,
+                                     embargo_days=emb, initial_frac=initial_frac)
+        for params in grid:
+            model_params = {k: v for k, v in params.items() if k != "features"}
+            feats = list(params.get("features", features))
+            key = json.dumps({**model_params, "features": feats}, sort_keys=True)
+            for s in splits:
+                tasks.append({**s, "horizon": h, "features": feats,
+                              "model_params": model_params, "params_key": key})
+
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(str(cache_path))
+        rows = [_run_fold(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(cache_path),)) as ex:
+            rows = list(ex.map(_run_fold, tasks))
+
+    results = pd.DataFrame(rows)
+    for c in ("train_start", "train_end", "test_start", "test_end"):
+        if c in results:
+            results[c] = pd.to_datetime(results[c])
+    return results
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """Per (horizon, params): folds, test rows, mean/std accuracy and AUC."""
+    if results.empty:
+        return results
+    return (results.groupby(["horizon", "params"], sort=True)
+                   .agg(folds=("fold", "count"), n_test=("n_test", "sum"),
+                        accuracy=("accuracy", "mean"), accuracy_std=("accuracy", "std"),
+                        auc=("auc", "mean"), auc_std=("auc", "std"),
+                        base_rate=("base_rate", "mean"))
+                   .reset_index())
+
+
+if __name__ == "__main__":
+    res = evaluate()
+    print(summarize(res).to_string(index=False))
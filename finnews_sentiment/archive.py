@@ -0,0 +1,221 @@
+# finnews_sentiment/archive.py
+import hashlib
+import sqlite3
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from .db import get_engine, ArchiveBlob, ArticleArchive
+
+FIELDS = ("summary", "text")
+DEFAULT_FIELDS = ("text",)   # summaries are read by most stages; archive them explicitly
+ZSTD_LEVEL = 10
+_ID_CHUNK = 900              # stays under SQLite's bound-parameter limit
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress(raw: bytes) -> tuple[str, bytes]:
+    """(codec, compressed bytes): zstd if the zstandard package is installed, else zlib."""
+    zstd = _zstd()
+    if zstd is not None:
+        return "zstd", zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("Archived text is zstd-compressed; install the 'zstandard' package")
+        return zstd.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown archive codec {codec!r}")
+
+
+def _check_fields(fields) -> tuple:
+    fields = tuple(fields)
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot archive {sorted(unknown)}; archivable fields are {FIELDS}")
+    return fields
+
+
+def run(older_than_days: int = 365, fields=DEFAULT_FIELDS, batch_size: int = 5000,
+        vacuum: bool = False) -> dict:
+    """
+    Move `fields` of articles published more than `older_than_days` ago into
+    the compressed blob store.
+
+    Each non-empty value is stored once in archive_blobs under the SHA-256 of
+    its text (syndicated copies share a blob), a pointer goes to
+    article_archive and the column in `articles` is emptied (the columns are
+    NOT NULL in existing databases, so '' plus a pointer marks an archived
+    value). Work is done
+    in id-ordered batches, one transaction each, so the stage can be stopped
+    and rerun. With vacuum=True the SQLite file is compacted afterwards.
+    Returns the stats that are printed.
+    """
+    fields = _check_fields(fields)
+    engine = get_engine()
+    ArchiveBlob.__table__.create(engine, checkfirst=True)
+    ArticleArchive.__table__.create(engine, checkfirst=True)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    size_before = _db_size(engine)
+
+    not_null = " OR ".join(f"({f} IS NOT NULL AND {f} != '')" for f in fields)
+    stats = {"articles": 0, "values": 0, "raw_bytes": 0, "stored_bytes": 0, "shared": 0}
+    last_id = 0
+    t0 = time.perf_counter()
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(text(
+                f"SELECT id, {', '.join(fields)} FROM articles "
+                f"WHERE id > :last AND published_at < :cutoff AND ({not_null}) "
+                "ORDER BY id LIMIT :n"), {"last": last_id, "cutoff": cutoff, "n": batch_size}).fetchall()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            blobs, pointers = {}, []
+            now = datetime.utcnow()
+            for row in batch:
+                for field, value in zip(fields, row[1:]):
+                    if not value:
+                        continue
+                    raw = value.encode("utf-8")
+                    h = hashlib.sha256(raw).hexdigest()
+                    blobs.setdefault(h, raw)
+                    pointers.append({"article_id": row[0], "field": field, "hash": h, "archived_at": now})
+                    stats["values"] += 1
+                    stats["raw_bytes"] += len(raw)
+
+            # Only compress blobs the store does not have yet
+            existing = set()
+            hashes = list(blobs)
+            for i in range(0, len(hashes), _ID_CHUNK):
+                part = hashes[i:i + _ID_CHUNK]
+                existing |= {r[0] for r in conn.execute(
+                    ArchiveBlob.__table__.select().with_only_columns(ArchiveBlob.hash)
+                    .where(ArchiveBlob.hash.in_(part)))}
+            new_blobs = []
+            for h, raw in blobs.items():
+                if h in existing:
+                    continue
+                codec, data = compress(raw)
+                new_blobs.append({"hash": h, "codec": codec, "raw_size": len(raw), "data": data})
+                stats["stored_bytes"] += len(data)
+            stats["shared"] += len(pointers) - len(new_blobs)
+
+            if new_blobs:
+                conn.execute(ArchiveBlob.__table__.insert(), new_blobs)
+            # Replace only the pointers written here: an empty column may already
+            # be archived by an earlier run and its pointer must survive
+            for field in fields:
+                ids = [p["article_id"] for p in pointers if p["field"] == field]
+                if not ids:
+                    continue
+                conn.execute(ArticleArchive.__table__.delete().where(
+                    ArticleArchive.article_id.in_(ids), ArticleArchive.field == field))
+                conn.execute(text(f"UPDATE articles SET {field} = '' WHERE id = :id"), [{"id": i} for i in ids])
+            conn.execute(ArticleArchive.__table__.insert(), pointers)
+            stats["articles"] += len(batch)
+
+    if vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    stats["db_bytes_before"], stats["db_bytes_after"] = size_before, _db_size(engine)
+
+    ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0.0
+    print(f"archive: moved {stats['values']} value(s) from {stats['articles']} article(s) older than "
+          f"{older_than_days} days in {time.perf_counter() - t0:.1f}s")
+    print(f"archive: {stats['raw_bytes'] / 1e6:.1f} MB of text stored as {stats['stored_bytes'] / 1e6:.1f} MB "
+          f"(x{ratio:.1f}, {stats['shared']} value(s) shared an existing blob)")
+    if stats["db_bytes_before"]:
+        print(f"archive: database file {stats['db_bytes_before'] / 1e6:.1f} MB -> "
+              f"{stats['db_bytes_after'] / 1e6:.1f} MB" + ("" if vacuum else " (run with vacuum to reclaim space)"))
+    return stats
+
+
+def _db_size(engine) -> int:
+    if engine.dialect.name != "sqlite":
+        return 0
+    with engine.connect() as conn:
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    return int(pages * size)
+
+
+def load_field(conn, article_id: int, field: str = "text") -> str:
+    """Archived `field` of one article ("" if it was never archived)."""
+    if not _has_archive(conn):
+        return ""
+    row = conn.execute(text(
+        "SELECT b.codec, b.data FROM article_archive a JOIN archive_blobs b ON b.hash = a.hash "
+        "WHERE a.article_id = :id AND a.field = :field"), {"id": int(article_id), "field": field}).fetchone()
+    return decompress(row[0], row[1]).decode("utf-8") if row else ""
+
+
+def _has_archive(conn) -> bool:
+    if isinstance(conn, sqlite3.Connection):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_archive'").fetchone() is not None
+    from sqlalchemy import inspect
+    return inspect(conn).has_table("article_archive")
+
+
+def hydrate(conn, df: pd.DataFrame, fields=("summary",), id_col: str = "id") -> pd.DataFrame:
+    """
+    Fill archived values back into `df`. Only rows whose `fields` are empty
+    or NULL are looked up (one query per ~900 ids), so frames of recent
+    articles with text cost next to nothing; rows without a pointer are left
+    as they are. `conn` may be a sqlite3 or SQLAlchemy connection.
+    """
+    fields = [f for f in _check_fields(fields) if f in df.columns]
+    if df.empty or not fields:
+        return df
+    need = (df[fields].isna() | (df[fields] == "")).any(axis=1)
+    if not need.any() or not _has_archive(conn):
+        return df
+
+    ids = sorted(set(int(i) for i in df.loc[need, id_col]))
+    field_list = ", ".join(f"'{f}'" for f in fields)
+    parts = []
+    for i in range(0, len(ids), _ID_CHUNK):
+        id_list = ",".join(str(x) for x in ids[i:i + _ID_CHUNK])
+        sql = ("SELECT a.article_id, a.field, b.codec, b.data FROM article_archive a "
+               "JOIN archive_blobs b ON b.hash = a.hash "
+               f"WHERE a.article_id IN ({id_list}) AND a.field IN ({field_list})")
+        parts.append(pd.read_sql(sql if isinstance(conn, sqlite3.Connection) else text(sql), conn))
+    found = pd.concat(parts, ignore_index=True)
+    if found.empty:
+        return df
+
+    df = df.copy()
+    for field, grp in found.groupby("field"):
+        values = {int(a): decompress(c, d).decode("utf-8")
+                  for a, c, d in zip(grp["article_id"], grp["codec"], grp["data"])}
+        hit = df[id_col].isin(values.keys()) & (df[field].isna() | (df[field] == ""))
+        df.loc[hit, field] = df.loc[hit, id_col].map(values)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move old article bodies to compressed cold storage")
+    parser.add_argument("--older-than-days", type=int, default=365)
+    parser.add_argument("--fields", nargs="+", choices=FIELDS, default=list(DEFAULT_FIELDS))
+    parser.add_argument("--vacuum", action="store_true", help="compact the SQLite file afterwards")
+    args = parser.parse_args()
+    run(args.older_than_days, args.fields, vacuum=args.vacuum)
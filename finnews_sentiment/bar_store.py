@@ -0,0 +1,183 @@
+# finnews_sentiment/bar_store.py
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+BARS_DIR = Path("data/bars")
+STAGING = "_staging"
+ROW_GROUP_SIZE = 256_000
+
+# One file per month per bar size: data/bars/<freq>/<YYYY-MM>.parquet, rows sorted by
+# (ticker, ts) so ticker filters only read the matching row groups.
+# ts is the bar's start time, naive UTC (like articles.published_at).
+BAR_SCHEMA = pa.schema([
+    ("ticker", pa.string()),
+    ("ts", pa.timestamp("ns")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+])
+BAR_COLUMNS = BAR_SCHEMA.names
+
+
+def _freq_dir(freq: str, root: Path = BARS_DIR) -> Path:
+    return Path(root) / freq
+
+
+def _month_key(ts: pd.Series) -> np.ndarray:
+    """datetime64[M] per bar; str() of one gives the 'YYYY-MM' file name."""
+    return ts.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+
+
+def stage_bars(df: pd.DataFrame, freq: str = "1m", root: Path = BARS_DIR) -> list[str]:
+    """
+    Spool a chunk of bars (BAR_COLUMNS) into per-month staging files.
+    Nothing is visible to readers until compact() merges them; this keeps
+    large imports at one month rewrite per month instead of one per chunk.
+    Returns the months touched.
+    """
+    if df.empty:
+        return []
+    import pyarrow.parquet as pq
+
+    base = _freq_dir(freq, root) / STAGING
+    months = []
+    for month, part in df.groupby(_month_key(df["ts"]), sort=True):
+        month = str(np.datetime64(month, "M"))
+        d = base / month
+        d.mkdir(parents=True, exist_ok=True)
+        n = sum(1 for _ in d.glob("part-*.parquet"))
+        table = pa.Table.from_pandas(part[BAR_COLUMNS], schema=BAR_SCHEMA, preserve_index=False)
+        pq.write_table(table, d / f"part-{n:05d}.parquet")
+        months.append(month)
+    return months
+
+
+def compact(freq: str = "1m", root: Path = BARS_DIR) -> int:
+    """
+    Merge staged parts into the month files. Existing bars are kept unless
+    a staged bar has the same (ticker, ts), in which case the staged one wins.
+    Each month file is replaced atomically. Returns the number of months written.
+    """
+    import pyarrow.parquet as pq
+
+    fdir = _freq_dir(freq, root)
+    base = fdir / STAGING
+    if not base.exists():
+        return 0
+    written = 0
+    for mdir in sorted(p for p in base.iterdir() if p.is_dir()):
+        path = fdir / f"{mdir.name}.parquet"
+        frames = [pq.read_table(path).to_pandas()] if path.exists() else []
+        frames += [pq.read_table(p).to_pandas() for p in sorted(mdir.glob("part-*.parquet"))]
+        df = (pd.concat(frames, ignore_index=True)
+                .drop_duplicates(["ticker", "ts"], keep="last")
+                .sort_values(["ticker", "ts"], kind="stable"))
+        tmp = path.with_suffix(".parquet.tmp")
+        pq.write_table(pa.Table.from_pandas(df[BAR_COLUMNS], schema=BAR_SCHEMA, preserve_index=False),
+                       tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+        os.replace(tmp, path)
+        shutil.rmtree(mdir)
+        written += 1
+        print(f"bar_store: {freq} {mdir.name}: {len(df)} bars")
+    shutil.rmtree(base, ignore_errors=True)
+    return written
+
+
+def months(freq: str = "1m", root: Path = BARS_DIR) -> list[str]:
+    """Months ('YYYY-MM') stored for a bar size."""
+    fdir = _freq_dir(freq, root)
+    return sorted(p.stem for p in fdir.glob("*.parquet")) if fdir.exists() else []
+
+
+def _months_between(start, end) -> list[str]:
+    return [p.strftime("%Y-%m") for p in pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq="M")]
+
+
+def load_bars(start, end, tickers=None, freq: str = "1m", columns=("open",),
+              root: Path = BARS_DIR) -> pd.DataFrame:
+    """
+    Bars with start <= ts <= end, sorted by (ticker, ts). Only the month
+    files overlapping the range are opened, and only the requested columns
+    (plus ticker/ts) and tickers are read.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    cols = ["ticker", "ts", *[c for c in columns if c not in ("ticker", "ts")]]
+    have = set(months(freq, root))
+    tables = []
+    for month in _months_between(start, end):
+        if month not in have:
+            continue
+        filters = [("ts", ">=", start), ("ts", "<=", end)]
+        if tickers is not None:
+            filters.append(("ticker", "in", sorted(set(tickers))))
+        tables.append(pq.read_table(_freq_dir(freq, root) / f"{month}.parquet",
+                                    columns=cols, filters=filters))
+    if not tables:
+        return pd.DataFrame({c: pd.Series(dtype=BAR_SCHEMA.field(c).type.to_pandas_dtype()) for c in cols})
+    table = pa.concat_tables(tables)
+    table = table.take(pc.sort_indices(table, [("ticker", "ascending"), ("ts", "ascending")]))
+    return table.to_pandas()
+
+
+def align_to_bars(ticker: np.ndarray, at: np.ndarray, bars: pd.DataFrame,
+                  horizons_min=(5, 15, 60), price: str = "open") -> pd.DataFrame:
+    """
+    For each event (ticker, at), find the first bar that starts strictly
+    after `at` (the first bar one could trade on) and, per horizon h, the
+    first bar starting at or after entry + h minutes, all within the same
+    ticker. Returns entry_ts, entry_price, exit_ts_<h>m and ret_<h>m
+    (NaN/NaT when no such bar exists), aligned with the inputs.
+
+    `bars` must be sorted by (ticker, ts). Tickers and times are packed into
+    one int64 key (ticker code << 34 | epoch seconds), so every lookup is a
+    single np.searchsorted over all tickers at once.
+    """
+    n = len(at)
+    nat = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+    out = {"entry_ts": nat, "entry_price": np.full(n, np.nan)}
+    for h in horizons_min:
+        out[f"exit_ts_{h}m"] = nat
+        out[f"ret_{h}m"] = np.full(n, np.nan)
+    if n == 0 or bars.empty:
+        return pd.DataFrame(out, index=pd.RangeIndex(n))
+
+    codes, uniques = pd.factorize(bars["ticker"], sort=False)
+    # bars are sorted by ticker, so codes are non-decreasing and the packed keys sorted
+    bar_s = bars["ts"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    keys = (codes.astype(np.int64) << 34) | bar_s
+    px = bars[price].to_numpy(dtype=np.float64)
+    last = len(keys) - 1
+
+    ev_code = pd.Index(uniques).get_indexer(pd.Index(ticker)).astype(np.int64)
+    ev_s = np.asarray(at, dtype="datetime64[s]").astype(np.int64)
+    known = (ev_code >= 0) & ~np.isnat(np.asarray(at, dtype="datetime64[s]"))
+
+    def lookup(target_s, side, ok):
+        idx = np.searchsorted(keys, (np.where(ok, ev_code, 0) << 34) | np.where(ok, target_s, 0), side=side)
+        ok = ok & (idx <= last)
+        idx = np.minimum(idx, last)
+        return idx, ok & (codes[idx] == ev_code)
+
+    e_idx, e_ok = lookup(ev_s, "right", known)
+    entry_s = bar_s[e_idx]
+    entry_px = np.where(e_ok, px[e_idx], np.nan)
+    out["entry_ts"] = np.where(e_ok, entry_s.astype("datetime64[s]"), np.datetime64("NaT")).astype("datetime64[ns]")
+    out["entry_price"] = entry_px
+    for h in horizons_min:
+        x_idx, x_ok = lookup(entry_s + 60 * int(h), "left", e_ok)
+        exit_px = np.where(x_ok, px[x_idx], np.nan)
+        out[f"exit_ts_{h}m"] = np.where(x_ok, bar_s[x_idx].astype("datetime64[s]"),
+                                        np.datetime64("NaT")).astype("datetime64[ns]")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[f"ret_{h}m"] = np.where(x_ok & (entry_px != 0), exit_px / entry_px - 1.0, np.nan)
+    return pd.DataFrame(out, index=pd.RangeIndex(n))
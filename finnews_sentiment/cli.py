@@ -0,0 +1,316 @@
+# finnews_sentiment/cli.py
+"""
+Single entry point for the pipeline stages:
+
+    finnews ingest | enrich | search-text | dedup | archive | prices | import-prices | import-bars | dataset | intraday | sentiment | entities | daily | join | report | evaluate | backtest
+    finnews jobs plan|status|reclaim | worker
+
+Only the standard library is imported at module level. Each handler imports
+its stage (and with it pandas, SQLAlchemy, yfinance, ...) when it runs, so
+`finnews --help` and argument errors return immediately.
+"""
+import argparse
+import sys
+
+# Mirrors jobs.HANDLERS; kept here so parsing does not import the queue
+STAGES = ("ingest", "prices", "enrich", "sentiment")
+
+
+def vendor_column(value: str) -> tuple[str, str]:
+    """argparse type for --column VENDOR=FIELD; a bad value becomes a usage error."""
+    vendor, sep, field = value.partition("=")
+    if not (sep and vendor and field):
+        raise argparse.ArgumentTypeError(f"expected VENDOR=FIELD, got {value!r}")
+    return vendor, field
+
+
+def _init_db(args):
+    from .db import Base, get_engine
+    Base.metadata.create_all(get_engine())
+    print("Database tables created.")
+
+
+def _ingest(args):
+    from .etl.ingest_rss import run
+    run(config_path=args.config, rate_limit_sec=args.rate_limit)
+
+
+def _enrich(args):
+    from .etl.enrich_articles import run
+    run(cfg_path=args.config, only_missing=not args.all, use_body_text=not args.no_body, limit=args.limit)
+
+
+def _search_text(args):
+    from .search_text import run
+    run(rebuild=args.rebuild, chunk_size=args.chunk_size)
+
+
+def _dedup(args):
+    from .etl.dedup_articles import run
+    run(chunk_size=args.chunk_size, threshold=args.threshold, limit=args.limit)
+
+
+def _archive(args):
+    from .archive import run
+    run(older_than_days=args.older_than_days, fields=args.fields, vacuum=args.vacuum)
+
+
+def _prices(args):
+    from .etl.fetch_prices import run
+    run(cfg_path=args.config, lookback_days=args.lookback_days)
+
+
+def _import_prices(args):
+    from .etl.import_prices import run
+    run(args.paths, chunk_size=args.chunk_size, columns=dict(args.column), ticker=args.ticker,
+        fmt=args.format)
+
+
+def _import_bars(args):
+    from .etl.import_bars import run
+    run(args.paths, freq=args.freq, tz=args.tz, chunk_size=args.chunk_size, columns=dict(args.column),
+        ticker=args.ticker, fmt=args.format)
+
+
+def _price_store(args):
+    from .price_store import refresh
+    if not refresh(force=args.force):
+        print("price_store: already up to date")
+
+
+def _dataset(args):
+    from .features.build_dataset import OUT_PATH, build_dataset, save_dataset, write_dataset
+    if args.chunk_size:
+        write_dataset(OUT_PATH, chunk_size=args.chunk_size, dedupe=args.dedupe)
+        return
+    df = build_dataset(dedupe=args.dedupe, backend=args.backend)
+    print(df.head(15))
+    if not df.empty:
+        save_dataset(df, OUT_PATH)
+
+
+def _intraday(args):
+    from .features.intraday_dataset import OUT_PATH, build_intraday_dataset
+    df = build_intraday_dataset(args.freq, tuple(args.horizons), dedupe=args.dedupe)
+    if not df.empty:
+        df.to_parquet(OUT_PATH, index=False)
+        print(f"Saved {OUT_PATH}")
+
+
+def _sentiment(args):
+    from .features.compute_sentiment import run
+    run(dedupe=args.dedupe, chunk_size=args.chunk_size or None)
+
+
+def _entities(args):
+    from .features.entity_sentiment import run
+    run(dedupe=args.dedupe, chunk_size=args.chunk_size)
+
+
+def _daily(args):
+    from .features.daily_sentiment import update
+    update(chunk_size=args.chunk_size)
+
+
+def _join(args):
+    from .features.join_returns import run
+    run()
+
+
+def _report(args):
+    from .analysis.sentiment_report import main
+    main(per_ticker=args.per_ticker, workers=args.workers, force=args.force)
+
+
+def _evaluate(args):
+    from .analysis.walk_forward import evaluate, summarize
+    results = evaluate(features=args.features, param_grid={"C": args.C}, n_splits=args.splits,
+                       mode=args.mode, window_days=args.window_days, workers=args.workers)
+    if results.empty:
+        print("Not enough data for walk-forward evaluation.")
+        return
+    results.to_csv("data/walk_forward_folds.csv", index=False)
+    print(summarize(results).to_string(index=False))
+
+
+def _backtest(args):
+    from .analysis.backtest import OUT_PATH, sweep
+    grid = {"threshold": args.threshold, "holding": args.holding, "halflife": args.halflife,
+            "cap": args.cap, "min_articles": args.min_articles, "weighting": args.weighting,
+            "cost_bps": args.cost_bps}
+    res = sweep(grid, source=args.source, workers=args.workers)
+    res.to_csv(OUT_PATH, index=False)
+    print(res.head(args.top).to_string(index=False))
+    print(f"Saved {len(res)} configurations to {OUT_PATH}")
+
+
+def _worker(args):
+    from .jobs import work
+    work(stages=args.stages, lease_seconds=args.lease, poll_seconds=args.poll,
+         exit_when_empty=args.exit_when_empty, max_units=args.max_units)
+
+
+def _jobs(args):
+    from . import jobs
+    if args.action == "plan":
+        for stage in args.stages:
+            units = jobs.plan_units(stage, size=args.size)
+            added = jobs.enqueue(stage, units, batch=args.batch)
+            print(f"jobs: {stage}: {added} new unit(s) of {len(units)} planned")
+    elif args.action == "reclaim":
+        print(f"jobs: released {jobs.reclaim()} expired lease(s)")
+    else:
+        df = jobs.status(args.batch)
+        print(df.to_string(index=False) if not df.empty else "jobs: queue is empty")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="finnews", description="Finance news ETL + sentiment pipeline")
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+    sub.required = True
+
+    p = sub.add_parser("init-db", help="create all database tables")
+    p.set_defaults(func=_init_db)
+
+    p = sub.add_parser("ingest", help="ingest new RSS articles")
+    p.add_argument("--config", default="configs/sources.yaml")
+    p.add_argument("--rate-limit", type=float, default=0.3, help="seconds between feeds")
+    p.set_defaults(func=_ingest)
+
+    p = sub.add_parser("enrich", help="tag articles with tickers")
+    p.add_argument("--config", default="configs/tickers.yaml")
+    p.add_argument("--all", action="store_true", help="re-tag articles that already have tickers")
+    p.add_argument("--no-body", action="store_true", help="match title/summary only")
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=_enrich)
+
+    p = sub.add_parser("search-text", help="normalize article text for matching and scoring (stale rows only)")
+    p.add_argument("--rebuild", action="store_true", help="recompute every row")
+    p.add_argument("--chunk-size", type=int, default=5000)
+    p.set_defaults(func=_search_text)
+
+    p = sub.add_parser("dedup", help="assign near-duplicate clusters (MinHash/LSH)")
+    p.add_argument("--chunk-size", type=int, default=2000)
+    p.add_argument("--threshold", type=float, default=0.8)
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=_dedup)
+
+    p = sub.add_parser("archive", help="move old article bodies to compressed cold storage")
+    p.add_argument("--older-than-days", type=int, default=365)
+    p.add_argument("--fields", nargs="+", choices=("summary", "text"), default=["text"])
+    p.add_argument("--vacuum", action="store_true", help="compact the SQLite file afterwards")
+    p.set_defaults(func=_archive)
+
+    p = sub.add_parser("prices", help="fetch daily prices")
+    p.add_argument("--config", default="configs/tickers.yaml")
+    p.add_argument("--lookback-days", type=int, default=365)
+    p.set_defaults(func=_prices)
+
+    p = sub.add_parser("import-prices", help="bulk import end-of-day prices from CSV/Parquet files")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--chunk-size", type=int, default=200_000)
+    p.add_argument("--column", action="append", default=[], type=vendor_column, metavar="VENDOR=FIELD",
+                   help="map a vendor column onto a prices field, e.g. --column PX_LAST=close")
+    p.add_argument("--ticker", default=None, help="symbol for single-ticker files")
+    p.add_argument("--format", choices=("csv", "parquet"), default=None, help="default: from the file suffix")
+    p.set_defaults(func=_import_prices)
+
+    p = sub.add_parser("import-bars", help="import intraday bars into data/bars/<freq>/")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--freq", default="1m", help="bar size label, e.g. 1m or 5m")
+    p.add_argument("--tz", default="UTC", help="timezone of naive vendor timestamps")
+    p.add_argument("--chunk-size", type=int, default=500_000)
+    p.add_argument("--column", action="append", default=[], type=vendor_column, metavar="VENDOR=FIELD")
+    p.add_argument("--ticker", default=None, help="symbol for single-ticker files")
+    p.add_argument("--format", choices=("csv", "parquet"), default=None)
+    p.set_defaults(func=_import_bars)
+
+    p = sub.add_parser("price-store", help="rebuild the memory-mapped price store if stale")
+    p.add_argument("--force", action="store_true")
+    p.set_defaults(func=_price_store)
+
+    p = sub.add_parser("dataset", help="build data/dataset.parquet")
+    p.add_argument("--backend", choices=("pandas", "duckdb"), default="pandas")
+    p.add_argument("--chunk-size", type=int, default=0, help="stream in chunks of this size (0 = in memory)")
+    p.add_argument("--dedupe", action="store_true", help="one article per near-duplicate cluster")
+    p.set_defaults(func=_dataset)
+
+    p = sub.add_parser("intraday", help="build data/dataset_intraday.parquet (next-bar entry, minute horizons)")
+    p.add_argument("--freq", default="1m")
+    p.add_argument("--horizons", type=int, nargs="+", default=[5, 15, 60], help="minutes")
+    p.add_argument("--dedupe", action="store_true")
+    p.set_defaults(func=_intraday)
+
+    p = sub.add_parser("sentiment", help="score articles with VADER")
+    p.add_argument("--chunk-size", type=int, default=0)
+    p.add_argument("--dedupe", action="store_true")
+    p.set_defaults(func=_sentiment)
+
+    p = sub.add_parser("entities", help="per-ticker sentiment of the sentences mentioning each ticker")
+    p.add_argument("--chunk-size", type=int, default=5000)
+    p.add_argument("--dedupe", action="store_true")
+    p.set_defaults(func=_entities)
+
+    p = sub.add_parser("daily", help="update ticker_daily_sentiment incrementally")
+    p.add_argument("--chunk-size", type=int, default=50_000)
+    p.set_defaults(func=_daily)
+
+    p = sub.add_parser("join", help="join sentiment + returns into data/model_dataset.parquet")
+    p.set_defaults(func=_join)
+
+    p = sub.add_parser("report", help="sentiment vs. returns figures + group_stats.csv")
+    p.add_argument("--per-ticker", action="store_true")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--force", action="store_true")
+    p.set_defaults(func=_report)
+
+    p = sub.add_parser("evaluate", help="walk-forward evaluation of the baseline model")
+    p.add_argument("--features", nargs="+", default=["sentiment"])
+    p.add_argument("--C", type=float, nargs="+", default=[0.1, 1.0, 10.0])
+    p.add_argument("--splits", type=int, default=5)
+    p.add_argument("--mode", choices=("expanding", "rolling"), default="expanding")
+    p.add_argument("--window-days", type=int, default=None, help="training window for --mode rolling")
+    p.add_argument("--workers", type=int, default=None)
+    p.set_defaults(func=_evaluate)
+
+    p = sub.add_parser("backtest", help="long/short backtest sweep on the sentiment signal")
+    p.add_argument("--source", choices=("daily", "model"), default="daily",
+                   help="ticker_daily_sentiment table or data/model_dataset.parquet")
+    p.add_argument("--threshold", type=float, nargs="+", default=[0.0, 0.05, 0.1, 0.2])
+    p.add_argument("--holding", type=int, nargs="+", default=[1, 5, 20], help="trading days")
+    p.add_argument("--halflife", type=float, nargs="+", default=[0.0, 3.0, 10.0], help="signal decay, trading days")
+    p.add_argument("--cap", type=float, nargs="+", default=[0.1], help="max weight per name")
+    p.add_argument("--min-articles", type=float, nargs="+", default=[1.0])
+    p.add_argument("--weighting", choices=("equal", "signal"), nargs="+", default=["equal"])
+    p.add_argument("--cost-bps", type=float, nargs="+", default=[0.0, 10.0])
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--top", type=int, default=20, help="rows to print")
+    p.set_defaults(func=_backtest)
+
+    p = sub.add_parser("worker", help="claim and run queued work units (start one per core/host)")
+    p.add_argument("--stages", nargs="+", choices=STAGES, default=None, help="default: all stages")
+    p.add_argument("--lease", type=int, default=300, help="lease timeout in seconds")
+    p.add_argument("--poll", type=float, default=5.0, help="seconds to wait when the queue is empty")
+    p.add_argument("--exit-when-empty", action="store_true")
+    p.add_argument("--max-units", type=int, default=None)
+    p.set_defaults(func=_worker)
+
+    p = sub.add_parser("jobs", help="plan, inspect or reclaim queued work units")
+    p.add_argument("action", choices=("plan", "status", "reclaim"))
+    p.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    p.add_argument("--batch", default=None, help="default: today's date (UTC)")
+    p.add_argument("--size", type=int, default=None,
+                   help="articles per enrich/sentiment unit (2000) or tickers per prices unit (20)")
+    p.set_defaults(func=_jobs)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
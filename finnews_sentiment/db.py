@@ -1,11 +1,38 @@
-from sqlalchemy import create_engine, String, Integer, DateTime, Text, UniqueConstraint, Float
+from sqlalchemy import (create_engine, String, Integer, BigInteger, DateTime, Text, UniqueConstraint,
+                        Float, Index, LargeBinary, insert)
 from sqlalchemy.orm import DeclarativeBase, mapped_column, sessionmaker, Mapped
 from datetime import datetime
-from .settings import settings
+from .settings import settings, ensure_data_dir
 
-# Database connection and session setup
-engine = create_engine(settings.DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(expire_on_commit = False,  bind=engine)
+# Database connection and session setup. The engine is created on first use,
+# so importing the models does not touch the filesystem or the database.
+_engine = None
+_session_factory = sessionmaker(expire_on_commit = False)
+
+
+def get_engine():
+    """Create the engine for settings.DATABASE_URL once and return it."""
+    global _engine
+    if _engine is None:
+        ensure_data_dir()
+        # Several worker processes may share one SQLite file: wait for locks instead of failing
+        connect_args = {"timeout": 30} if settings.DATABASE_URL.startswith("sqlite") else {}
+        _engine = create_engine(settings.DATABASE_URL, echo=False, connect_args=connect_args)
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def SessionLocal():
+    """New ORM session bound to the (lazily created) engine."""
+    get_engine()
+    return _session_factory()
+
+
+def __getattr__(name):
+    # `from finnews_sentiment.db import engine` keeps working, but creates the engine lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Base class for models
 
@@ -25,7 +52,25 @@ class Article(Base):
     text: Mapped[str] = mapped_column(Text, default = "")     # Full text, if available
     tickers: Mapped[str] = mapped_column(String(512), default = "") # Comma-separated list of tickers
 
-    __table_args__ = (UniqueConstraint("url", name = "uq_article_url"),)
+    __table_args__ = (UniqueConstraint("url", name = "uq_article_url"),
+                      Index("ix_articles_published_at", "published_at", "id"))
+
+    def body(self, field: str = "text") -> str:
+        """
+        `summary`/`text`, loaded from the cold archive if it was moved there
+        (the column is then empty). Loaded values are cached on the instance.
+        Costs a query per article; use archive.hydrate for many articles.
+        """
+        value = getattr(self, field)
+        if value:
+            return value
+        cache = self.__dict__.setdefault("_archived", {})
+        if field not in cache:
+            from sqlalchemy.orm import object_session
+            from .archive import load_field
+            sess = object_session(self)
+            cache[field] = load_field(sess.connection(), self.id, field) if sess is not None else ""
+        return cache[field]
 
 # New table with stock prices
 class Price(Base):
@@ -42,8 +87,211 @@ class Price(Base):
     __table_args__ = (UniqueConstraint("ticker", "date", name =  "uq_price_ticker_date"),)
 
 
+# Article-level sentiment scores written by features.compute_sentiment
+class ArticleSentiment(Base):
+    __tablename__ = "article_sentiment"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    sentiment: Mapped[float] = mapped_column(Float)  # VADER compound
+    scored_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# Snapshot of each article as last aggregated into ticker_daily_sentiment,
+# used to find articles that were newly scored, re-tagged or re-dated
+class SentimentDailyState(Base):
+    __tablename__ = "sentiment_daily_state"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    tickers: Mapped[str] = mapped_column(String(512), default = "")
+    published_at: Mapped[datetime] = mapped_column(DateTime)
+    source: Mapped[str] = mapped_column(String(128), default = "")
+    sentiment: Mapped[float] = mapped_column(Float)
+
+
+# One row per (article, ticker) with the article's day and sentiment
+class ArticleTickerSentiment(Base):
+    __tablename__ = "article_ticker_sentiment"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    ticker: Mapped[str] = mapped_column(String(16), primary_key = True)
+    day: Mapped[datetime] = mapped_column(DateTime)
+    source: Mapped[str] = mapped_column(String(128), default = "")
+    sentiment: Mapped[float] = mapped_column(Float)
+    __table_args__ = (Index("ix_ats_ticker_day", "ticker", "day"),)
+
+
+# Materialized daily per-ticker sentiment features
+class TickerDailySentiment(Base):
+    __tablename__ = "ticker_daily_sentiment"
+    ticker: Mapped[str] = mapped_column(String(16), primary_key = True)
+    day: Mapped[datetime] = mapped_column(DateTime, primary_key = True)
+    n_articles: Mapped[int] = mapped_column(Integer)
+    sum_sentiment: Mapped[float] = mapped_column(Float)
+    mean_sentiment: Mapped[float] = mapped_column(Float)
+    median_sentiment: Mapped[float] = mapped_column(Float)
+    n_sources: Mapped[int] = mapped_column(Integer)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    __table_args__ = (Index("ix_tds_day_ticker", "day", "ticker"),)
+
+
+# MinHash signature and near-duplicate cluster of each article (cluster_id = id of the
+# earliest article in the cluster, so representatives have cluster_id == article_id)
+class ArticleMinhash(Base):
+    __tablename__ = "article_minhash"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary)
+    cluster_id: Mapped[int] = mapped_column(Integer, index = True)
+
+
+# LSH band buckets; the primary key doubles as the (band, bucket) lookup index
+class ArticleLshBucket(Base):
+    __tablename__ = "article_lsh"
+    band: Mapped[int] = mapped_column(Integer, primary_key = True)
+    bucket: Mapped[int] = mapped_column(BigInteger, primary_key = True)
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+
+
+# Cold storage for old article bodies (see archive.py). Blobs are keyed by the
+# SHA-256 of the uncompressed text, so identical bodies are stored once.
+class ArchiveBlob(Base):
+    __tablename__ = "archive_blobs"
+    hash: Mapped[str] = mapped_column(String(64), primary_key = True)
+    codec: Mapped[str] = mapped_column(String(8))
+    raw_size: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+# Pointer from an archived (article, field) to its blob; the column in `articles` is ''
+class ArticleArchive(Base):
+    __tablename__ = "article_archive"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    field: Mapped[str] = mapped_column(String(16), primary_key = True)
+    hash: Mapped[str] = mapped_column(String(64))
+    archived_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# Normalized text of each article (see search_text.py), shared by ticker matching and
+# scoring. `version` is the normalization rules' version; rows of an older one are recomputed.
+class ArticleSearchText(Base):
+    __tablename__ = "article_search_text"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    version: Mapped[int] = mapped_column(Integer)
+    head: Mapped[str] = mapped_column(Text, default = "")   # title + summary
+    body: Mapped[str] = mapped_column(Text, default = "")   # full text
+
+
+# Where the enrichment matcher found each ticker: [start, stop) character offsets into
+# article_search_text.head or .body of the given search-text version
+class ArticleMention(Base):
+    __tablename__ = "article_mentions"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    ticker: Mapped[str] = mapped_column(String(16), primary_key = True)
+    field: Mapped[str] = mapped_column(String(8), primary_key = True)   # head/body
+    start: Mapped[int] = mapped_column(Integer, primary_key = True)
+    stop: Mapped[int] = mapped_column(Integer)
+    version: Mapped[int] = mapped_column(Integer)
+
+
+# Sentiment of the sentences that mention a ticker (see features/entity_sentiment.py);
+# n_windows = 0 means the ticker was only found in the body and the whole head was scored
+class ArticleEntitySentiment(Base):
+    __tablename__ = "article_entity_sentiment"
+    article_id: Mapped[int] = mapped_column(Integer, primary_key = True)
+    ticker: Mapped[str] = mapped_column(String(16), primary_key = True)
+    sentiment: Mapped[float] = mapped_column(Float)  # mean VADER compound over the windows
+    n_windows: Mapped[int] = mapped_column(Integer)
+    scored_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# Work queue shared by `finnews worker` processes (see jobs.py). A unit is claimed by
+# setting a lease; an expired lease makes the unit claimable again.
+class Job(Base):
+    __tablename__ = "jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key = True, autoincrement = True)
+    batch: Mapped[str] = mapped_column(String(64))        # e.g. the nightly run date
+    stage: Mapped[str] = mapped_column(String(32))
+    unit_key: Mapped[str] = mapped_column(String(1024))   # feed URL, id range, ticker batch
+    payload: Mapped[str] = mapped_column(Text, default = "{}")  # JSON arguments for the stage
+    priority: Mapped[int] = mapped_column(Integer, default = 0)
+    status: Mapped[str] = mapped_column(String(16), default = "pending")  # pending/leased/done/failed
+    attempts: Mapped[int] = mapped_column(Integer, default = 0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default = 3)
+    lease_owner: Mapped[str | None] = mapped_column(String(128), nullable = True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable = True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable = True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable = True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable = True)
+    __table_args__ = (UniqueConstraint("batch", "stage", "unit_key", name = "uq_job_unit"),
+                      Index("ix_jobs_claim", "status", "priority", "id"))
+
+
+def upsert_rows(conn, table, rows: list[dict], key_cols: list[str]) -> None:
+    """
+    Bulk insert-or-update `rows` (list of dicts) into `table` in one executemany.
+    Uses ON CONFLICT on SQLite/PostgreSQL; other backends fall back to delete + insert.
+    """
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        update_cols = {c: stmt.excluded[c] for c in rows[0] if c not in key_cols}
+        if update_cols:
+            stmt = stmt.on_conflict_do_update(index_elements=key_cols, set_=update_cols)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+        conn.execute(stmt, rows)
+        return
+
+    for r in rows:
+        conn.execute(table.delete().where(*[table.c[k] == r[k] for k in key_cols]))
+    conn.execute(insert(table), rows)
+
+
+def upsert_frame(conn, table, df, key_cols: list[str]) -> int:
+    """
+    upsert_rows for a DataFrame whose columns are columns of `table`.
+
+    On SQLite the ON CONFLICT statement is compiled once and the rows go to
+    the driver's executemany as plain tuples, skipping the per-row dict and
+    bind processing; datetimes are formatted the way SQLAlchemy stores them.
+    Other backends go through upsert_rows. Returns the number of rows.
+    """
+    if df.empty:
+        return 0
+    cols = list(df.columns)
+    if conn.dialect.name != "sqlite":
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        upsert_rows(conn, table, rows, key_cols)
+        return len(rows)
+
+    from sqlalchemy import bindparam
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    stmt = sqlite_insert(table).values({c: bindparam(c) for c in cols})
+    update_cols = {c: stmt.excluded[c] for c in cols if c not in key_cols}
+    if update_cols:
+        stmt = stmt.on_conflict_do_update(index_elements=key_cols, set_=update_cols)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+    compiled = stmt.compile(dialect=conn.dialect)
+
+    values = {}
+    for c in cols:
+        s = df[c]
+        if s.dtype.kind == "M":
+            s = s.dt.strftime("%Y-%m-%d %H:%M:%S.%f").astype(object).where(s.notna(), None)
+        elif s.dtype.kind not in "biuf":
+            s = s.astype(object).where(s.notna(), None)
+        values[c] = s.tolist()
+    conn.exec_driver_sql(compiled.string, list(zip(*(values[c] for c in compiled.positiontup))))
+    return len(df)
+
+
 # Create tables
 if __name__ == "__main__":
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
     print("Tables created in", settings.DATABASE_URL)
 
@@ -0,0 +1,171 @@
+# finnews_sentiment/etl/dedup_articles.py
+import hashlib
+import zlib
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table, text
+
+from ..archive import hydrate
+from ..db import get_engine, Base, ArticleMinhash, ArticleLshBucket
+from .enrich_articles import _normalize_text
+
+NUM_PERM = 128
+BANDS = 16              # 16 bands x 8 rows -> candidate threshold around Jaccard 0.7
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5             # character shingle length
+THRESHOLD = 0.8         # estimated Jaccard needed to call two articles duplicates
+MAX_CANDIDATES = 50     # per article, after ranking by shared bands
+BUCKET_FANOUT = 50      # oldest members read per (article, band), so hot buckets stay cheap
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(1234)  # fixed seed: signatures must be stable across runs
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.int64)
+
+# Articles that are not the representative of their near-duplicate cluster.
+# Usable as a WHERE clause on `articles` once `article_minhash` exists.
+DUPLICATE_FILTER_SQL = "id NOT IN (SELECT article_id FROM article_minhash WHERE cluster_id != article_id)"
+
+
+def _shingles(s: str) -> np.ndarray:
+    """32-bit hashes of the distinct character shingles of the normalized text."""
+    s = _normalize_text(s)
+    if len(s) < SHINGLE:
+        return np.empty(0, dtype=np.int64)
+    grams = {s[i:i + SHINGLE] for i in range(len(s) - SHINGLE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+
+
+def minhash(s: str) -> np.ndarray | None:
+    """MinHash signature (NUM_PERM uint32 values) of a text, or None if it is too short."""
+    x = _shingles(s)
+    if x.size == 0:
+        return None
+    x = x % _PRIME
+    # (a*x + b) mod p for every permutation/shingle pair; products stay below 2**62
+    h = (_A[:, None] * x[None, :] + _B[:, None]) % _PRIME
+    return h.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(sig: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket key per LSH band."""
+    out = []
+    for b in range(BANDS):
+        digest = hashlib.blake2b(sig[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).digest()
+        out.append(int.from_bytes(digest, "little", signed=True))
+    return out
+
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def run(chunk_size: int = 2000, threshold: float = THRESHOLD, limit: int | None = None) -> None:
+    """
+    Assign near-duplicate clusters to articles that have no MinHash yet.
+
+    Articles are processed in id order, in chunks. Each one is hashed over
+    title + summary, its LSH band buckets are stored, and older articles
+    sharing a bucket are verified by signature similarity. A duplicate joins
+    the smallest cluster id among its matches; otherwise it starts its own
+    cluster. Lookups go through the (band, bucket) index and read at most
+    BUCKET_FANOUT members per band, so the work per new article does not grow
+    with the corpus and memory is bounded by chunk_size.
+    """
+    engine = get_engine()
+    Base.metadata.create_all(engine, tables=[ArticleMinhash.__table__, ArticleLshBucket.__table__])
+
+    processed = 0
+    duplicates = 0
+    while True:
+        n = chunk_size if not limit else min(chunk_size, limit - processed)
+        if n <= 0:
+            break
+        with engine.connect() as conn:
+            arts = pd.read_sql(text(
+                "SELECT id, title, summary FROM articles "
+                "WHERE id > (SELECT COALESCE(MAX(article_id), 0) FROM article_minhash) "
+                "ORDER BY id LIMIT :n"), conn, params={"n": n})
+            arts = hydrate(conn, arts, ("summary",))
+        if arts.empty:
+            break
+
+        sigs = {}
+        buckets = []
+        for aid, title, summary in arts[["id", "title", "summary"]].itertuples(index=False):
+            sig = minhash(f"{title or ''} {summary or ''}")
+            aid = int(aid)
+            sigs[aid] = sig
+            if sig is not None:
+                buckets.extend((b, key, aid) for b, key in enumerate(band_buckets(sig)))
+
+        with engine.begin() as conn:
+            if buckets:
+                conn.execute(ArticleLshBucket.__table__.insert(),
+                             [{"band": b, "bucket": k, "article_id": a} for b, k, a in buckets])
+                # Connection-private staging table, so concurrent runs do not share it
+                new_buckets = Table("_new_buckets", MetaData(), Column("band", Integer),
+                                    Column("bucket", BigInteger), Column("article_id", Integer),
+                                    prefixes=["TEMPORARY"])
+                new_buckets.create(conn)
+                conn.execute(new_buckets.insert(),
+                             [{"band": b, "bucket": k, "article_id": a} for b, k, a in buckets])
+                # Older articles sharing at least one band, ranked by number of shared bands.
+                # Each band reads at most BUCKET_FANOUT of its bucket's oldest members through
+                # the (band, bucket, article_id) key, so a hot bucket (boilerplate summaries)
+                # costs the same as a small one. The oldest members hold the cluster roots
+                # a duplicate joins.
+                pairs = pd.read_sql(text("""
+                    SELECT n.article_id, l.article_id AS candidate, COUNT(*) AS shared
+                    FROM _new_buckets n
+                    JOIN article_lsh l ON l.band = n.band AND l.bucket = n.bucket
+                                      AND l.article_id IN (
+                                          SELECT h.article_id FROM article_lsh h
+                                          WHERE h.band = n.band AND h.bucket = n.bucket
+                                            AND h.article_id < n.article_id
+                                          ORDER BY h.article_id LIMIT :fanout)
+                    GROUP BY n.article_id, l.article_id
+                """), conn, params={"fanout": BUCKET_FANOUT})
+                new_buckets.drop(conn)
+            else:
+                pairs = pd.DataFrame(columns=["article_id", "candidate", "shared"])
+
+            pairs = (pairs.sort_values(["article_id", "shared", "candidate"], ascending=[True, False, False])
+                          .groupby("article_id").head(MAX_CANDIDATES))
+
+            # Signatures and clusters of candidates from earlier chunks
+            old_ids = sorted(set(int(c) for c in pairs["candidate"]) - set(sigs))
+            known = {}
+            for i in range(0, len(old_ids), 500):
+                part = old_ids[i:i + 500]
+                rows = conn.execute(
+                    text("SELECT article_id, signature, cluster_id FROM article_minhash "
+                         f"WHERE article_id IN ({','.join(str(x) for x in part)})")).fetchall()
+                for aid, blob, cid in rows:
+                    known[int(aid)] = (np.frombuffer(blob, dtype=np.uint32), int(cid))
+
+            cands = pairs.groupby("article_id")["candidate"].apply(list).to_dict()
+            out = []
+            for aid in sorted(sigs):
+                sig = sigs[aid]
+                cluster = aid
+                for c in cands.get(aid, []):
+                    c_sig, c_cluster = known.get(int(c), (None, None))
+                    if c_sig is not None and _similarity(sig, c_sig) >= threshold:
+                        cluster = min(cluster, c_cluster)
+                if cluster != aid:
+                    duplicates += 1
+                if sig is not None:
+                    known[aid] = (sig, cluster)
+                out.append({"article_id": aid, "cluster_id": cluster,
+                            "signature": sig.tobytes() if sig is not None else b""})
+            conn.execute(ArticleMinhash.__table__.insert(), out)
+
+        processed += len(arts)
+
+    print(f"dedup_articles: processed {processed} article(s), {duplicates} near-duplicate(s)")
+
+
+if __name__ == "__main__":
+    run()
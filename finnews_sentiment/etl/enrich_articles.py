@@ -1,11 +1,13 @@
 # finnews_sentiment/etl/enrich_articles.py
 import re
-import unicodedata
 import yaml
 from contextlib import closing
-from typing import Dict, Iterable, List
-from sqlalchemy import select, or_
-from ..db import SessionLocal, Article
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import delete, insert, select, or_, update
+from ..db import SessionLocal, get_engine, Article, ArticleMention, ArticleSearchText
+from .. import search_text
+
+_ID_CHUNK = 900   # stays under SQLite's bound-parameter limit
 
 
 def load_tickers(cfg_path: str = "configs/tickers.yaml") -> dict:
@@ -15,21 +17,8 @@ def load_tickers(cfg_path: str = "configs/tickers.yaml") -> dict:
 
 
 def _normalize_text(s: str) -> str:
-    """
-    Normalize article text:
-      - NFC normalize
-      - lowercase
-      - unify quotes/dashes
-      - collapse whitespace
-    """
-    s = s or ""
-    s = unicodedata.normalize("NFC", s)
-    s = s.replace("’", "'").replace("‘", "'").replace("”", '"').replace("“", '"')
-    s = s.replace("\u2013", "-").replace("\u2014", "-")  # en/em dashes -> hyphen
-    s = s.lower()
-    # collapse whitespace
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    """Lowercased search_text.normalize (NFC, unified quotes/dashes, collapsed whitespace)."""
+    return search_text.normalize(s).lower()
 
 
 def _name_to_regex(name: str) -> str:
@@ -94,7 +83,12 @@ def _compile_patterns(universe: Iterable[str],
 def _find_tickers_in_text(text: str, universe: Iterable[str],
                           patterns: Dict[str, List[re.Pattern]]) -> List[str]:
     """Return sorted unique tickers found in the given text."""
-    text = _normalize_text(text)
+    return _match_tickers(_normalize_text(text), universe, patterns)
+
+
+def _match_tickers(text: str, universe: Iterable[str],
+                   patterns: Dict[str, List[re.Pattern]]) -> List[str]:
+    """Sorted unique tickers found in already normalized text (patterns are case-insensitive)."""
     hits = set()
     for t in universe:
         pats = patterns.get(t, [])
@@ -103,20 +97,52 @@ def _find_tickers_in_text(text: str, universe: Iterable[str],
     return sorted(hits)
 
 
+def _match_spans(text: str, universe: Iterable[str],
+                 patterns: Dict[str, List[re.Pattern]]) -> Dict[str, List[Tuple[int, int]]]:
+    """{ticker: sorted (start, stop) of every match} in already normalized text, longest match per start."""
+    spans = {}
+    for t in universe:
+        hits = {}
+        for p in patterns.get(t, []):
+            for m in p.finditer(text):
+                hits[m.start()] = max(hits.get(m.start(), 0), m.end())
+        if hits:
+            spans[t] = sorted(hits.items())
+    return spans
+
+
+def _mention_rows(art_id: int, head: str, spans: Dict[str, List[Tuple[int, int]]]) -> List[dict]:
+    """article_mentions rows; spans past the head (matched as head + " " + body) go to the body."""
+    rows = []
+    body_at = len(head) + 1
+    for t, hits in spans.items():
+        for start, stop in hits:
+            field, shift = ("head", 0) if start < len(head) else ("body", body_at)
+            rows.append({"article_id": art_id, "ticker": t, "field": field, "start": start - shift,
+                         "stop": stop - shift, "version": search_text.VERSION})
+    return rows
+
+
 def run(cfg_path: str = "configs/tickers.yaml",
         only_missing: bool = True,
         use_body_text: bool = True,
         batch_commit_every: int = 0,
-        limit: int | None = None) -> None:
+        limit: int | None = None,
+        id_range: tuple[int, int] | None = None) -> None:
     """
-    Enrich articles with tickers by regex search over title/summary/(optional)text.
+    Enrich articles with tickers by regex search over title/summary/(optional)text,
+    read from article_search_text (refreshed first for the articles in scope).
+    Where each ticker matched is written to article_mentions for every
+    processed article, for entity-level sentiment.
 
     Params
     ------
     cfg_path : str
         Path to YAML config containing `universe`, `map`, `aliases`.
     only_missing : bool
-        If True (default), process only articles where `tickers` is NULL/empty.
+        If True (default), process only articles where `tickers` is NULL/empty,
+        or whose spans in article_mentions predate the current
+        search_text.VERSION (their text was renormalized, so they are re-matched).
     use_body_text : bool
         If True, include `Article.text` in matching (in addition to title+summary).
     batch_commit_every : int
@@ -124,6 +150,8 @@ def run(cfg_path: str = "configs/tickers.yaml",
         If 0, commit once at the end.
     limit : Optional[int]
         If set, limit number of articles processed (useful for smoke tests).
+    id_range : Optional[tuple[int, int]]
+        If set, only articles with lo <= id <= hi (one work-queue unit).
     """
     cfg = load_tickers(cfg_path)
     universe = cfg.get("universe", []) or []
@@ -131,42 +159,56 @@ def run(cfg_path: str = "configs/tickers.yaml",
     alias_map = cfg.get("aliases", {}) or {}
 
     patterns = _compile_patterns(universe, name_map, alias_map)
+    # Normalized text is computed once per article (and again only when the rules change)
+    search_text.refresh(id_range=id_range)
+    ArticleMention.__table__.create(get_engine(), checkfirst=True)
 
-    updated = 0
+    updates = []
+    mentions = []
+    processed_ids = []
     processed = 0
 
     with closing(SessionLocal()) as sess:
-        q = select(Article)
+        q = (select(Article.id, Article.tickers, ArticleSearchText.head, ArticleSearchText.body)
+             .join(ArticleSearchText, ArticleSearchText.article_id == Article.id))
         if only_missing:
-            q = q.where(or_(Article.tickers == None, Article.tickers == ""))  # noqa: E711
+            current = (select(ArticleMention.article_id)
+                       .where(ArticleMention.article_id == Article.id,
+                              ArticleMention.version == search_text.VERSION).exists())
+            q = q.where(or_(Article.tickers == None, Article.tickers == "", ~current))  # noqa: E711
+
+        if id_range is not None:
+            q = q.where(Article.id.between(*id_range))
 
         if limit and limit > 0:
             q = q.limit(limit)
 
-        articles = sess.scalars(q).all()
-
-        for art in articles:
+        for art_id, tickers, head, body in sess.execute(q).all():
             processed += 1
-            # Build searchable text
-            parts = [art.title or "", art.summary or ""]
-            if use_body_text:
-                parts.append(art.text or "")
-            search_text = " ".join(parts)
-
-            found = _find_tickers_in_text(search_text, universe, patterns)
+            processed_ids.append(art_id)
+            text = f"{head} {body}" if use_body_text and body else head
+            spans = _match_spans(text, universe, patterns)
+            mentions.extend(_mention_rows(art_id, head, spans))
+            found = sorted(spans)
             new_val = ",".join(found) if found else ""
 
             # Update only if changed
-            if new_val != (art.tickers or ""):
-                art.tickers = new_val
-                sess.add(art)
-                updated += 1
-
-                if batch_commit_every and (updated % batch_commit_every == 0):
-                    sess.commit()
-
-        # final commit
+            if new_val != (tickers or ""):
+                updates.append({"id": art_id, "tickers": new_val})
+
+        # ORM bulk UPDATE by primary key, committed every batch_commit_every rows (or once)
+        step = batch_commit_every or len(updates) or 1
+        for i in range(0, len(updates), step):
+            sess.execute(update(Article), updates[i:i + step])
+            sess.commit()
+
+        # Replace the spans of every processed article (they can move even if the tickers did not)
+        for i in range(0, len(processed_ids), _ID_CHUNK):
+            sess.execute(delete(ArticleMention).where(ArticleMention.article_id.in_(processed_ids[i:i + _ID_CHUNK])))
+        if mentions:
+            sess.execute(insert(ArticleMention), mentions)
         sess.commit()
+    updated = len(updates)
 
     print(f" Enriched {updated} / {processed} articles with tickers (regex + aliases)")
 
@@ -1,9 +1,10 @@
 import yaml
-import yfinance as yf
 import pandas as pd
-import math
+import numpy as np
 from datetime import datetime, timedelta
-from ..db import SessionLocal, Price
+from ..db import get_engine, Price
+from .. import price_store
+from .import_prices import clean_chunk, write_prices
 
 
 def load_tickers(cfg_path: str = "configs/tickers.yaml"):
@@ -12,34 +13,6 @@ def load_tickers(cfg_path: str = "configs/tickers.yaml"):
         return yaml.safe_load(f)
 
 
-def _to_float(x, default=None):
-    """
-    Safely convert a value (numpy scalar, pandas element, etc.) to float.
-    If the value is NaN or None, return the provided default.
-    """
-    try:
-        val = x.item() if hasattr(x, "item") else x
-        if val is None or (isinstance(val, float) and math.isnan(val)):
-            return default
-        return float(val)
-    except Exception:
-        return default
-
-
-def _to_int(x, default=0):
-    """
-    Safely convert a value to int, with fallback.
-    Useful because Pandas may return NaN or numpy.int64 objects.
-    """
-    f = _to_float(x, default=None)
-    if f is None:
-        return default
-    try:
-        return int(f)
-    except Exception:
-        return default
-
-
 def _normalize_df(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
     """
     Normalize Yahoo Finance dataframe structure.
@@ -76,16 +49,39 @@ def _normalize_df(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
     raise ValueError(f"Unexpected columns for {ticker}: {df.columns}")
 
 
-def run(cfg_path: str = "configs/tickers.yaml", lookback_days: int = 365):
+def download_yahoo(ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+    """Daily OHLCV for one ticker from Yahoo Finance (the default downloader)."""
+    import yfinance as yf
+
+    return yf.download(
+        ticker,
+        start=start,
+        end=end,
+        auto_adjust=False,   # keep Adj Close column
+        actions=False,       # skip dividends/splits
+        group_by="column",   # return flat columns if possible
+        progress=False,
+    )
+
+
+def run(cfg_path: str = "configs/tickers.yaml", lookback_days: int = 365,
+        tickers: list[str] | None = None, refresh_store: bool = True, download=None):
     """
     Fetch historical prices for tickers listed in configs/tickers.yaml
-    and insert them into the 'prices' table.
+    (or just `tickers`) and upsert them into the 'prices' table (one bulk
+    write per ticker, so re-fetching is idempotent).
+
+    `download(ticker, start, end)` returns a yfinance-shaped frame (Date
+    index, Open/High/Low/Close/Adj Close/Volume); default download_yahoo.
+    The soak test passes a local stand-in. Returns the number of rows upserted.
     """
-    sess = SessionLocal()
+    download = download or download_yahoo
+    engine = get_engine()
+    Price.__table__.create(engine, checkfirst=True)
 
     # Load ticker configuration (universe and mappings)
-    tickers_cfg = load_tickers(cfg_path)
-    tickers = tickers_cfg.get("universe", [])
+    if tickers is None:
+        tickers = load_tickers(cfg_path).get("universe", [])
 
     # Define date range: lookback_days into the past up to today
     start = datetime.today() - timedelta(days=lookback_days)
@@ -94,18 +90,10 @@ def run(cfg_path: str = "configs/tickers.yaml", lookback_days: int = 365):
     total_inserted = 0
 
     for t in tickers:
-        print(f"Fetching {t} from Yahoo Finance...")
-
-        # Download daily OHLCV data from Yahoo
-        df = yf.download(
-            t,
-            start=start,
-            end=end,
-            auto_adjust=False,   # keep Adj Close column
-            actions=False,       # skip dividends/splits
-            group_by="column",   # return flat columns if possible
-            progress=False,
-        )
+        print(f"Fetching {t}...")
+
+        # Download daily OHLCV data
+        df = download(t, start, end)
         if df.empty:
             print(f"No data for {t}, skipping.")
             continue
@@ -123,52 +111,32 @@ def run(cfg_path: str = "configs/tickers.yaml", lookback_days: int = 365):
             print(f"Missing expected columns for {t}: have {list(df.columns)}")
             continue
 
-        has_adj = "Adj Close" in df.columns
-        first_error_printed = False
-
-        # Iterate through each row (daily data)
-        for date, row in df.iterrows():
-            open_ = _to_float(row.get("Open"), default=None)
-            high_ = _to_float(row.get("High"), default=None)
-            low_  = _to_float(row.get("Low"), default=None)
-            close_ = _to_float(row.get("Close"), default=None)
-            adj_close_ = _to_float(row.get("Adj Close"), default=None) if has_adj else None
-            volume_ = _to_int(row.get("Volume"), default=0)
-
-            # If critical fields are missing, skip this row
-            if open_ is None or high_ is None or low_ is None or close_ is None:
-                if not first_error_printed:
-                    print(f"Skipping {t} {date.date()} due to missing OHLC values")
-                    first_error_printed = True
-                continue
-
-            # If Adj Close is missing, use Close as fallback
-            if adj_close_ is None:
-                adj_close_ = close_
-
-            # insert price record into DB
-            price = Price(
-                ticker=t,
-                date=date.to_pydatetime(),
-                open=open_,
-                high=high_,
-                low=low_,
-                close=close_,
-                adj_close=adj_close_,
-                volume=volume_,
-            )
-            try:
-                sess.add(price)
-                sess.commit()
-                total_inserted += 1
-            except Exception as e:
-                # Roll back if unique constraint or other DB error
-                sess.rollback()
-                if not first_error_printed:
-                    print(f"Insert failed for {t} {date.date()}: {e}")
-                    first_error_printed = True
-
-    print(f"fetch_prices: inserted {total_inserted} rows into prices")
+        # Map onto the prices schema and validate/upsert the whole frame at once
+        frame = pd.DataFrame({
+            "ticker": t,
+            "date": df.index,
+            "open": df["Open"].to_numpy(),
+            "high": df["High"].to_numpy(),
+            "low": df["Low"].to_numpy(),
+            "close": df["Close"].to_numpy(),
+            "adj_close": df["Adj Close"].to_numpy() if "Adj Close" in df.columns else np.nan,
+            "volume": df["Volume"].to_numpy(),
+        })
+        clean, skipped = clean_chunk(frame)
+        if skipped:
+            print(f"Skipping {skipped} rows for {t} due to missing or invalid OHLC values")
+        try:
+            with engine.begin() as conn:
+                total_inserted += write_prices(conn, clean)
+        except Exception as e:
+            print(f"Upsert failed for {t}: {e}")
+
+    print(f"fetch_prices: upserted {total_inserted} rows into prices")
+
+    # Keep the columnar price cache in sync with the table
+    if refresh_store:
+        price_store.refresh()
+    return total_inserted
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+# finnews_sentiment/etl/import_bars.py
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .. import bar_store
+from .import_prices import REQUIRED, _iter_file, clean_chunk
+
+
+def _to_utc(ts: pd.Series, tz: str) -> pd.Series:
+    """Parse bar timestamps to naive UTC. Naive vendor times are taken to be in `tz`."""
+    # Vendor files are almost always ISO 8601, which parses much faster than format="mixed"
+    parsed = pd.to_datetime(ts, errors="coerce", format="ISO8601")
+    if parsed.isna().sum() > ts.isna().sum():
+        parsed = pd.to_datetime(ts, errors="coerce", format="mixed")
+    if parsed.dtype == object:   # mixed UTC offsets
+        parsed = pd.to_datetime(ts, errors="coerce", format="mixed", utc=True)
+    if getattr(parsed.dt, "tz", None) is None:
+        if tz == "UTC":
+            return parsed
+        parsed = parsed.dt.tz_localize(tz, ambiguous="NaT", nonexistent="NaT")
+    return parsed.dt.tz_convert("UTC").dt.tz_localize(None)
+
+
+def run(paths, freq: str = "1m", tz: str = "UTC", chunk_size: int = 500_000,
+        columns: dict | None = None, ticker: str | None = None, fmt: str | None = None) -> int:
+    """
+    Import intraday bars from vendor CSV/Parquet files into data/bars/<freq>/.
+
+    Files are streamed in chunks (same column aliases and validation as
+    import_prices, without truncating timestamps to the day), spooled per
+    month and merged into the month files once at the end. `tz` is the
+    timezone of naive vendor timestamps; bars are stored in naive UTC.
+    Returns the number of bars staged.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    total = rejected = 0
+    t0 = time.perf_counter()
+    for path in map(Path, paths):
+        if not path.exists():
+            print(f"import_bars: missing file {path}, skipping")
+            continue
+        fmt_ = fmt or ("parquet" if path.suffix.lower() in (".parquet", ".pq") else "csv")
+        for df, mapping in _iter_file(path, chunk_size, fmt_, columns):
+            missing = set(REQUIRED) - set(mapping.values()) - ({"ticker"} if ticker else set())
+            if missing:
+                print(f"import_bars: {path} has no column for {sorted(missing)}, skipping")
+                break
+            if ticker and "ticker" not in df:
+                df["ticker"] = ticker
+            df["date"] = _to_utc(df["date"], tz)
+            clean, bad = clean_chunk(df, daily=False)
+            bar_store.stage_bars(clean.rename(columns={"date": "ts"}), freq)
+            total += len(clean)
+            rejected += bad
+        elapsed = time.perf_counter() - t0
+        print(f"  {path.name}: {total} bars staged ({total / max(elapsed, 1e-9):,.0f} bars/s)")
+
+    bar_store.compact(freq)
+    elapsed = time.perf_counter() - t0
+    print(f"import_bars: {total} bars, rejected {rejected}, {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} bars/s)")
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import intraday bars from vendor CSV/Parquet files")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--freq", default="1m", help="bar size label, e.g. 1m or 5m")
+    parser.add_argument("--tz", default="UTC", help="timezone of naive vendor timestamps")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    args = parser.parse_args()
+    run(args.paths, freq=args.freq, tz=args.tz, chunk_size=args.chunk_size)
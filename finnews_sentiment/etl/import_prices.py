@@ -0,0 +1,168 @@
+# finnews_sentiment/etl/import_prices.py
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..db import get_engine, Price, upsert_frame
+from .. import price_store
+
+PRICE_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "adj_close", "volume"]
+REQUIRED = ["ticker", "date", "open", "high", "low", "close"]
+
+# Vendor header (lowercased, without spaces/underscores/dots) -> prices column
+COLUMN_ALIASES = {
+    "ticker": "ticker", "symbol": "ticker", "sym": "ticker", "code": "ticker",
+    "date": "date", "tradedate": "date", "timestamp": "date", "datetime": "date",
+    "open": "open", "o": "open",
+    "high": "high", "h": "high",
+    "low": "low", "l": "low",
+    "close": "close", "c": "close", "last": "close",
+    "adjclose": "adj_close", "adjustedclose": "adj_close", "closeadj": "adj_close",
+    "volume": "volume", "vol": "volume", "v": "volume",
+}
+
+
+def _alias_key(name: str) -> str:
+    return "".join(ch for ch in str(name).lower() if ch not in " _-.")
+
+
+def column_mapping(columns, overrides: dict | None = None) -> dict:
+    """
+    Map vendor column names onto the prices schema. `overrides` maps vendor
+    names to schema names explicitly and wins over the built-in aliases.
+    Columns that map to nothing are dropped.
+    """
+    overrides = overrides or {}
+    mapping = {}
+    for col in columns:
+        target = overrides.get(col) or COLUMN_ALIASES.get(_alias_key(col))
+        if target in PRICE_COLUMNS and target not in mapping.values():
+            mapping[col] = target
+    return mapping
+
+
+def clean_chunk(df: pd.DataFrame, daily: bool = True) -> tuple[pd.DataFrame, int]:
+    """
+    Vectorized validation of a chunk already in schema columns.
+
+    Tickers are stripped, dates parsed (and truncated to the day if daily), prices
+    coerced to float. Rows with a missing ticker/date/OHLC, negative prices
+    or high < low are rejected. A missing adj_close falls back to close and a
+    missing volume to 0, as in fetch_prices. Returns (clean rows, rejected).
+    """
+    out = pd.DataFrame(index=df.index)
+    out["ticker"] = df["ticker"].astype("string").str.strip()
+    dates = pd.to_datetime(df["date"], errors="coerce", format="mixed")
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    out["date"] = dates.dt.normalize() if daily else dates
+    for c in ("open", "high", "low", "close"):
+        out[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    if "adj_close" in df:
+        out["adj_close"] = pd.to_numeric(df["adj_close"], errors="coerce").astype("float64").fillna(out["close"])
+    else:
+        out["adj_close"] = out["close"]
+    if "volume" in df:
+        out["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).round().astype("int64")
+    else:
+        out["volume"] = np.int64(0)
+
+    ok = out[REQUIRED].notna().all(axis=1) & (out["ticker"] != "")
+    ok &= (out[["open", "high", "low", "close"]] >= 0).all(axis=1) & (out["high"] >= out["low"])
+    ok = ok.fillna(False).astype(bool)
+    clean = out[ok]
+    # A vendor file can repeat a (ticker, date); the last row wins, like the upsert would
+    clean = clean.drop_duplicates(["ticker", "date"], keep="last")
+    return clean, int((~ok).sum())
+
+
+def _iter_file(path: Path, chunk_size: int, fmt: str, columns: dict | None):
+    """
+    Yield (chunk in schema columns, mapping) from a CSV or Parquet file, at
+    most chunk_size rows at a time. Only mapped vendor columns are read.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        mapping = column_mapping(pf.schema_arrow.names, columns)
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=list(mapping)):
+            yield batch.to_pandas().rename(columns=mapping), mapping
+    else:
+        mapping = column_mapping(pd.read_csv(path, nrows=0).columns, columns)
+        # Symbols stay strings (leading zeros, "TRUE", ...); numbers are parsed by the C reader
+        dtype = {src: str for src, dst in mapping.items() if dst in ("ticker", "date")}
+        for raw in pd.read_csv(path, chunksize=chunk_size, usecols=list(mapping), dtype=dtype):
+            yield raw.rename(columns=mapping), mapping
+
+
+def write_prices(conn, df: pd.DataFrame) -> int:
+    """Upsert clean rows (schema columns) into `prices` on (ticker, date)."""
+    return upsert_frame(conn, Price.__table__, df[PRICE_COLUMNS], ["ticker", "date"])
+
+
+def run(paths, chunk_size: int = 200_000, columns: dict | None = None, ticker: str | None = None,
+        fmt: str | None = None, refresh_store: bool = True) -> int:
+    """
+    Import end-of-day prices from vendor CSV/Parquet files into `prices`.
+
+    Each file is streamed in chunks of `chunk_size` rows, so memory stays flat
+    regardless of file size. Vendor columns are mapped with COLUMN_ALIASES
+    (plus `columns` overrides); `ticker` fills the symbol for single-ticker
+    files. Every chunk is validated and upserted in its own transaction, so
+    re-importing a file is idempotent and corrected rows overwrite old ones.
+    Returns the number of rows written.
+    """
+    engine = get_engine()
+    Price.__table__.create(engine, checkfirst=True)
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    total = rejected = 0
+    t0 = time.perf_counter()
+    for path in map(Path, paths):
+        if not path.exists():
+            print(f"import_prices: missing file {path}, skipping")
+            continue
+        written_file = 0
+        fmt_ = fmt or ("parquet" if path.suffix.lower() in (".parquet", ".pq") else "csv")
+        for df, mapping in _iter_file(path, chunk_size, fmt_, columns):
+            missing = set(REQUIRED) - set(mapping.values()) - ({"ticker"} if ticker else set())
+            if missing:
+                print(f"import_prices: {path} has no column for {sorted(missing)}, skipping")
+                break
+            if ticker and "ticker" not in df:
+                df["ticker"] = ticker
+            clean, bad = clean_chunk(df)
+            with engine.begin() as conn:
+                written_file += write_prices(conn, clean)
+            rejected += bad
+            elapsed = time.perf_counter() - t0
+            print(f"  {path.name}: {written_file} rows ({(total + written_file) / max(elapsed, 1e-9):,.0f} rows/s)")
+        total += written_file
+
+    elapsed = time.perf_counter() - t0
+    print(f"import_prices: wrote {total} rows, rejected {rejected}, "
+          f"{elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if refresh_store and total:
+        price_store.refresh()
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from ..cli import vendor_column
+
+    parser = argparse.ArgumentParser(description="Import prices from vendor CSV/Parquet files")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--column", action="append", default=[], type=vendor_column, metavar="VENDOR=FIELD",
+                        help="map a vendor column onto a prices field, e.g. --column PX_LAST=close")
+    parser.add_argument("--ticker", default=None, help="symbol for single-ticker files")
+    parser.add_argument("--format", choices=("csv", "parquet"), default=None, help="default: from the file suffix")
+    args = parser.parse_args()
+    run(args.paths, chunk_size=args.chunk_size, columns=dict(args.column), ticker=args.ticker, fmt=args.format)
@@ -16,50 +16,62 @@ def _parse_time(entry) -> datetime:
     return datetime.utcnow()
 
 
+def ingest_feed(sess, name: str, url: str) -> int:
+    """
+    Parse one feed and add its entries. Entries whose URL is already stored
+    are skipped, so a feed can be ingested again safely. Returns the number
+    of new articles.
+    """
+    inserted = 0
+
+    # Get and parse the feed
+    feed = feedparser.parse(url)
+
+    # From each entry, create an Article object
+    for e in feed.entries:
+        art = Article(
+            source=name,
+            url=getattr(e, "link", "")[:1024],
+            title=getattr(e, "title", "")[:1024],
+            published_at=_parse_time(e),
+            author=getattr(e, "author", "")[:256],
+            summary=getattr(e, "summary", ""),
+            text="",      # Fill later with full text
+            tickers="",   # Fill later with ticker extraction
+        )
+
+        # Try to insert; if URL already exists, rollback
+        try:
+            sess.add(art)
+            sess.commit()
+            inserted += 1
+        except Exception:
+            sess.rollback()
+    return inserted
+
+
+def load_sources(config_path: str = "configs/sources.yaml") -> list[dict]:
+    """RSS sources ({name, url}) from the config file."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get("rss", [])
+
+
 def run(config_path: str = "configs/sources.yaml", rate_limit_sec: float = 0.3) -> None:
     """Read sources from config file, parse feeds and add to DB. Duplicate URLs are ignored."""
 
     # First open the db session
     sess = SessionLocal()
 
-    # Read the config file
-    with open(config_path, "r", encoding="utf-8") as f:
-        sources = yaml.safe_load(f)
-
     total_inserted = 0
 
     # Loop over sources
-    for src in sources.get("rss", []):
-        name = src["name"]
-        url = src["url"]
-
-        # Get and parse the feed
-        feed = feedparser.parse(url)
-
-        # From each entry, create an Article object
-        for e in feed.entries:
-            art = Article(
-                source=name,
-                url=getattr(e, "link", "")[:1024],
-                title=getattr(e, "title", "")[:1024],
-                published_at=_parse_time(e),
-                author=getattr(e, "author", "")[:256],
-                summary=getattr(e, "summary", ""),
-                text="",      # Fill later with full text
-                tickers="",   # Fill later with ticker extraction
-            )
-
-            # Try to insert; if URL already exists, rollback
-            try:
-                sess.add(art)
-                sess.commit()
-                total_inserted += 1
-            except Exception:
-                sess.rollback()
+    for src in load_sources(config_path):
+        total_inserted += ingest_feed(sess, src["name"], src["url"])
 
         # Rate limiting
         time.sleep(rate_limit_sec)
 
+    sess.close()
     print(f"Inserted {total_inserted} new articles from RSS feeds")
 
 
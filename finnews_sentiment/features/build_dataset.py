@@ -1,8 +1,34 @@
 # finnews_sentiment/features/build_dataset.py
+import os
 import sqlite3
 import pandas as pd
-
-DB_PATH = "data/finnews.db"
+import pyarrow as pa
+
+from .. import price_store
+from ..archive import hydrate
+from ..etl.dedup_articles import DUPLICATE_FILTER_SQL
+from ..settings import sqlite_path
+
+OUT_PATH = "data/dataset.parquet"
+
+# Fixed output schema so in-memory and streamed builds write identical files
+DATASET_SCHEMA = pa.schema([
+    ("article_id", pa.int64()),
+    ("ticker", pa.string()),
+    ("title", pa.string()),
+    ("summary", pa.string()),
+    ("published_at", pa.timestamp("ns")),
+    ("p0_date", pa.timestamp("ns")),
+    ("p1_date", pa.timestamp("ns")),
+    ("p2_date", pa.timestamp("ns")),
+    ("p5_date", pa.timestamp("ns")),
+    ("ret_1d", pa.float64()),
+    ("ret_2d", pa.float64()),
+    ("ret_5d", pa.float64()),
+])
+
+# Timestamps written by different tools use different string formats
+PARSE_DATES = {"published_at": {"format": "mixed"}}
 
 def _ret_forward(df_t, pub_date, days_ahead):
     """
@@ -35,54 +61,33 @@ def _ret_forward(df_t, pub_date, days_ahead):
     return (pN - p0) / p0, p0_date, pN_date
 
 
-def build_dataset():
-    conn = sqlite3.connect(DB_PATH)
+def _articles_sql(dedupe: bool) -> str:
+    """Articles in (published_at, id) order, the order rows are emitted in."""
+    sql = "SELECT id, title, summary, tickers, published_at FROM articles"
+    if dedupe:
+        sql += f" WHERE {DUPLICATE_FILTER_SQL}"
+    return sql + " ORDER BY published_at, id"
 
-    articles = pd.read_sql(
-        "SELECT id, title, summary, tickers, published_at FROM articles",
-        conn,
-        parse_dates=["published_at"],
-    )
-    prices = pd.read_sql(
-        "SELECT ticker, date, close FROM prices",
-        conn,
-        parse_dates=["date"],
-    )
-    conn.close()
 
-    if articles.empty or prices.empty:
-        print("No data: 'articles' or 'prices' table is empty")
-        return pd.DataFrame()
-
-    # Drop articles with missing timestamp
-    missing_ts = articles["published_at"].isna().sum()
-    if missing_ts:
-        print(f"Dropping {missing_ts} articles with missing published_at")
-        articles = articles.dropna(subset=["published_at"])
-
-    # Sort, then we'll make per-ticker views with DatetimeIndex
-    prices = prices.sort_values(["ticker", "date"]).reset_index(drop=True)
-
-    rows = []
-
-    for _, art in articles.iterrows():
-        tickers_str = (art.get("tickers") or "").strip()
+def _article_rows(articles, store, ticker_frames):
+    """Yield one output row per (article, ticker) that has at least one forward return."""
+    for art in articles.itertuples(index=False):
+        tickers_str = (art.tickers or "").strip()
         if not tickers_str:
             continue
 
-        pub_dt = pd.to_datetime(art["published_at"], errors="coerce")
+        pub_dt = pd.to_datetime(art.published_at, errors="coerce")
         if pd.isna(pub_dt):
             continue
         pub_date = pub_dt.normalize()
 
         for t in [x.strip() for x in tickers_str.split(",") if x.strip()]:
-            df_t = prices.loc[prices["ticker"] == t].copy()
+            if t not in ticker_frames:
+                ticker_frames[t] = store.ticker_frame(t, columns=("close",))
+            df_t = ticker_frames[t]
             if df_t.empty:
                 continue
 
-            # IMPORTANT: set index to date for label-based slicing
-            df_t = df_t.set_index("date").sort_index()
-
             ret_1d, p0d, p1d = _ret_forward(df_t, pub_date, 1)
             ret_2d, _p0d2, p2d = _ret_forward(df_t, pub_date, 2)
             ret_5d, _p0d5, p5d = _ret_forward(df_t, pub_date, 5)
@@ -91,11 +96,11 @@ def build_dataset():
             if ret_1d is None and ret_2d is None and ret_5d is None:
                 continue
 
-            rows.append({
-                "article_id": int(art["id"]),
+            yield {
+                "article_id": int(art.id),
                 "ticker": t,
-                "title": art["title"],
-                "summary": art["summary"],
+                "title": art.title,
+                "summary": art.summary,
                 "published_at": pub_dt,
                 "p0_date": p0d,
                 "p1_date": p1d,
@@ -104,13 +109,67 @@ def build_dataset():
                 "ret_1d": ret_1d,
                 "ret_2d": ret_2d,
                 "ret_5d": ret_5d,
-            })
+            }
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(df[DATASET_SCHEMA.names], schema=DATASET_SCHEMA, preserve_index=False)
+
+
+def save_dataset(df: pd.DataFrame, out_path: str = OUT_PATH) -> None:
+    """Write an in-memory dataset with the fixed schema."""
+    import pyarrow.parquet as pq
+    pq.write_table(_to_table(df), out_path)
+
+
+def build_dataset(dedupe: bool = False, backend: str = "pandas"):
+    """
+    Join tagged articles with forward returns (1d/2d/5d) per ticker.
+    With dedupe=True only one representative per near-duplicate cluster is used.
+    backend="duckdb" runs the same build as set-based DuckDB queries
+    (see features.duckdb_backend).
+    """
+    if backend == "duckdb":
+        from .duckdb_backend import build_dataset as build_dataset_duckdb
+        dataset = build_dataset_duckdb(sqlite_path(), dedupe=dedupe)
+        print(f"Built dataset with {len(dataset)} rows")
+        return dataset
+    if backend != "pandas":
+        raise ValueError(f"Unknown backend {backend!r}, expected 'pandas' or 'duckdb'")
+
+    conn = sqlite3.connect(sqlite_path())
+
+    articles = pd.read_sql(
+        _articles_sql(dedupe),
+        conn,
+        parse_dates=PARSE_DATES,
+    )
+    articles = hydrate(conn, articles, ("summary",))
+    conn.close()
+
+    # Prices come from the memory-mapped columnar store (rebuilt if stale)
+    store = price_store.open_store()
+
+    if articles.empty or len(store) == 0:
+        print("No data: 'articles' or 'prices' table is empty")
+        return pd.DataFrame()
+
+    # Drop articles with missing timestamp
+    missing_ts = articles["published_at"].isna().sum()
+    if missing_ts:
+        print(f"Dropping {missing_ts} articles with missing published_at")
+        articles = articles.dropna(subset=["published_at"])
+
+    # Per-ticker views with DatetimeIndex, backed by the mmap'd arrays
+    ticker_frames = {}
+    rows = list(_article_rows(articles, store, ticker_frames))
 
     if not rows:
         print("No matches produced. Quick diagnostics:")
         has_tickers = (articles["tickers"].fillna("") != "").sum()
         print(f" - Articles with tickers: {has_tickers} / {len(articles)}")
-        print(f" - Prices date range: {prices['date'].min().date()} → {prices['date'].max().date()}")
+        price_dates = pd.to_datetime(store.column("date"))
+        print(f" - Prices date range: {price_dates.min().date()} → {price_dates.max().date()}")
         print(f" - Articles published range: {articles['published_at'].min().date()} → {articles['published_at'].max().date()}")
         ex = (articles.loc[articles["tickers"].fillna("") != ""]
                     .sort_values("published_at", ascending=False).head(3))
@@ -120,17 +179,60 @@ def build_dataset():
                 print(f"   • id={r['id']}  date={r['published_at'].date()}  tickers={r['tickers']}  title={(r['title'] or '')[:60]}")
         return pd.DataFrame()
 
-    dataset = (pd.DataFrame(rows)
-                 .sort_values(["ticker", "published_at"])
-                 .reset_index(drop=True))
+    # Rows are already in (published_at, article_id) order
+    dataset = pd.DataFrame(rows)
     print(f"Built dataset with {len(dataset)} rows")
     return dataset
 
 
+def write_dataset(out_path: str = OUT_PATH, chunk_size: int = 20_000, dedupe: bool = False) -> int:
+    """
+    Streaming build: read articles in (published_at, id) order, `chunk_size`
+    at a time, and append each chunk's rows as a row group through a
+    pyarrow ParquetWriter. Peak memory depends on chunk_size, not on the
+    corpus; the rows and schema match build_dataset() + save_dataset().
+    Returns the number of rows written.
+    """
+    import pyarrow.parquet as pq
+
+    store = price_store.open_store()
+    ticker_frames = {}
+    written = 0
+    tmp_path = f"{out_path}.tmp"
+
+    conn = sqlite3.connect(sqlite_path())
+    writer = pq.ParquetWriter(tmp_path, DATASET_SCHEMA)
+    try:
+        for chunk in pd.read_sql(_articles_sql(dedupe), conn,
+                                 parse_dates=PARSE_DATES, chunksize=chunk_size):
+            chunk = hydrate(conn, chunk.dropna(subset=["published_at"]), ("summary",))
+            rows = list(_article_rows(chunk, store, ticker_frames))
+            if rows:
+                writer.write_table(_to_table(pd.DataFrame(rows)))
+                written += len(rows)
+    finally:
+        writer.close()
+        conn.close()
+
+    os.replace(tmp_path, out_path)
+    print(f"Streamed dataset with {written} rows to {out_path}")
+    return written
+
+
 if __name__ == "__main__":
-    df = build_dataset()
-    print(df.head(15))
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build data/dataset.parquet")
+    parser.add_argument("--chunk-size", type=int, default=0,
+                        help="stream articles in chunks of this size (0 = build in memory)")
+    args = parser.parse_args()
+
+    if args.chunk_size:
+        write_dataset(OUT_PATH, chunk_size=args.chunk_size)
+    else:
+        df = build_dataset()
+        print(df.head(15))
 
-    if not df.empty:
-        df.to_parquet("data/dataset.parquet", index=False)
+        if not df.empty:
+            save_dataset(df, OUT_PATH)
         
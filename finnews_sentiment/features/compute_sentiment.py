@@ -1,27 +1,156 @@
+import os
 import sqlite3, pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer    
+import pyarrow as pa
+from datetime import datetime
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from .. import search_text
+from ..archive import hydrate
+from ..db import get_engine, ArticleSentiment, upsert_rows
+from ..etl.dedup_articles import DUPLICATE_FILTER_SQL
+from ..settings import sqlite_path
 
-DB = "data/finnews.db"
 OUT = "data/dataset_with_sentiment.parquet"
 
-def run():
-    conn = sqlite3.connect(DB)
-    df = pd.read_sql(
-        """SELECT id as article_id, title, summary, tickers, published_at
-        FROM articles
-        WHERE tickers != '' AND published_at IS NOT NULL
-        """, conn, parse_dates=["published_at"])
-    conn.close()
-    
+SCHEMA = pa.schema([
+    ("article_id", pa.int64()),
+    ("title", pa.string()),
+    ("summary", pa.string()),
+    ("tickers", pa.string()),
+    ("published_at", pa.timestamp("ns")),
+    ("text", pa.string()),
+    ("sentiment", pa.float64()),
+])
+
+
+# Normalized title + summary from article_search_text (NULL if the row is missing)
+TEXT_JOIN = "LEFT JOIN article_search_text st ON st.article_id = articles.id"
+
+
+def _score(df: pd.DataFrame, analyzer) -> pd.DataFrame:
+    missing = df["search_head"].isna()
+    df["text"] = df.pop("search_head")
+    if missing.any():  # ingested after search_text.refresh()
+        df.loc[missing, "text"] = search_text.normalize_series(
+            df.loc[missing, "title"].fillna("") + " " + df.loc[missing, "summary"].fillna(""))
+    df["sentiment"] = df["text"].apply(lambda t: analyzer.polarity_scores(t)["compound"])
+    return df
+
+
+def _save_scores(df: pd.DataFrame, scored_at: datetime) -> None:
+    """Keep the scores in the DB so daily aggregates can be updated incrementally."""
+    with get_engine().begin() as conn:
+        upsert_rows(conn, ArticleSentiment.__table__,
+                    [{"article_id": int(a), "sentiment": float(s), "scored_at": scored_at}
+                     for a, s in zip(df["article_id"], df["sentiment"])],
+                    ["article_id"])
+
+
+def _iter_chunks(conn, where: str, chunk_size: int):
+    """
+    Keyset-paginate articles in (published_at, id) order. Each page is a
+    separate, fully fetched query, so no read lock is held while scores
+    are written back between pages.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_articles_published_at ON articles (published_at, id)")
+    last = None
+    while True:
+        cond = where if last is None else f"{where} AND (published_at, id) > (?, ?)"
+        params = ([] if last is None else list(last)) + [chunk_size]
+        df = pd.read_sql(
+            f"""SELECT articles.id as article_id, title, summary, tickers, published_at,
+                   st.head AS search_head, published_at AS _key
+            FROM articles {TEXT_JOIN}
+            WHERE {cond}
+            ORDER BY published_at, id
+            LIMIT ?
+            """, conn, params=params, parse_dates={"published_at": {"format": "mixed"}})
+        if df.empty:
+            return
+        last = (df["_key"].iloc[-1], int(df["article_id"].iloc[-1]))
+        yield df.drop(columns="_key")
+        if len(df) < chunk_size:
+            return
+
+
+def score_range(lo: int, hi: int, dedupe: bool = False) -> int:
+    """
+    Score tagged articles with lo <= id <= hi and upsert their scores into
+    article_sentiment (one work-queue unit; rerunning it rewrites the same
+    scores). Returns the number of articles scored.
+    """
+    from sqlalchemy import text
+
+    where = "tickers != '' AND published_at IS NOT NULL AND id BETWEEN :lo AND :hi"
+    if dedupe:
+        where += f" AND {DUPLICATE_FILTER_SQL}"
+    search_text.refresh(id_range=(lo, hi))
+    engine = get_engine()
+    with engine.begin() as conn:
+        ArticleSentiment.__table__.create(conn, checkfirst=True)
+        df = pd.read_sql(text(f"SELECT articles.id AS article_id, title, summary, st.head AS search_head "
+                              f"FROM articles {TEXT_JOIN} WHERE {where}"),
+                         conn, params={"lo": int(lo), "hi": int(hi)})
+        df = hydrate(conn, df, ("summary",), id_col="article_id")
     if df.empty:
-        print("No articles to score.")
+        return 0
+    df = _score(df, SentimentIntensityAnalyzer())
+    _save_scores(df, datetime.utcnow())
+    return len(df)
+
+
+def run(dedupe: bool = False, chunk_size: int | None = None):
+    """
+    Score title+summary of tagged articles with VADER, using the normalized
+    text kept in article_search_text (brought up to date first).
+    With dedupe=True only one representative per near-duplicate cluster is
+    scored (requires `python -m finnews_sentiment.etl.dedup_articles` first).
+    With chunk_size set, articles are read, scored and written as Parquet
+    row groups `chunk_size` at a time, so memory does not grow with the
+    corpus; the output file has the same rows either way.
+    """
+    import pyarrow.parquet as pq
+
+    search_text.refresh()
+    conn = sqlite3.connect(sqlite_path())   # not at import: workers import score_range on any database
+    where = "tickers != '' AND published_at IS NOT NULL"
+    if dedupe:
+        where += f" AND {DUPLICATE_FILTER_SQL}"
+    if chunk_size:
+        chunks = _iter_chunks(conn, where, chunk_size)
+    else:
+        chunks = [pd.read_sql(
+            f"""SELECT articles.id as article_id, title, summary, tickers, published_at,
+                   st.head AS search_head
+            FROM articles {TEXT_JOIN}
+            WHERE {where}
+            ORDER BY published_at, id
+            """, conn, parse_dates={"published_at": {"format": "mixed"}})]
+
+    with get_engine().begin() as db_conn:
+        ArticleSentiment.__table__.create(db_conn, checkfirst=True)
 
     analyzer = SentimentIntensityAnalyzer()
-    df["text"] = (df["title"].fillna("") + " " + df["summary"].fillna("")).str.strip()
-    df["sentiment"] = df["text"].apply(lambda t: analyzer.polarity_scores(t)["compound"])
+    scored_at = datetime.utcnow()
+    total = 0
+    tmp_path = f"{OUT}.tmp"
+    writer = pq.ParquetWriter(tmp_path, SCHEMA)
+    try:
+        for df in chunks:
+            if df.empty:
+                continue
+            df = _score(hydrate(conn, df, ("summary",), id_col="article_id"), analyzer)
+            writer.write_table(pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False))
+            _save_scores(df, scored_at)
+            total += len(df)
+    finally:
+        writer.close()
+        conn.close()
+    os.replace(tmp_path, OUT)
 
-    df.to_parquet(OUT, index=False)
-    print(f"Saved {len(df)} articles with sentiment to {OUT}")
+    if total == 0:
+        print("No articles to score.")
+    print(f"Saved {total} articles with sentiment to {OUT}")
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
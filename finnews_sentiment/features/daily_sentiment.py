@@ -0,0 +1,229 @@
+# finnews_sentiment/features/daily_sentiment.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, text
+
+from ..db import (get_engine, Base, ArticleSentiment, SentimentDailyState,
+                  ArticleTickerSentiment, TickerDailySentiment, upsert_rows)
+
+TABLES = [ArticleSentiment.__table__, SentimentDailyState.__table__,
+          ArticleTickerSentiment.__table__, TickerDailySentiment.__table__]
+
+# Articles whose (tickers, published_at, source, sentiment) differ from the
+# snapshot taken at the last aggregation, or that have no snapshot yet.
+# {same_time} compares the two timestamps (see _changed_sql).
+CHANGED_SQL = """
+SELECT a.id AS article_id, COALESCE(a.tickers, '') AS tickers, a.published_at,
+       COALESCE(a.source, '') AS source, s.sentiment,
+       st.tickers AS old_tickers, st.published_at AS old_published_at
+FROM articles a
+JOIN article_sentiment s ON s.article_id = a.id
+LEFT JOIN sentiment_daily_state st ON st.article_id = a.id
+WHERE a.published_at IS NOT NULL AND (
+      st.article_id IS NULL
+   OR st.tickers != COALESCE(a.tickers, '')
+   OR NOT ({same_time})
+   OR st.source != COALESCE(a.source, '')
+   OR st.sentiment != s.sentiment)
+"""
+
+# Snapshots whose article was deleted, lost its score or its timestamp
+REMOVED_SQL = """
+SELECT st.article_id, NULL AS tickers, NULL AS published_at, NULL AS source, NULL AS sentiment,
+       st.tickers AS old_tickers, st.published_at AS old_published_at
+FROM sentiment_daily_state st
+LEFT JOIN articles a ON a.id = st.article_id
+LEFT JOIN article_sentiment s ON s.article_id = st.article_id
+WHERE a.id IS NULL OR s.article_id IS NULL OR a.published_at IS NULL
+"""
+
+
+# Timestamps written by different tools use different string formats
+PARSE_DATES = {"published_at": {"format": "mixed"}, "old_published_at": {"format": "mixed"}}
+
+
+def _py_datetimes(s: pd.Series) -> pd.Series:
+    """datetime64 column -> python datetimes (what the SQLite DateTime type accepts)."""
+    return s.astype(object).where(s.notna(), None)
+
+
+def _explode(df: pd.DataFrame, tickers_col: str, ts_col: str) -> pd.DataFrame:
+    """(article_id, tickers 'A,B', ts) -> one row per (article_id, ticker, day)."""
+    sub = df.loc[df[tickers_col].notna() & df[ts_col].notna(), ["article_id", tickers_col, ts_col]]
+    out = sub.assign(ticker=sub[tickers_col].str.split(",")).explode("ticker")
+    out["ticker"] = out["ticker"].str.strip()
+    out = out.loc[out["ticker"].fillna("") != ""]
+    out["day"] = pd.to_datetime(out[ts_col]).dt.normalize()
+    return out.drop(columns=[tickers_col, ts_col]).drop_duplicates(["article_id", "ticker"])
+
+
+def _changed_sql(dialect: str) -> str:
+    """
+    CHANGED_SQL for a dialect. SQLite stores timestamps as text and tools
+    write different formats, so both sides go through datetime(); backends
+    with a real timestamp type compare the values directly.
+    """
+    if dialect == "sqlite":
+        return CHANGED_SQL.format(same_time="datetime(st.published_at) = datetime(a.published_at)")
+    return CHANGED_SQL.format(same_time="st.published_at = a.published_at")
+
+
+def _to_temp_table(conn, name: str, df: pd.DataFrame, **types) -> Table:
+    """
+    Stage `df` in a TEMPORARY table (columns `types`: name -> SQL type).
+    Temporary tables belong to the connection, so concurrent updates do not
+    see each other's rows and nothing is left in the schema; the caller
+    drops it when done.
+    """
+    table = Table(name, MetaData(), *(Column(c, t) for c, t in types.items()), prefixes=["TEMPORARY"])
+    table.create(conn)
+    if not df.empty:
+        conn.execute(table.insert(), df[list(types)].to_dict("records"))
+    return table
+
+
+def _recompute_cells(conn, cells: pd.DataFrame) -> int:
+    """Recompute aggregates for the given (ticker, day) cells from article_ticker_sentiment."""
+    if cells.empty:
+        return 0
+    dirty = cells[["ticker", "day"]].drop_duplicates()
+    dirty_table = _to_temp_table(conn, "_dirty_cells", dirty.assign(day=_py_datetimes(dirty["day"])),
+                                 ticker=String(16), day=DateTime())
+
+    members = pd.read_sql(text("""
+        SELECT ats.ticker, ats.day, ats.source, ats.sentiment
+        FROM article_ticker_sentiment ats
+        JOIN _dirty_cells d ON d.ticker = ats.ticker AND d.day = ats.day
+    """), conn, parse_dates=["day"])
+
+    # Cells that lost all their articles disappear
+    conn.execute(text("""
+        DELETE FROM ticker_daily_sentiment
+        WHERE EXISTS (SELECT 1 FROM _dirty_cells d
+                      WHERE d.ticker = ticker_daily_sentiment.ticker
+                        AND d.day = ticker_daily_sentiment.day)
+    """))
+
+    if not members.empty:
+        g = members.groupby(["ticker", "day"], sort=False)
+        agg = g["sentiment"].agg(n_articles="size", sum_sentiment="sum",
+                                 mean_sentiment="mean", median_sentiment="median")
+        agg["n_sources"] = g["source"].nunique()
+        agg["updated_at"] = datetime.utcnow()
+        agg = agg.reset_index()
+        agg["day"] = _py_datetimes(agg["day"])
+        upsert_rows(conn, TickerDailySentiment.__table__,
+                    agg.to_dict("records"), ["ticker", "day"])
+
+    dirty_table.drop(conn)
+    return int(len(dirty))
+
+
+def update(chunk_size: int = 50_000, engine_=None) -> int:
+    """
+    Bring `ticker_daily_sentiment` up to date with `articles` + `article_sentiment`.
+
+    Only articles that are new, re-tagged, re-dated or re-scored since the
+    last run are read; the (ticker, day) cells they used to belong to and
+    now belong to are recomputed, nothing else. Returns the number of cells
+    recomputed.
+    """
+    eng = engine_ or get_engine()
+    Base.metadata.create_all(eng, tables=TABLES)
+
+    recomputed = 0
+    changed_articles = 0
+    with eng.connect() as conn:
+        pending = pd.concat([
+            pd.read_sql(text(_changed_sql(conn.dialect.name)), conn, parse_dates=PARSE_DATES),
+            pd.read_sql(text(REMOVED_SQL), conn, parse_dates=PARSE_DATES),
+        ], ignore_index=True)
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending.iloc[start:start + chunk_size]
+        changed_articles += len(chunk)
+
+        old_cells = _explode(chunk, "old_tickers", "old_published_at")
+        new_rows = _explode(chunk, "tickers", "published_at").merge(
+            chunk[["article_id", "source", "sentiment"]], on="article_id")
+
+        with eng.begin() as conn:
+            changed_ids = _to_temp_table(conn, "_changed_ids", chunk[["article_id"]], article_id=Integer())
+            conn.execute(text("DELETE FROM article_ticker_sentiment "
+                              "WHERE article_id IN (SELECT article_id FROM _changed_ids)"))
+            conn.execute(text("DELETE FROM sentiment_daily_state "
+                              "WHERE article_id IN (SELECT article_id FROM _changed_ids)"))
+            changed_ids.drop(conn)
+
+            if not new_rows.empty:
+                rows = new_rows.assign(day=_py_datetimes(new_rows["day"]))
+                conn.execute(ArticleTickerSentiment.__table__.insert(), rows.to_dict("records"))
+
+            alive = chunk.loc[chunk["published_at"].notna() & chunk["sentiment"].notna()]
+            if not alive.empty:
+                state = alive[["article_id", "tickers", "published_at", "source", "sentiment"]]
+                state = state.assign(published_at=_py_datetimes(state["published_at"]))
+                conn.execute(SentimentDailyState.__table__.insert(), state.to_dict("records"))
+
+            cells = pd.concat([old_cells[["ticker", "day"]], new_rows[["ticker", "day"]]], ignore_index=True)
+            recomputed += _recompute_cells(conn, cells)
+
+    print(f"daily_sentiment: {changed_articles} changed article(s), recomputed {recomputed} (ticker, day) cell(s)")
+    return recomputed
+
+
+def load_signals(days: int = 90, tickers=None, end: datetime | None = None,
+                 windows=(5, 20), halflife_days: float = 3.0, engine_=None) -> pd.DataFrame:
+    """
+    Daily per-ticker signals for the last `days` calendar days (indexed read on day).
+
+    Returns one row per (ticker, day) with the stored cell statistics plus
+    rolling article-weighted means over `windows` days and an exponentially
+    decay-weighted sentiment (half-life `halflife_days`). Rolling features
+    are computed on a day × ticker matrix, so all tickers are handled at once;
+    extra history before the window is read so they are warmed up.
+    """
+    eng = engine_ or get_engine()
+    end = pd.Timestamp(end or datetime.utcnow()).normalize()
+    warmup = max(max(windows, default=0), int(np.ceil(5 * halflife_days)))
+    start = end - pd.Timedelta(days=days - 1)
+    read_from = start - pd.Timedelta(days=warmup)
+
+    sql = ("SELECT ticker, day, n_articles, sum_sentiment, mean_sentiment, median_sentiment, n_sources "
+           "FROM ticker_daily_sentiment WHERE day >= :start AND day <= :end")
+    params = {"start": read_from.to_pydatetime(), "end": end.to_pydatetime()}
+    if tickers:
+        tickers = list(tickers)
+        sql += " AND ticker IN (" + ",".join(f":t{i}" for i in range(len(tickers))) + ")"
+        params.update({f"t{i}": t for i, t in enumerate(tickers)})
+
+    with eng.connect() as conn:
+        cells = pd.read_sql(text(sql), conn, params=params, parse_dates=["day"])
+    if cells.empty:
+        return cells
+
+    calendar = pd.date_range(read_from, end, freq="D", name="day")
+    n = cells.pivot(index="day", columns="ticker", values="n_articles").reindex(calendar).fillna(0.0)
+    s = cells.pivot(index="day", columns="ticker", values="sum_sentiment").reindex(calendar).fillna(0.0)
+
+    features = {}
+    for w in windows:
+        rn = n.rolling(w, min_periods=1).sum()
+        features[f"mean_sentiment_{w}d"] = s.rolling(w, min_periods=1).sum() / rn.where(rn > 0)
+        features[f"n_articles_{w}d"] = rn
+    dn = n.ewm(halflife=halflife_days, adjust=False).mean()
+    ds = s.ewm(halflife=halflife_days, adjust=False).mean()
+    features["decay_sentiment"] = ds / dn.where(dn > 0)
+
+    wide = pd.concat(features, axis=1).loc[start:]
+    long = wide.stack(level=1, future_stack=True).reset_index()
+    long = long.merge(cells, on=["ticker", "day"], how="left")
+    long[["n_articles", "n_sources"]] = long[["n_articles", "n_sources"]].fillna(0).astype(int)
+    long = long[["ticker", "day"] + [c for c in long.columns if c not in ("ticker", "day")]]
+    return long.sort_values(["ticker", "day"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    update()
@@ -0,0 +1,186 @@
+# finnews_sentiment/features/duckdb_backend.py
+import pandas as pd
+
+from ..etl.dedup_articles import DUPLICATE_FILTER_SQL
+from ..settings import sqlite_path
+
+SENT_PATH = "data/dataset_with_sentiment.parquet"
+HORIZONS = (1, 2, 5)
+
+# Same semantics as build_dataset._ret_forward, expressed set-based:
+#   p0 = last close on/before the publication day (ASOF <=)
+#   pN = first close on/after publication day + N calendar days (ASOF >=)
+#   a zero p0 gives NULL returns and NULL pN dates; rows without any return are dropped
+DATASET_SQL = """
+WITH arts AS (
+    SELECT id AS article_id, title, summary, CAST(published_at AS TIMESTAMP) AS published_at,
+           unnest(string_split(COALESCE(tickers, ''), ',')) AS ticker,
+           unnest(range(1, len(string_split(COALESCE(tickers, ''), ',')) + 1)) AS ticker_pos
+    FROM articles
+    WHERE published_at IS NOT NULL {where}
+),
+x AS (
+    SELECT article_id, title, summary, published_at, trim(ticker) AS ticker, ticker_pos,
+           CAST(date_trunc('day', published_at) AS TIMESTAMP) AS pub_date
+    FROM arts
+    WHERE trim(ticker) != ''
+),
+px AS (
+    SELECT ticker, CAST(date AS TIMESTAMP) AS date, close FROM prices
+),
+j AS (
+    SELECT x.*, p0.date AS p0_date, p0.close AS p0
+    FROM x ASOF JOIN px p0 ON x.ticker = p0.ticker AND x.pub_date >= p0.date
+),
+{forward}
+SELECT article_id, ticker, title, summary, published_at, p0_date,
+       {select_cols}
+FROM {last}
+WHERE {any_ret}
+ORDER BY published_at, article_id, ticker_pos
+"""
+
+
+def _dataset_sql(dedupe: bool) -> str:
+    forward = []
+    prev = "j"
+    for n in HORIZONS:
+        forward.append(f"""j{n} AS (
+    SELECT {prev}.*,
+           CASE WHEN {prev}.p0 != 0 THEN p{n}.date END AS p{n}_date,
+           CASE WHEN {prev}.p0 != 0 THEN (p{n}.close - {prev}.p0) / {prev}.p0 END AS ret_{n}d
+    FROM {prev} ASOF LEFT JOIN px p{n}
+      ON {prev}.ticker = p{n}.ticker AND {prev}.pub_date + INTERVAL {n} DAY <= p{n}.date
+)""")
+        prev = f"j{n}"
+    select_cols = ", ".join([f"p{n}_date" for n in HORIZONS] + [f"ret_{n}d" for n in HORIZONS])
+    any_ret = " OR ".join(f"ret_{n}d IS NOT NULL" for n in HORIZONS)
+    return DATASET_SQL.format(
+        where=f"AND {DUPLICATE_FILTER_SQL}" if dedupe else "",
+        forward=",\n".join(forward),
+        select_cols=select_cols,
+        last=prev,
+        any_ret=any_ret,
+    )
+
+
+# Tables/columns the queries need when the sqlite extension is not available
+FALLBACK_TABLES = {
+    "articles": "SELECT id, title, summary, tickers, published_at FROM articles",
+    "prices": "SELECT ticker, date, close FROM prices",
+    "article_minhash": "SELECT article_id, cluster_id FROM article_minhash",
+}
+
+
+def _register_via_sqlite3(con, path: str) -> None:
+    """Load the needed tables through sqlite3 and register them as DuckDB views."""
+    import sqlite3
+
+    src = sqlite3.connect(path)
+    try:
+        existing = {r[0] for r in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, sql in FALLBACK_TABLES.items():
+            if name in existing:
+                con.register(name, pd.read_sql(sql, src))
+    finally:
+        src.close()
+
+
+def connect(db_path: str | None = None, threads: int | None = None):
+    """
+    In-memory DuckDB connection with the SQLite database attached read-only
+    as the default schema. Queries run in parallel over `threads` cores
+    (DuckDB default: all).
+
+    If DuckDB's sqlite extension cannot be installed (e.g. no network), the
+    needed tables are read once through sqlite3 and registered instead.
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    path = db_path or sqlite_path()
+    try:
+        con.execute("LOAD sqlite")
+    except duckdb.Error:
+        try:
+            con.execute("INSTALL sqlite")
+            con.execute("LOAD sqlite")
+        except duckdb.Error as e:
+            print(f"duckdb_backend: sqlite extension unavailable ({type(e).__name__}), loading tables via sqlite3")
+            _register_via_sqlite3(con, path)
+            return con
+    quoted = path.replace("'", "''")
+    con.execute(f"ATTACH '{quoted}' AS src (TYPE sqlite, READ_ONLY)")
+    con.execute("USE src")
+    return con
+
+
+def _result(rel, db_path: str | None, as_arrow: bool):
+    """Query result as pandas/arrow, with archived (emptied) summaries loaded back in."""
+    import sqlite3
+    from ..archive import hydrate
+
+    if as_arrow:
+        table = rel.arrow()
+        import pyarrow.compute as pc
+        if not pc.any(pc.equal(pc.fill_null(table.column("summary"), ""), "")).as_py():
+            return table
+        df = table.to_pandas()
+    else:
+        df = rel.df()
+        if not df["summary"].fillna("").eq("").any():
+            return df
+    src = sqlite3.connect(db_path or sqlite_path())
+    try:
+        df = hydrate(src, df, ("summary",), id_col="article_id")
+    finally:
+        src.close()
+    if as_arrow:
+        import pyarrow as pa
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df
+
+
+def build_dataset(db_path: str | None = None, dedupe: bool = False,
+                  threads: int | None = None, as_arrow: bool = False):
+    """
+    DuckDB equivalent of features.build_dataset.build_dataset: explode tickers,
+    as-of align p0/p1/p2/p5 closes and compute forward returns in one query.
+    Returns a pandas DataFrame (or a pyarrow Table with as_arrow=True).
+    """
+    con = connect(db_path, threads)
+    try:
+        return _result(con.sql(_dataset_sql(dedupe)), db_path, as_arrow)
+    finally:
+        con.close()
+
+
+def build_model_dataset(db_path: str | None = None, sent_path: str = SENT_PATH,
+                        dedupe: bool = False, threads: int | None = None, as_arrow: bool = False):
+    """
+    Returns + sentiment in one pass: the dataset query joined with the
+    sentiment parquet on article_id, keeping rows with sentiment and ret_1d
+    (same rows as scripts/join_sentiment_returns.py).
+    """
+    con = connect(db_path, threads)
+    try:
+        path = str(sent_path).replace("'", "''")
+        rel = con.sql(f"""
+            WITH d AS ({_dataset_sql(dedupe)})
+            SELECT d.*, s.sentiment
+            FROM d JOIN read_parquet('{path}') s USING (article_id)
+            WHERE s.sentiment IS NOT NULL AND d.ret_1d IS NOT NULL
+            ORDER BY d.published_at, d.article_id
+        """)
+        return _result(rel, db_path, as_arrow)
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    df = build_dataset()
+    print(df.head(15))
+    if isinstance(df, pd.DataFrame) and not df.empty:
+        df.to_parquet("data/dataset.parquet", index=False)
@@ -0,0 +1,199 @@
+# finnews_sentiment/features/entity_sentiment.py
+"""
+Per-(article, ticker) sentiment from the sentences that mention the ticker.
+
+Mentions come from the enrichment matcher (article_mentions) as offsets into
+the normalized head (title + summary) in article_search_text, so nothing is
+matched or normalized again here. The title counts as one sentence and the
+summary is split at sentence ends. A ticker's score is the mean VADER
+compound of the distinct sentences holding its mentions. A ticker found only
+in the body gets the score of the whole head (n_windows = 0).
+
+Windows are collected for a whole chunk of articles and every distinct
+window text is scored once, through an LRU cache kept for the run. Sentences
+are disjoint, so the text VADER reads adds up to at most the heads
+themselves, and syndicated copies share their sentences' scores.
+"""
+import os
+import re
+import time
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import text
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from .. import search_text
+from ..db import get_engine, ArticleEntitySentiment, ArticleMention, ArticleSentiment, upsert_frame
+from ..etl.dedup_articles import DUPLICATE_FILTER_SQL
+
+OUT = "data/entity_sentiment.parquet"
+CHUNK_SIZE = 5000
+CACHE_SIZE = 200_000     # distinct window texts kept between chunks
+
+# . ! ? (plus closing quotes/brackets), whitespace, then what can start a sentence
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+
+SCHEMA = pa.schema([
+    ("article_id", pa.int64()),
+    ("ticker", pa.string()),
+    ("published_at", pa.timestamp("ns")),
+    ("source", pa.string()),
+    ("sentiment", pa.float64()),
+    ("n_windows", pa.int64()),
+    ("doc_sentiment", pa.float64()),
+])
+
+
+def sentence_starts(head: str, title_len: int) -> list[int]:
+    """Sorted start offsets of the sentences of a head: the title, then the summary split at sentence ends."""
+    starts = {0}
+    if 0 < title_len < len(head) and head[title_len] == " ":
+        starts.add(title_len + 1)
+    starts.update(m.end() for m in _SENTENCE_END.finditer(head))
+    return sorted(starts)
+
+
+def windows(head: str, title_len: int, mentions: list[tuple[str, int]]) -> dict[str, list[str]]:
+    """{ticker: distinct sentences holding its mentions} for one article; mentions are (ticker, start)."""
+    starts = sentence_starts(head, title_len)
+    ends = starts[1:] + [len(head)]
+    picked: dict[str, set[int]] = {}
+    for ticker, start in mentions:
+        picked.setdefault(ticker, set()).add(bisect_right(starts, start) - 1)
+    return {t: [head[starts[i]:ends[i]].strip() for i in sorted(idx)] for t, idx in picked.items()}
+
+
+def _score_chunk(df: pd.DataFrame, mentions: dict[int, list[tuple[str, int]]], score) -> pd.DataFrame:
+    """One row per (article, tagged ticker); every distinct window of the chunk is scored once."""
+    title_len = search_text.normalize_series(df["title"]).str.len().to_numpy()
+    pairs = []   # (row in df, ticker, window texts, n_windows)
+    for i, (art_id, tickers, head) in enumerate(zip(df["article_id"], df["tickers"], df["head"])):
+        found = windows(head, int(title_len[i]), mentions.get(int(art_id), []))
+        for t in tickers.split(","):
+            texts = found.get(t, [])
+            pairs.append((i, t, texts or [head], len(texts)))
+
+    scores = {w: score(w) for w in dict.fromkeys(w for _, _, texts, _ in pairs for w in texts)}
+    rows = df.iloc[[i for i, _, _, _ in pairs]].reset_index(drop=True)
+    return pd.DataFrame({
+        "article_id": rows["article_id"].astype("int64"),
+        "ticker": [t for _, t, _, _ in pairs],
+        "published_at": rows["published_at"],
+        "source": rows["source"],
+        "sentiment": [sum(scores[w] for w in texts) / len(texts) for _, _, texts, _ in pairs],
+        "n_windows": [n for _, _, _, n in pairs],
+        "doc_sentiment": rows["doc_sentiment"].astype("float64"),
+    })
+
+
+def _load_mentions(conn, lo: int, hi: int) -> tuple[dict[int, list[tuple[str, int]]], set[int]]:
+    """({article_id: [(ticker, start)]} of head mentions, ids with any current span) for lo..hi."""
+    found = conn.execute(text(
+        "SELECT article_id, ticker, field, start FROM article_mentions "
+        "WHERE article_id BETWEEN :lo AND :hi AND version = :v"),
+        {"lo": lo, "hi": hi, "v": search_text.VERSION}).fetchall()
+    head = {}
+    for art_id, ticker, field, start in found:
+        if field == "head":
+            head.setdefault(art_id, []).append((ticker, start))
+    return head, {r[0] for r in found}
+
+
+def run(dedupe: bool = False, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Score every tagged article per ticker, in id-ordered chunks. Each chunk
+    replaces the article_entity_sentiment rows of its id range and becomes
+    a row group of OUT, alongside the document-level score from
+    article_sentiment (NULL if `sentiment` has not run). Articles without
+    spans of the current search-text version (tagged before spans were
+    recorded, or before the normalization changed) are skipped until
+    `finnews enrich` re-matches them. Returns the number of rows.
+    """
+    import pyarrow.parquet as pq
+
+    engine = get_engine()
+    for table in (ArticleMention, ArticleSentiment, ArticleEntitySentiment):
+        table.__table__.create(engine, checkfirst=True)
+    search_text.refresh()
+
+    where = "articles.tickers != '' AND articles.published_at IS NOT NULL"
+    if dedupe:
+        where += f" AND {DUPLICATE_FILTER_SQL}"
+    sql = text(f"""SELECT articles.id AS article_id, articles.title, articles.tickers, articles.published_at,
+                          articles.source, st.head, s.sentiment AS doc_sentiment
+                   FROM articles
+                   JOIN article_search_text st ON st.article_id = articles.id
+                   LEFT JOIN article_sentiment s ON s.article_id = articles.id
+                   WHERE {where} AND articles.id > :last
+                   ORDER BY articles.id
+                   LIMIT :n""")
+
+    analyzer = SentimentIntensityAnalyzer()
+    stats = {"articles": 0, "rows": 0, "unspanned": 0, "head_chars": 0, "windows": 0, "window_chars": 0}
+
+    @lru_cache(maxsize=CACHE_SIZE)
+    def score(window: str) -> float:
+        stats["windows"] += 1
+        stats["window_chars"] += len(window)
+        return analyzer.polarity_scores(window)["compound"]
+
+    t0 = time.perf_counter()
+    scored_at = datetime.utcnow()
+    tmp_path = f"{OUT}.tmp"
+    writer = pq.ParquetWriter(tmp_path, SCHEMA)
+    last = 0
+    try:
+        while True:
+            with engine.begin() as conn:
+                df = pd.read_sql(sql, conn, params={"last": last, "n": chunk_size},
+                                 parse_dates={"published_at": {"format": "mixed"}})
+                if df.empty:
+                    conn.execute(ArticleEntitySentiment.__table__.delete().where(
+                        ArticleEntitySentiment.article_id > last))
+                    break
+                lo, hi = last + 1, int(df["article_id"].iloc[-1])
+                last = hi
+                mentions, spanned = _load_mentions(conn, lo, hi)
+                has_spans = df["article_id"].isin(spanned)
+                stats["unspanned"] += int((~has_spans).sum())
+                df = df[has_spans]
+                out = _score_chunk(df, mentions, score) if not df.empty else pd.DataFrame(columns=SCHEMA.names)
+
+                conn.execute(ArticleEntitySentiment.__table__.delete().where(
+                    ArticleEntitySentiment.article_id.between(lo, hi)))
+                upsert_frame(conn, ArticleEntitySentiment.__table__,
+                             out[["article_id", "ticker", "sentiment", "n_windows"]].assign(scored_at=scored_at),
+                             ["article_id", "ticker"])
+            if not out.empty:
+                writer.write_table(pa.Table.from_pandas(out, schema=SCHEMA, preserve_index=False))
+            stats["articles"] += len(df)
+            stats["head_chars"] += int(df["head"].str.len().sum())
+            stats["rows"] += len(out)
+    finally:
+        writer.close()
+    os.replace(tmp_path, OUT)
+
+    elapsed = time.perf_counter() - t0
+    share = stats["window_chars"] / stats["head_chars"] if stats["head_chars"] else 0.0
+    print(f"entity_sentiment: {stats['rows']} (article, ticker) score(s) from {stats['articles']} article(s) "
+          f"in {elapsed:.1f}s; VADER read {stats['windows']} distinct window(s), "
+          f"{share:.0%} of the heads' text")
+    if stats["unspanned"]:
+        print(f"entity_sentiment: skipped {stats['unspanned']} tagged article(s) without match spans of "
+              f"search-text version {search_text.VERSION}; run `finnews enrich` to record them")
+    print(f"Saved {stats['rows']} rows to {OUT}")
+    return stats["rows"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-ticker sentiment from the sentences mentioning each ticker")
+    parser.add_argument("--dedupe", action="store_true", help="one article per near-duplicate cluster")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    run(dedupe=args.dedupe, chunk_size=args.chunk_size)
@@ -0,0 +1,98 @@
+# finnews_sentiment/features/intraday_dataset.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .. import bar_store
+from ..archive import hydrate
+from ..settings import sqlite_path
+from .build_dataset import PARSE_DATES, _articles_sql
+
+OUT_PATH = "data/dataset_intraday.parquet"
+HORIZONS_MIN = (5, 15, 60)
+# Extra bar history loaded past the longest horizon, so entries after a
+# weekend or holiday still find their exit bars
+SLACK = pd.Timedelta(days=5)
+
+
+def explode_tickers(articles: pd.DataFrame) -> pd.DataFrame:
+    """One row per (article, ticker), in (published_at, id, position in `tickers`) order."""
+    arts = articles.loc[articles["tickers"].fillna("").str.strip() != ""]
+    out = arts.assign(ticker=arts["tickers"].str.split(",")).explode("ticker")
+    out["ticker"] = out["ticker"].str.strip()
+    out = out.loc[out["ticker"].fillna("") != ""]
+    return (out.rename(columns={"id": "article_id"})
+               .drop(columns="tickers")
+               .reset_index(drop=True))
+
+
+def align_articles(rows: pd.DataFrame, freq: str = "1m", horizons_min=HORIZONS_MIN,
+                   price: str = "open") -> pd.DataFrame:
+    """
+    Add next-bar entry and minute-horizon returns to (article, ticker) rows.
+
+    Rows are processed one publication month at a time, loading only that
+    window of bars (plus the longest horizon and SLACK) for the tickers that
+    occur in it, so memory is bounded by about one month of bars.
+    """
+    horizon = pd.Timedelta(minutes=max(horizons_min)) + SLACK
+    parts = []
+    for _, grp in rows.groupby(rows["published_at"].dt.to_period("M"), sort=True):
+        bars = bar_store.load_bars(grp["published_at"].min(), grp["published_at"].max() + horizon,
+                                   tickers=grp["ticker"].unique(), freq=freq, columns=(price,))
+        aligned = bar_store.align_to_bars(grp["ticker"].to_numpy(dtype=object),
+                                          grp["published_at"].to_numpy(dtype="datetime64[ns]"),
+                                          bars, horizons_min, price)
+        aligned.index = grp.index
+        parts.append(grp.join(aligned))
+    if not parts:
+        return rows.iloc[:0]
+    out = pd.concat(parts).sort_index()
+    out["entry_lag_min"] = (out["entry_ts"] - out["published_at"]) / pd.Timedelta(minutes=1)
+    return out
+
+
+def build_intraday_dataset(freq: str = "1m", horizons_min=HORIZONS_MIN, dedupe: bool = False,
+                           price: str = "open") -> pd.DataFrame:
+    """
+    Join tagged articles with intraday forward returns.
+
+    Each (article, ticker) enters at the open of the first bar starting after
+    publication and exits at the open of the first bar h minutes later, so a
+    09:31 and a 15:55 headline on the same day get different entries.
+    Rows without an entry bar (no bars for the ticker/period) are dropped.
+    """
+    conn = sqlite3.connect(sqlite_path())
+    articles = pd.read_sql(_articles_sql(dedupe), conn, parse_dates=PARSE_DATES)
+    articles = hydrate(conn, articles, ("summary",))
+    conn.close()
+    articles = articles.dropna(subset=["published_at"])
+
+    if not bar_store.months(freq):
+        print(f"No {freq} bars in {bar_store.BARS_DIR / freq}; run `finnews import-bars` first")
+        return pd.DataFrame()
+
+    rows = explode_tickers(articles)
+    dataset = align_articles(rows, freq, horizons_min, price)
+    dataset = dataset.loc[dataset["entry_ts"].notna()].reset_index(drop=True) if len(dataset) else dataset
+    cols = (["article_id", "ticker", "title", "summary", "published_at", "entry_ts", "entry_lag_min", "entry_price"]
+            + [c for h in horizons_min for c in (f"exit_ts_{h}m", f"ret_{h}m")])
+    dataset = dataset.reindex(columns=cols)
+    print(f"Built intraday dataset with {len(dataset)} rows "
+          f"({np.isfinite(dataset[f'ret_{horizons_min[0]}m']).sum()} with a {horizons_min[0]}m return)")
+    return dataset
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build data/dataset_intraday.parquet")
+    parser.add_argument("--freq", default="1m")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(HORIZONS_MIN), help="minutes")
+    args = parser.parse_args()
+
+    df = build_intraday_dataset(args.freq, tuple(args.horizons))
+    if not df.empty:
+        df.to_parquet(OUT_PATH, index=False)
+        print(f"Saved {OUT_PATH}")
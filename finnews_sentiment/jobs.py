@@ -0,0 +1,371 @@
+# finnews_sentiment/jobs.py
+"""
+DB-backed work queue so several `finnews worker` processes (on one or more
+hosts sharing DATABASE_URL) can split the ETL stages.
+
+A unit is claimed with a compare-and-swap UPDATE that sets a lease
+(owner + expiry). While the unit runs, a heartbeat thread extends the lease;
+a unit whose lease expired (crashed or stuck worker) can be claimed again.
+Every stage unit is idempotent, so running it twice is safe. A unit is
+not claimed while its batch still has unfinished units of a stage it
+depends on (DEPENDS), so one plan can queue ingest, enrich and sentiment
+together and the id ranges are only read once the articles are in.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from sqlalchemy import bindparam, exists, false, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from .db import get_engine, Job
+
+LEASE_SECONDS = 300
+POLL_SECONDS = 5.0
+
+# Stages in the order a nightly run needs them; lower priority is claimed first
+PRIORITY = {"ingest": 0, "prices": 0, "enrich": 1, "sentiment": 2}
+# Stages whose units (in the same batch) must be done or failed before a stage is claimed
+DEPENDS = {"enrich": ("ingest",), "sentiment": ("ingest", "enrich")}
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _ensure_table(engine) -> None:
+    Job.__table__.create(engine, checkfirst=True)
+    if engine.dialect.name == "sqlite":
+        # WAL lets readers run while a worker commits and makes the many small
+        # claim/complete commits cheap; the setting is stored in the file
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+
+# --- stage units --------------------------------------------------------------
+
+def _run_ingest(payload: dict) -> None:
+    from .db import SessionLocal
+    from .etl.ingest_rss import ingest_feed
+    with SessionLocal() as sess:
+        n = ingest_feed(sess, payload["name"], payload["url"])
+    print(f"  ingest {payload['name']}: {n} new article(s)")
+
+
+def _id_range(payload: dict) -> tuple[int, int]:
+    """(lo, hi) of an id-range unit; the last planned range is open (hi None) and ends at MAX(id) when it runs."""
+    hi = payload["hi"]
+    if hi is None:
+        from .db import Article
+        with get_engine().connect() as conn:
+            hi = conn.execute(select(func.max(Article.id))).scalar() or payload["lo"]
+    return payload["lo"], hi
+
+
+def _run_enrich(payload: dict) -> None:
+    from .etl.enrich_articles import run
+    run(cfg_path=payload.get("config", "configs/tickers.yaml"), id_range=_id_range(payload))
+
+
+def _run_sentiment(payload: dict) -> None:
+    from .features.compute_sentiment import score_range
+    lo, hi = _id_range(payload)
+    n = score_range(lo, hi, dedupe=payload.get("dedupe", False))
+    print(f"  sentiment {lo}-{hi}: scored {n} article(s)")
+
+
+def _run_prices(payload: dict) -> None:
+    from .etl.fetch_prices import run
+    # The price store is rebuilt by whoever opens it next, not by every unit
+    run(lookback_days=payload.get("lookback_days", 365), tickers=payload["tickers"], refresh_store=False)
+
+
+HANDLERS = {
+    "ingest": _run_ingest,
+    "enrich": _run_enrich,
+    "sentiment": _run_sentiment,
+    "prices": _run_prices,
+}
+
+
+# --- planning -----------------------------------------------------------------
+
+def default_batch() -> str:
+    return _utcnow().strftime("%Y-%m-%d")
+
+
+def _id_ranges(engine, size: int) -> list[tuple[int, int | None]]:
+    """
+    Ranges of `size` ids over the current articles. The last one is open
+    (hi None), so articles ingested after planning are still covered.
+    """
+    with engine.connect() as conn:
+        from .db import Article
+        lo, hi = conn.execute(select(func.min(Article.id), func.max(Article.id))).one()
+    if lo is None:
+        return [(1, None)]
+    starts = list(range(lo, hi + 1, size))
+    return [(a, a + size - 1) for a in starts[:-1]] + [(starts[-1], None)]
+
+
+def plan_units(stage: str, size: int | None = None, sources: str = "configs/sources.yaml",
+               tickers_cfg: str = "configs/tickers.yaml", engine=None) -> list[tuple[str, dict]]:
+    """(unit_key, payload) for every unit of `stage`, based on the current config/tables."""
+    engine = engine or get_engine()
+    if stage == "ingest":
+        from .etl.ingest_rss import load_sources
+        return [(src["url"], {"name": src["name"], "url": src["url"]}) for src in load_sources(sources)]
+    if stage in ("enrich", "sentiment"):
+        return [(f"{lo}-{'' if hi is None else hi}", {"lo": lo, "hi": hi})
+                for lo, hi in _id_ranges(engine, size or 2000)]
+    if stage == "prices":
+        from .etl.fetch_prices import load_tickers
+        universe = load_tickers(tickers_cfg).get("universe", []) or []
+        size = size or 20
+        return [(",".join(universe[i:i + size]), {"tickers": universe[i:i + size]})
+                for i in range(0, len(universe), size)]
+    raise ValueError(f"Unknown stage {stage!r}, expected one of {sorted(HANDLERS)}")
+
+
+def enqueue(stage: str, units, batch: str | None = None, priority: int | None = None,
+            max_attempts: int = 3, engine=None) -> int:
+    """
+    Add units (unit_key, payload) to the queue. A unit already queued for the
+    same (batch, stage) is left alone, so planning twice is harmless.
+    Returns the number of new units.
+    """
+    engine = engine or get_engine()
+    _ensure_table(engine)
+    batch = batch or default_batch()
+    priority = PRIORITY.get(stage, 0) if priority is None else priority
+    now = _utcnow()
+    added = 0
+    with engine.begin() as conn:
+        have = set(conn.execute(select(Job.unit_key).where(Job.batch == batch, Job.stage == stage)).scalars())
+        rows = [{"batch": batch, "stage": stage, "unit_key": key, "payload": json.dumps(payload),
+                 "priority": priority, "status": "pending", "attempts": 0, "max_attempts": max_attempts,
+                 "created_at": now}
+                for key, payload in units if key not in have]
+        if rows:
+            conn.execute(Job.__table__.insert(), rows)
+            added = len(rows)
+    return added
+
+
+# --- leasing ------------------------------------------------------------------
+
+def _unfinished(job):
+    """Units that may still run: pending, or leased and either live or with attempts left."""
+    return ((job.status == "pending")
+            | ((job.status == "leased")
+               & ((job.lease_expires_at >= bindparam("now")) | (job.attempts < job.max_attempts))))
+
+
+def _waiting():
+    """
+    Units whose batch still has unfinished units of a stage they depend on.
+    The lookup runs only for stages in DEPENDS and uses the (batch, stage)
+    prefix of uq_job_unit, so other stages claim as cheaply as before.
+    """
+    earlier = aliased(Job)
+    return or_(false(), *[
+        (Job.stage == stage)
+        & exists().where(earlier.batch == Job.batch, earlier.stage.in_(deps), _unfinished(earlier))
+        for stage, deps in DEPENDS.items()])
+
+
+def _claimable(stages, gated: bool = True):
+    cond = ((Job.status == "pending")
+            | ((Job.status == "leased") & (Job.lease_expires_at < bindparam("now"))))
+    cond &= Job.attempts < Job.max_attempts
+    if gated:
+        cond &= ~_waiting()
+    if stages:
+        cond &= Job.stage.in_(list(stages))
+    return cond
+
+
+@lru_cache(maxsize=None)
+def _claim_statements(stages: tuple | None):
+    """
+    (claim, probe, busy) statements for a set of stages. They are built once
+    per worker and take now/owner/until as bind parameters: building the
+    expression per call cost more CPU than the queries themselves.
+    """
+    candidate = (select(Job.id).where(_claimable(stages)).order_by(Job.priority, Job.id)
+                 .limit(1).with_for_update(skip_locked=True).scalar_subquery())
+    claim_stmt = (update(Job).where(Job.id == candidate, _claimable(stages))
+                  .values(status="leased", lease_owner=bindparam("owner"), attempts=Job.attempts + 1,
+                          lease_expires_at=bindparam("until"), heartbeat_at=bindparam("now"))
+                  .returning(*Job.__table__.c))
+    probe = select(Job.id).where(_claimable(stages)).limit(1)
+    busy = select(Job.id).where(_claimable(stages, gated=False), _waiting()).limit(1)
+    return claim_stmt, probe, busy
+
+
+_HEARTBEAT = (update(Job)
+              .where(Job.id == bindparam("job_id"), Job.lease_owner == bindparam("owner"), Job.status == "leased")
+              .values(lease_expires_at=bindparam("until"), heartbeat_at=bindparam("now")))
+_COMPLETE = (update(Job)
+             .where(Job.id == bindparam("job_id"), Job.lease_owner == bindparam("owner"), Job.status == "leased")
+             .values(status="done", finished_at=bindparam("now"), lease_expires_at=None, last_error=None))
+
+
+def claim(owner: str, stages=None, lease_seconds: int = LEASE_SECONDS, engine=None) -> dict | None:
+    """
+    Lease the next claimable unit (pending, or leased with an expired lease).
+
+    Picking and leasing is one UPDATE ... WHERE id = (SELECT ...) RETURNING
+    statement, re-checked against the row it updates, so two workers racing
+    for the same unit cannot both win. On PostgreSQL the inner SELECT uses
+    FOR UPDATE SKIP LOCKED so concurrent workers pick different units; SQLite
+    serializes writers anyway. Returns the job as a dict, or None if nothing
+    is claimable.
+    """
+    engine = engine or get_engine()
+    claim_stmt, probe, _ = _claim_statements(tuple(sorted(stages)) if stages else None)
+    while True:
+        now = _utcnow()
+        params = {"now": now, "owner": owner, "until": now + timedelta(seconds=lease_seconds)}
+        with engine.begin() as conn:
+            row = conn.execute(claim_stmt, params).mappings().first()
+            if row is not None:
+                return dict(row)
+            # Lost a race (PostgreSQL) or the queue is drained
+            if conn.execute(probe, {"now": now}).first() is None:
+                return None
+
+
+def busy(stages=None, engine=None) -> bool:
+    """True while units of `stages` wait for an earlier stage and will become claimable."""
+    engine = engine or get_engine()
+    _, _, stmt = _claim_statements(tuple(sorted(stages)) if stages else None)
+    with engine.connect() as conn:
+        return conn.execute(stmt, {"now": _utcnow()}).first() is not None
+
+
+def heartbeat(job_id: int, owner: str, lease_seconds: int = LEASE_SECONDS, engine=None) -> bool:
+    """Extend the lease. False means the lease was lost (expired and taken over)."""
+    engine = engine or get_engine()
+    now = _utcnow()
+    with engine.begin() as conn:
+        return bool(conn.execute(_HEARTBEAT, {"job_id": job_id, "owner": owner, "now": now,
+                                              "until": now + timedelta(seconds=lease_seconds)}).rowcount)
+
+
+def complete(job_id: int, owner: str, engine=None) -> bool:
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        return bool(conn.execute(_COMPLETE, {"job_id": job_id, "owner": owner, "now": _utcnow()}).rowcount)
+
+
+def fail(job_id: int, owner: str, error: str, engine=None) -> None:
+    """Give the unit back for a retry, or mark it failed once max_attempts is used up."""
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        job = conn.execute(select(Job.attempts, Job.max_attempts).where(Job.id == job_id)).one()
+        status = "failed" if job.attempts >= job.max_attempts else "pending"
+        conn.execute(
+            update(Job).where(Job.id == job_id, Job.lease_owner == owner, Job.status == "leased")
+            .values(status=status, lease_expires_at=None, last_error=error[-4000:],
+                    finished_at=_utcnow() if status == "failed" else None))
+
+
+def reclaim(engine=None) -> int:
+    """
+    Release expired leases explicitly (claim() also takes them over).
+    Units out of attempts are marked failed. Returns the number released.
+    """
+    engine = engine or get_engine()
+    _ensure_table(engine)
+    now = _utcnow()
+    expired = (Job.status == "leased") & (Job.lease_expires_at < now)
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(expired, Job.attempts >= Job.max_attempts)
+                     .values(status="failed", last_error="lease expired", finished_at=now))
+        return conn.execute(update(Job).where(expired).values(status="pending", lease_owner=None,
+                                                              lease_expires_at=None)).rowcount
+
+
+def status(batch: str | None = None, engine=None):
+    """Unit counts per (batch, stage, status) as a DataFrame."""
+    import pandas as pd
+
+    engine = engine or get_engine()
+    _ensure_table(engine)
+    q = select(Job.batch, Job.stage, Job.status, func.count().label("units")).group_by(
+        Job.batch, Job.stage, Job.status).order_by(Job.batch, Job.stage, Job.status)
+    if batch:
+        q = q.where(Job.batch == batch)
+    with engine.connect() as conn:
+        return pd.DataFrame(conn.execute(q).fetchall(), columns=["batch", "stage", "status", "units"])
+
+
+# --- worker -------------------------------------------------------------------
+
+class _Heartbeat(threading.Thread):
+    """Extends the lease every lease/3 seconds until stopped."""
+
+    def __init__(self, job_id: int, owner: str, lease_seconds: int):
+        super().__init__(daemon=True)
+        self.job_id, self.owner, self.lease_seconds = job_id, owner, lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            if not heartbeat(self.job_id, self.owner, self.lease_seconds):
+                return   # lease lost; complete() will notice
+
+
+def work(stages=None, owner: str | None = None, lease_seconds: int = LEASE_SECONDS,
+         poll_seconds: float = POLL_SECONDS, exit_when_empty: bool = False, max_units: int | None = None) -> int:
+    """
+    Claim and run units until stopped (or until the queue is empty with
+    exit_when_empty). A unit that raises is retried by a later claim until
+    its max_attempts is used up. Returns the number of completed units.
+    """
+    owner = owner or worker_id()
+    engine = get_engine()
+    _ensure_table(engine)
+    done = 0
+    print(f"worker {owner}: stages={','.join(stages) if stages else 'all'} lease={lease_seconds}s")
+    while max_units is None or done < max_units:
+        job = claim(owner, stages, lease_seconds, engine)
+        if job is None:
+            # Units waiting on another worker's earlier stage are not "empty"
+            if exit_when_empty and not busy(stages, engine):
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        handler = HANDLERS.get(job["stage"])
+        beat = _Heartbeat(job["id"], owner, lease_seconds)
+        beat.start()
+        t0 = time.perf_counter()
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for stage {job['stage']!r}")
+            handler(json.loads(job["payload"] or "{}"))
+        except Exception as e:
+            beat.stopped.set()
+            fail(job["id"], owner, f"{type(e).__name__}: {e}", engine)
+            print(f"worker {owner}: {job['stage']} {job['unit_key']} failed "
+                  f"(attempt {job['attempts']}/{job['max_attempts']}): {e}")
+            continue
+        beat.stopped.set()
+        if complete(job["id"], owner, engine):
+            done += 1
+            print(f"worker {owner}: {job['stage']} {job['unit_key']} done in {time.perf_counter() - t0:.1f}s")
+        else:
+            # Lease expired and another worker took the unit over; it is idempotent, so no harm done
+            print(f"worker {owner}: lost the lease on {job['stage']} {job['unit_key']}")
+    print(f"worker {owner}: completed {done} unit(s)")
+    return done
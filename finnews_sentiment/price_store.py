@@ -0,0 +1,238 @@
+# finnews_sentiment/price_store.py
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+STORE_DIR = Path("data/price_store")
+META_FILE = "meta.json"
+
+# column -> on-disk dtype; dates are int64 nanoseconds since epoch
+COLUMNS = {
+    "date": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "adj_close": np.float64,
+    "volume": np.int64,
+}
+PRICE_COLUMNS = [c for c in COLUMNS if c != "date"]
+CHUNK_SIZE = 50_000      # rows read from `prices` at a time by refresh()
+
+
+def _get_engine():
+    from .db import get_engine
+    return get_engine()
+
+
+def _epoch_sql(dialect: str) -> str | None:
+    """Seconds since epoch of prices.date as a SQL expression, or None if the dialect is not known."""
+    if dialect == "sqlite":
+        return "CAST(strftime('%s', date) AS INTEGER)"
+    if dialect == "postgresql":
+        return "EXTRACT(EPOCH FROM date)"
+    return None
+
+
+def prices_fingerprint(conn) -> list:
+    """
+    Cheap summary of the `prices` table used to detect changes: row count,
+    max id, date range, and for every stored column (ticker, date and each
+    price column) a plain sum plus an id-weighted sum. Inserts and deletes
+    change the count or the sums; editing any stored value (e.g. a vendor
+    re-import that only fixes adj_close) changes its column's sums, and the
+    weighting catches values that move between rows. The weighted sums are
+    taken in double precision: id * volume or id * epoch seconds overflows
+    SQLite's 64-bit integer SUM after a few hundred thousand rows.
+    """
+    cols = [*PRICE_COLUMNS, "LENGTH(ticker)"]
+    epoch = _epoch_sql(conn.dialect.name)
+    if epoch:
+        cols.append(epoch)
+    sums = ", ".join(f"SUM({c}), SUM(CAST(id AS DOUBLE PRECISION) * {c})" for c in cols)
+    row = conn.execute(text(f"SELECT COUNT(*), MAX(id), MIN(date), MAX(date), {sums} FROM prices")).fetchone()
+    return [None if v is None else (v if isinstance(v, (int, float)) else str(v)) for v in row]
+
+
+def _read_meta(store_dir: Path) -> dict | None:
+    path = store_dir / META_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_fresh(store_dir: Path = STORE_DIR, engine=None) -> bool:
+    """True if the store on disk was built from the current contents of `prices`."""
+    meta = _read_meta(Path(store_dir))
+    if meta is None:
+        return False
+    engine = engine or _get_engine()
+    with engine.connect() as conn:
+        return meta.get("fingerprint") == prices_fingerprint(conn)
+
+
+def _column_array(df: pd.DataFrame, col: str, dtype) -> np.ndarray:
+    if col == "date":
+        return df["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    if dtype is np.int64:
+        return df[col].fillna(0).to_numpy(dtype=np.int64)
+    return df[col].to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def refresh(store_dir: Path = STORE_DIR, engine=None, force: bool = False,
+            chunk_size: int = CHUNK_SIZE) -> bool:
+    """
+    Rebuild the columnar price store from the `prices` table.
+
+    Rows are sorted by (ticker, date) and each column is written as one
+    contiguous .npy array; meta.json holds the per-ticker offsets and the
+    fingerprint of the table the arrays were built from. The table is
+    streamed `chunk_size` rows at a time into arrays preallocated from the
+    fingerprint's row count, so memory does not grow with the table.
+    Returns True if the store was rebuilt, False if it was already fresh.
+    """
+    store_dir = Path(store_dir)
+    engine = engine or _get_engine()
+
+    # Write into a temp dir first so readers never see a half-written store
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+
+    # One transaction, so the count and the streamed rows see the same table
+    with engine.connect() as conn, conn.begin():
+        fingerprint = prices_fingerprint(conn)
+        meta = _read_meta(store_dir)
+        if not force and meta is not None and meta.get("fingerprint") == fingerprint:
+            return False
+
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        n = int(fingerprint[0])
+        arrays = {col: np.lib.format.open_memmap(tmp_dir / f"{col}.npy", mode="w+", dtype=dtype, shape=(n,))
+                  for col, dtype in COLUMNS.items()} if n else {}
+        tickers, offsets, pos = [], [], 0
+        chunks = pd.read_sql(
+            text("SELECT ticker, date, open, high, low, close, adj_close, volume "
+                 "FROM prices ORDER BY ticker, date"),
+            conn.execution_options(stream_results=True),
+            parse_dates=["date"],
+            chunksize=chunk_size,
+        )
+        for df in chunks:
+            if df.empty:
+                continue
+            if pos + len(df) > n:
+                raise RuntimeError("prices changed while the price store was being rebuilt; run it again")
+            for col, dtype in COLUMNS.items():
+                arrays[col][pos:pos + len(df)] = _column_array(df, col, dtype)
+            t = df["ticker"].to_numpy(dtype=object)
+            starts = np.flatnonzero(t[1:] != t[:-1]) + 1
+            if not tickers or t[0] != tickers[-1]:
+                starts = np.concatenate([[0], starts])
+            tickers.extend(str(t[i]) for i in starts)
+            offsets.extend(pos + int(i) for i in starts)
+            pos += len(df)
+    if pos != n:
+        raise RuntimeError("prices changed while the price store was being rebuilt; run it again")
+    for arr in arrays.values():
+        arr.flush()
+    del arrays
+    if not n:
+        for col, dtype in COLUMNS.items():
+            np.save(tmp_dir / f"{col}.npy", np.empty(0, dtype=dtype))
+    offsets.append(n)
+
+    with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint,
+            "tickers": tickers,
+            "offsets": offsets,
+            "rows": n,
+        }, f)
+
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    tmp_dir.rename(store_dir)
+    print(f"price_store: wrote {n} rows for {len(tickers)} tickers to {store_dir}")
+    return True
+
+
+class PriceStore:
+    """
+    Read-only view over the memory-mapped price arrays.
+
+    Arrays are opened with mmap_mode="r", so opening is O(1) and slicing a
+    ticker returns views into the mapped files rather than copies.
+    """
+
+    def __init__(self, store_dir: Path = STORE_DIR):
+        self.store_dir = Path(store_dir)
+        meta = _read_meta(self.store_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No price store at {self.store_dir}")
+        self.fingerprint = meta["fingerprint"]
+        self.tickers = meta["tickers"]
+        self._offsets = meta["offsets"]
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self._arrays: dict[str, np.ndarray] = {}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._index
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole memory-mapped column across all tickers."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.store_dir / f"{name}.npy", mmap_mode="r")
+        return self._arrays[name]
+
+    def span(self, ticker: str) -> tuple[int, int]:
+        """(start, end) row offsets of `ticker`; (0, 0) if unknown."""
+        i = self._index.get(ticker)
+        if i is None:
+            return 0, 0
+        return self._offsets[i], self._offsets[i + 1]
+
+    def arrays(self, ticker: str, columns=("close",)) -> tuple[np.ndarray, dict]:
+        """Return (dates as int64 ns, {column: values}) for one ticker, as mmap views."""
+        start, end = self.span(ticker)
+        dates = self.column("date")[start:end]
+        return dates, {c: self.column(c)[start:end] for c in columns}
+
+    def ticker_frame(self, ticker: str, columns=("close",)) -> pd.DataFrame:
+        """DataFrame indexed by date for one ticker (same shape as a per-ticker SQL read)."""
+        dates, cols = self.arrays(ticker, columns)
+        return pd.DataFrame(cols, index=pd.DatetimeIndex(dates.view("datetime64[ns]"), name="date"))
+
+    def to_frame(self, columns=("close",)) -> pd.DataFrame:
+        """Long frame with ticker/date/<columns>, like `SELECT ticker, date, ... FROM prices`."""
+        counts = np.diff(np.asarray(self._offsets, dtype=np.int64))
+        data = {
+            "ticker": np.repeat(np.asarray(self.tickers, dtype=object), counts),
+            "date": np.asarray(self.column("date")).view("datetime64[ns]"),
+        }
+        for c in columns:
+            data[c] = np.asarray(self.column(c))
+        return pd.DataFrame(data)
+
+
+def open_store(store_dir: Path = STORE_DIR, engine=None, check_fresh: bool = True) -> PriceStore:
+    """
+    Open the price store, rebuilding it first if it is missing or stale.
+    With check_fresh=False the store on disk is opened as-is (no DB query).
+    """
+    store_dir = Path(store_dir)
+    if check_fresh or _read_meta(store_dir) is None:
+        refresh(store_dir, engine=engine)
+    return PriceStore(store_dir)
+
+
+if __name__ == "__main__":
+    refresh(force=True)
@@ -0,0 +1,123 @@
+# finnews_sentiment/search_text.py
+"""
+Normalized article text, computed once in bulk and kept in
+article_search_text for ticker matching (enrich) and scoring (sentiment).
+
+Rules: NFC, curly quotes and en/em dashes to ASCII, runs of any kind of
+whitespace collapsed to one space, stripped. Case is kept (VADER reads
+capitals; the matcher's patterns are case-insensitive). Each row carries
+the VERSION of the rules that produced it. Bump VERSION whenever
+`normalize` changes: `refresh()` then recomputes every older row before
+the next stage reads them. Articles are not edited after ingest, so the
+version is the only thing that can make a row stale.
+"""
+import time
+import unicodedata
+
+import pandas as pd
+from sqlalchemy import text
+
+from .archive import hydrate
+from .db import get_engine, ArticleSearchText, upsert_frame
+
+VERSION = 1
+CHUNK_SIZE = 5000
+
+# Quotes and dashes, as a str.translate table for single strings and as literal
+# replacements for Arrow arrays. Whitespace is anything str.isspace accepts, which is
+# also what Arrow's utf8_split_whitespace splits on, so both paths give identical text.
+_REPLACE = {"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-"}
+_TABLE = str.maketrans(_REPLACE)
+
+_STALE = ("NOT EXISTS (SELECT 1 FROM article_search_text st "
+          "WHERE st.article_id = articles.id AND st.version = :version)")
+
+
+def normalize(s: str | None) -> str:
+    """Normalize one string (see module docstring)."""
+    return " ".join(unicodedata.normalize("NFC", s or "").translate(_TABLE).split())
+
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    """
+    `normalize` over a whole column with Arrow string kernels. The quote and
+    dash replacements go first (they commute with NFC), so NFC only runs on
+    the rows that are still non-ASCII afterwards.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arr = pa.array(s.fillna("").astype("str"))
+    for old, new in _REPLACE.items():
+        arr = pc.replace_substring(arr, old, new)
+    non_ascii = pc.invert(pc.string_is_ascii(arr))
+    if pc.any(non_ascii).as_py():
+        arr = pc.replace_with_mask(arr, non_ascii, pc.utf8_normalize(pc.filter(arr, non_ascii), "NFC"))
+    words = pc.utf8_split_whitespace(pc.utf8_trim_whitespace(arr))
+    arr = pc.binary_join(words, pa.scalar(" ", arr.type))
+    return pd.Series(arr.to_pandas(), index=s.index, dtype="str")
+
+
+def frame(df: pd.DataFrame, id_col: str = "id") -> pd.DataFrame:
+    """article_search_text rows for a frame of articles (title, summary, text)."""
+    return pd.DataFrame({
+        "article_id": df[id_col].astype("int64").to_numpy(),
+        "version": VERSION,
+        "head": normalize_series(df["title"].fillna("") + " " + df["summary"].fillna("")).to_numpy(),
+        "body": normalize_series(df["text"]).to_numpy(),
+    })
+
+
+def refresh(id_range: tuple[int, int] | None = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Compute the rows that are missing or were made by an older VERSION
+    (optionally only for lo <= id <= hi), in id-ordered chunks of one
+    transaction each. Archived bodies are read back from cold storage.
+    Returns the number of rows written.
+    """
+    engine = get_engine()
+    ArticleSearchText.__table__.create(engine, checkfirst=True)
+    where, params = _STALE, {"version": VERSION, "n": int(chunk_size)}
+    if id_range is not None:
+        where += " AND id BETWEEN :lo AND :hi"
+        params.update(lo=int(id_range[0]), hi=int(id_range[1]))
+
+    total, last = 0, 0
+    while True:
+        with engine.begin() as conn:
+            df = pd.read_sql(text(f"SELECT id, title, summary, text FROM articles "
+                                  f"WHERE id > :last AND {where} ORDER BY id LIMIT :n"),
+                             conn, params={**params, "last": last})
+            if df.empty:
+                break
+            last = int(df["id"].iloc[-1])
+            df = hydrate(conn, df, ("summary", "text"))
+            total += upsert_frame(conn, ArticleSearchText.__table__, frame(df), ["article_id"])
+        if len(df) < chunk_size:
+            break
+    return total
+
+
+def run(rebuild: bool = False, chunk_size: int = CHUNK_SIZE) -> int:
+    """Bring article_search_text up to date (rebuild=True recomputes every row)."""
+    if rebuild:
+        engine = get_engine()
+        ArticleSearchText.__table__.create(engine, checkfirst=True)
+        with engine.begin() as conn:
+            conn.execute(ArticleSearchText.__table__.delete())
+    t0 = time.perf_counter()
+    n = refresh(chunk_size=chunk_size)
+    elapsed = time.perf_counter() - t0
+    rate = f" ({n / elapsed:.0f} rows/s)" if n and elapsed > 0 else ""
+    print(f"search_text: normalized {n} article(s) to version {VERSION} in {elapsed:.1f}s{rate}")
+    return n
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute normalized search text for matching and scoring")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every row, not only stale ones")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    run(rebuild=args.rebuild, chunk_size=args.chunk_size)
@@ -10,5 +10,20 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 settings = Settings()
+
+
+def sqlite_path(url: str | None = None) -> str:
+    """Filesystem path of a sqlite:/// DATABASE_URL (for raw sqlite3/DuckDB access)."""
+    url = url or settings.DATABASE_URL
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        raise ValueError(f"Not a SQLite DATABASE_URL: {url}")
+    return url[len(prefix):]
+
 DATA_DIR = Path("data")
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def ensure_data_dir() -> Path:
+    """Create data/ on first use (not at import, so light commands stay side-effect free)."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return DATA_DIR
@@ -0,0 +1,132 @@
+# scripts/benchmark_archive.py
+"""
+Size and scan-speed effect of moving old article bodies to the compressed archive,
+on a synthetic SQLite database.
+
+    python scripts/benchmark_archive.py --articles 200000 --body-words 600 --old-frac 0.8
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"
+WORDS = ("shares rose fell percent quarter earnings revenue guidance analysts market investors "
+         "company stock price growth profit loss outlook billion million said expects sales "
+         "demand supply rates inflation bank fund deal merger acquisition chief executive").split()
+
+# What the stages actually scan: full rows (ORM loads in enrich), the dataset/sentiment
+# builds and the tickers/date lookups of the daily aggregates
+SCANS = {
+    "full rows": "SELECT * FROM articles WHERE tickers = ''",
+    "dataset articles": "SELECT id, title, summary, tickers, published_at FROM articles ORDER BY published_at, id",
+    "ids + tickers": "SELECT id, tickers, published_at FROM articles WHERE tickers != ''",
+}
+
+
+def make_db(path: Path, n: int, body_words: int, old_frac: float, dup_frac: float, seed: int = 0) -> None:
+    from finnews_sentiment.db import Base, get_engine
+
+    Base.metadata.create_all(get_engine())
+    rng = np.random.default_rng(seed)
+    vocab = np.array(WORDS)
+    now = datetime.utcnow()
+    rows = []
+    bodies = []
+    for i in range(n):
+        if bodies and rng.random() < dup_frac:
+            body = bodies[int(rng.integers(0, len(bodies)))]   # syndicated copy
+        else:
+            body = " ".join(vocab[rng.integers(0, len(vocab), body_words)])
+            bodies.append(body)
+            if len(bodies) > 1000:
+                bodies.pop(0)
+        age = rng.uniform(400, 1500) if rng.random() < old_frac else rng.uniform(0, 300)
+        ts = now - timedelta(days=float(age))
+        rows.append(("synthetic", f"https://example.com/{i}", f"Title {i} {vocab[i % len(vocab)]}",
+                     ts.strftime(FMT), "", " ".join(vocab[rng.integers(0, len(vocab), 40)]), body,
+                     "T" + str(i % 300) if i % 3 else ""))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO articles (source, url, title, published_at, author, summary, text, tickers) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def time_scans(path: Path, repeat: int = 5) -> dict:
+    out = {}
+    for name, sql in SCANS.items():
+        best = float("inf")
+        for _ in range(repeat):
+            conn = sqlite3.connect(path)
+            t0 = time.perf_counter()
+            conn.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - t0)
+            conn.close()
+        out[name] = best
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=200_000)
+    parser.add_argument("--body-words", type=int, default=600)
+    parser.add_argument("--old-frac", type=float, default=0.8, help="share of articles older than a year")
+    parser.add_argument("--dup-frac", type=float, default=0.1, help="share of syndicated (identical) bodies")
+    parser.add_argument("--fields", nargs="+", default=["text"])
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_archive_"))
+    db_path = workdir / "finnews.db"
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    t0 = time.perf_counter()
+    make_db(db_path, args.articles, args.body_words, args.old_frac, args.dup_frac)
+    print(f"Synthetic DB: {args.articles} articles ({time.perf_counter() - t0:.1f}s) at {db_path}")
+
+    import pandas as pd
+    from finnews_sentiment import archive
+
+    conn = sqlite3.connect(db_path)
+    sample = pd.read_sql("SELECT id, summary, text FROM articles ORDER BY published_at LIMIT 50", conn)
+    conn.close()
+
+    def check_round_trip(label):
+        conn = sqlite3.connect(db_path)
+        ids = ",".join(str(i) for i in sample["id"])
+        df = pd.read_sql(f"SELECT id, summary, text FROM articles WHERE id IN ({ids}) ORDER BY published_at", conn)
+        df = archive.hydrate(conn, df, archive.FIELDS)
+        conn.close()
+        bad = df["id"][(df["summary"].to_numpy() != sample["summary"].to_numpy())
+                       | (df["text"].to_numpy() != sample["text"].to_numpy())]
+        assert bad.empty, f"articles {list(bad)} differ"
+        print(f"Round trip OK for {len(sample)} archived articles {label}")
+
+    before = time_scans(db_path)
+    stats = archive.run(older_than_days=365, fields=args.fields, vacuum=True)
+    after = time_scans(db_path)
+    check_round_trip(f"({', '.join(args.fields)})")
+
+    print(f"\nDB file: {stats['db_bytes_before'] / 1e6:.1f} MB -> {stats['db_bytes_after'] / 1e6:.1f} MB "
+          f"({1 - stats['db_bytes_after'] / stats['db_bytes_before']:.0%} smaller)")
+    for name in SCANS:
+        print(f"{name:<18} {before[name] * 1000:8.1f} ms -> {after[name] * 1000:8.1f} ms "
+              f"(x{before[name] / max(after[name], 1e-9):.1f})")
+
+    # A rerun over more fields must keep the pointers of values archived the first time
+    archive.run(older_than_days=365, fields=archive.FIELDS)
+    check_round_trip(f"after a rerun with {', '.join(archive.FIELDS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# scripts/benchmark_dedup.py
+"""
+Incremental near-duplicate detection on a synthetic corpus where a share of
+the articles carry the same boilerplate summary, so some LSH buckets grow
+with the corpus. The time per batch should stay flat as the table fills.
+
+    python scripts/benchmark_dedup.py --articles 20000 --boilerplate 0.3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+WORDS = ("alpha beta gamma delta shares rose fell quarter profit loss guidance bank merger deal "
+         "outlook market stock price growth").split()
+BOILERPLATE = ("This content was produced by an automated service. Past performance does not guarantee "
+               "future results. Investors should consult a licensed advisor before making decisions. "
+               "All rights reserved by the publisher.")
+
+
+def synthetic(n: int, boilerplate: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    summaries = [BOILERPLATE if rng.random() < boilerplate else " ".join(rng.choice(words, 40)) for _ in range(n)]
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1), "source": "bench", "url": [f"https://example.com/{i}" for i in range(n)],
+        "title": [" ".join(rng.choice(words, 8)) for _ in range(n)], "published_at": pd.Timestamp("2024-01-01"),
+        "author": "", "summary": summaries, "text": "", "tickers": "",
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--boilerplate", type=float, default=0.3, help="share of articles with the shared summary")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_dedup_"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'finnews.db'}"
+
+    import sqlalchemy as sa
+
+    from finnews_sentiment.db import Article, Base, get_engine, upsert_frame
+    from finnews_sentiment.etl import dedup_articles
+
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        upsert_frame(conn, Article.__table__, synthetic(args.articles, args.boilerplate), ["id"])
+    print(f"Synthetic corpus: {args.articles} articles, {args.boilerplate:.0%} boilerplate summaries")
+
+    times = []
+    for done in range(args.batch, args.articles + 1, args.batch):
+        t0 = time.perf_counter()
+        dedup_articles.run(chunk_size=args.batch, limit=args.batch)
+        times.append(time.perf_counter() - t0)
+        print(f"{done:>8} articles  batch {times[-1]:6.2f} s")
+
+    with engine.connect() as conn:
+        clusters, dupes = conn.execute(sa.text(
+            "SELECT COUNT(DISTINCT cluster_id), SUM(cluster_id != article_id) FROM article_minhash")).one()
+    print(f"{clusters} clusters, {dupes} duplicates; last/first batch time {times[-1] / times[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# scripts/benchmark_duckdb_build.py
+"""
+Parity check + speed comparison of the pandas and DuckDB dataset builds
+on a synthetic SQLite database.
+
+    python scripts/benchmark_duckdb_build.py --articles 20000 --tickers 200 --days 750
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def make_db(path: Path, n_articles: int, n_tickers: int, n_days: int, seed: int = 0) -> None:
+    """Synthetic articles/prices with the awkward cases the builders must agree on."""
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    start = datetime(2022, 1, 3)
+
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE articles (id INTEGER PRIMARY KEY, source VARCHAR(128), url VARCHAR(1024) UNIQUE,
+            title VARCHAR(1024), published_at DATETIME, author VARCHAR(256), summary TEXT, text TEXT,
+            tickers VARCHAR(512));
+        CREATE TABLE prices (id INTEGER PRIMARY KEY, ticker VARCHAR(16), date DATETIME, open FLOAT,
+            high FLOAT, low FLOAT, adj_close FLOAT, volume INTEGER, close FLOAT,
+            UNIQUE (ticker, date));
+    """)
+
+    days = [start + timedelta(days=d) for d in range(n_days)]
+    trading = [d for d in days if d.weekday() < 5]
+    price_rows = []
+    for t in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(trading))))
+        close[rng.random(len(trading)) < 0.001] = 0.0   # occasional zero close
+        for d, c in zip(trading, close):
+            price_rows.append((t, d.strftime(FMT), c, c, c, c, 1000, c))
+    conn.executemany("INSERT INTO prices (ticker, date, open, high, low, adj_close, volume, close) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", price_rows)
+
+    span = (n_days + 10) * 24 * 60   # a few articles land after the last price
+    art_rows = []
+    for i in range(n_articles):
+        k = int(rng.integers(0, 4))
+        picks = list(rng.choice(tickers + ["NOPE"], size=k, replace=True)) if k else []
+        tick = " , ".join(picks) if i % 7 == 0 else ",".join(picks)
+        ts = start - timedelta(days=5) + timedelta(minutes=int(rng.integers(0, span)))
+        art_rows.append(("synthetic", f"https://example.com/{i}", f"title {i}", ts.strftime(FMT),
+                         "", f"summary {i}", "", tick))
+    conn.executemany("INSERT INTO articles (source, url, title, published_at, author, summary, text, tickers) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", art_rows)
+    conn.commit()
+    conn.close()
+
+
+def _normalized(df):
+    import pandas as pd
+    out = df.reset_index(drop=True).copy()
+    for c in ("published_at", "p0_date", "p1_date", "p2_date", "p5_date"):
+        out[c] = pd.to_datetime(out[c]).astype("datetime64[ns]")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_bench_"))
+    db_path = workdir / "finnews.db"
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    t0 = time.perf_counter()
+    make_db(db_path, args.articles, args.tickers, args.days)
+    print(f"Synthetic DB: {args.articles} articles, {args.tickers} tickers, {args.days} days "
+          f"({time.perf_counter() - t0:.1f}s) at {db_path}")
+
+    import pandas as pd
+    from finnews_sentiment.features.build_dataset import build_dataset
+    from finnews_sentiment.features import duckdb_backend
+
+    t0 = time.perf_counter()
+    ref = build_dataset()
+    t_pandas = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = duckdb_backend.build_dataset(str(db_path), threads=args.threads)
+    t_duck = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(_normalized(ref), _normalized(got), check_dtype=False)
+    print(f"Parity OK: {len(ref)} rows identical")
+    print(f"pandas: {t_pandas:.2f}s | duckdb: {t_duck:.2f}s | speedup x{t_pandas / max(t_duck, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# scripts/benchmark_entity_sentiment.py
+"""
+Cost of entity-level sentiment (`finnews entities`) next to document-level
+scoring (`finnews sentiment`) on a synthetic corpus of multi-company
+articles, a share of which are syndicated copies.
+
+    python scripts/benchmark_entity_sentiment.py --articles 20000 --dup-rate 0.2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+COMPANIES = {"AAPL": "Apple", "MSFT": "Microsoft", "TSLA": "Tesla", "NVDA": "Nvidia", "AMZN": "Amazon",
+             "GOOGL": "Alphabet", "META": "Meta Platforms", "JPM": "JPMorgan Chase"}
+GOOD = ("beat estimates and raised its outlook", "posted record revenue", "won a large contract",
+        "shares jumped after strong demand")
+BAD = ("missed estimates and cut guidance", "faces a costly recall", "lost a key lawsuit",
+       "shares slumped on weak demand")
+NEUTRAL = ("Analysts will watch the conference call on Thursday.", "Trading volume was in line with average.",
+           "The company did not comment.")
+
+
+def synthetic_articles(n: int, dup_rate: float, seed: int = 0) -> pd.DataFrame:
+    """Articles naming 1-3 companies with their own good or bad news; dup_rate of them copy an earlier one."""
+    rng = np.random.default_rng(seed)
+    names = list(COMPANIES.values())
+    titles, summaries = [], []
+    for i in range(n):
+        if i and rng.random() < dup_rate:
+            j = int(rng.integers(0, i))
+            titles.append(titles[j])
+            summaries.append(summaries[j])
+            continue
+        picked = rng.choice(names, size=int(rng.integers(1, 4)), replace=False)
+        sentences = [f"{c} {rng.choice(GOOD if rng.random() < 0.5 else BAD)} in Q{rng.integers(1, 5)}, "
+                     f"with sales of ${rng.integers(1, 900)} million in {rng.integers(2, 60)} markets."
+                     for c in picked]
+        sentences.append(str(rng.choice(NEUTRAL)))
+        titles.append(f"{picked[0]} in focus as markets open ({i})")
+        summaries.append(" ".join(sentences))
+    start = datetime(2024, 1, 1)
+    return pd.DataFrame({"id": np.arange(1, n + 1), "source": "bench",
+                         "url": [f"https://example.com/{i}" for i in range(n)], "title": titles,
+                         "published_at": [start + timedelta(minutes=7 * i) for i in range(n)],
+                         "author": "", "summary": summaries, "text": "", "tickers": ""})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=20_000)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_entities_"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'finnews.db'}"
+    (workdir / "configs").mkdir()
+    import yaml
+    with open(workdir / "configs" / "tickers.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump({"universe": list(COMPANIES), "map": COMPANIES, "aliases": {}}, f)
+
+    from finnews_sentiment.db import Article, Base, get_engine, upsert_frame
+    from finnews_sentiment.etl import enrich_articles
+    from finnews_sentiment.features import compute_sentiment, entity_sentiment
+
+    Base.metadata.create_all(get_engine())
+    with get_engine().begin() as conn:
+        upsert_frame(conn, Article.__table__, synthetic_articles(args.articles, args.dup_rate), ["id"])
+
+    def timed(label, fn):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        print(f"  {label:<10} {elapsed:6.2f}s")
+        return elapsed
+
+    print(f"{args.articles} articles, {args.dup_rate:.0%} syndicated copies")
+    timed("enrich", lambda: enrich_articles.run("configs/tickers.yaml"))
+    doc = timed("sentiment", compute_sentiment.run)
+    ent = timed("entities", entity_sentiment.run)
+    print(f"entity-level scoring costs x{ent / doc:.2f} the document-level pass")
+
+    df = pd.read_parquet(entity_sentiment.OUT)
+    multi = df.groupby("article_id")["ticker"].transform("size") > 1
+    spread = df[multi].groupby("article_id")["sentiment"].agg(lambda s: s.max() - s.min())
+    print(f"{multi.sum()} scores on multi-company articles; mean spread between their tickers "
+          f"{spread.mean():.2f} (document-level scoring gives them all the same value)")
+
+
+if __name__ == "__main__":
+    main()
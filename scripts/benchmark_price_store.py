@@ -0,0 +1,103 @@
+# scripts/benchmark_price_store.py
+"""
+Fingerprint and rebuild of the memory-mapped price store on a synthetic
+prices table with realistic volumes (the id-weighted fingerprint sums must
+not overflow), plus a check that an edit to any stored column is noticed.
+
+    python scripts/benchmark_price_store.py --tickers 300 --days 1100
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"
+EDITS = {
+    "open": "open = open + 0.01", "high": "high = high + 0.01", "low": "low = low - 0.01",
+    "close": "close = close + 0.01", "adj_close": "adj_close = adj_close * 1.001",
+    "volume": "volume = volume + 1", "date": "date = datetime(date, '+1 second')",
+}
+
+
+def make_db(path: Path, n_tickers: int, n_days: int, seed: int = 0) -> int:
+    from finnews_sentiment.db import Base, get_engine
+
+    Base.metadata.create_all(get_engine())
+    rng = np.random.default_rng(seed)
+    start = datetime(2021, 1, 4)
+    days = [(start + timedelta(days=d)).strftime(FMT) for d in range(n_days)]
+    rows = []
+    for i in range(n_tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+        volume = rng.integers(10**6, 10**9, n_days)
+        rows.extend((f"T{i:04d}", d, c * 0.99, c * 1.01, c * 0.98, c, c, int(v))
+                    for d, c, v in zip(days, close, volume))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO prices (ticker, date, open, high, low, close, adj_close, volume) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--days", type=int, default=1100)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_price_store_"))
+    db_path = workdir / "finnews.db"
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    n = make_db(db_path, args.tickers, args.days)
+    print(f"Synthetic prices: {n} rows, {args.tickers} tickers at {db_path}")
+
+    from finnews_sentiment import price_store
+    from finnews_sentiment.db import get_engine
+
+    engine = get_engine()
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        price_store.prices_fingerprint(conn)
+    print(f"fingerprint  {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    price_store.refresh(force=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"refresh      {time.perf_counter() - t0:8.2f} s  (peak Python memory {peak / 1e6:.0f} MB, "
+          f"chunks of {price_store.CHUNK_SIZE} rows)")
+
+    store = price_store.PriceStore(price_store.STORE_DIR)
+    conn = sqlite3.connect(db_path)
+    ticker = store.tickers[len(store.tickers) // 2]
+    expect = np.array(conn.execute("SELECT close FROM prices WHERE ticker = ? ORDER BY date", (ticker,)).fetchall())
+    assert len(store) == n and np.array_equal(store.arrays(ticker)[1]["close"], expect[:, 0]), "store differs"
+    print(f"Store matches the table ({len(store)} rows)")
+
+    # Every stored column: one edited value makes the store stale
+    for col, change in EDITS.items():
+        assert price_store.is_fresh(engine=engine), "store stale before the edit"
+        conn.execute(f"UPDATE prices SET {change} WHERE id = ?", (n // 2,))
+        conn.commit()
+        assert not price_store.is_fresh(engine=engine), f"edit to {col} not detected"
+        price_store.refresh()
+    conn.close()
+    print(f"Edits detected for {', '.join(EDITS)}")
+
+
+if __name__ == "__main__":
+    main()
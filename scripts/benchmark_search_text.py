@@ -0,0 +1,99 @@
+# scripts/benchmark_search_text.py
+"""
+Normalization throughput: the old per-article `_normalize_text` (NFC, six
+str.replace, lower, re.sub) against `search_text.normalize_series` over a
+whole column, and enrich/sentiment passes before and after the text is
+stored in article_search_text.
+
+    python scripts/benchmark_search_text.py --articles 50000
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+WORDS = ("Apple", "shares", "rose", "after", "Microsoft’s", "earnings", "beat", "—", "analysts", "said",
+         "“strong”", "demand", "Tesla", "fell", "–", "guidance", "cut", "Nvidia", "chips", " ", "don’t",
+         "expect", "a", "rebound", "Amazon", "cloud", "growth", "Société\u0301", "Nestle\u0301", "\xa0",
+         "\t\n", "\u2028", "\u3000", "Alphabet")
+
+
+def _old_normalize(s: str) -> str:
+    """enrich_articles._normalize_text before the search_text module."""
+    s = s or ""
+    s = unicodedata.normalize("NFC", s)
+    s = s.replace("’", "'").replace("‘", "'").replace("”", '"').replace("“", '"')
+    s = s.replace("–", "-").replace("—", "-")
+    s = s.lower()
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def synthetic_articles(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+
+    def texts(lo, hi):
+        return [" ".join(words[rng.integers(0, len(words), rng.integers(lo, hi))]) for _ in range(n)]
+
+    return pd.DataFrame({"id": np.arange(1, n + 1), "title": texts(6, 14), "summary": texts(30, 80),
+                         "text": texts(0, 1)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=50_000)
+    args = parser.parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_search_text_"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'finnews.db'}"
+
+    from finnews_sentiment import search_text
+    from finnews_sentiment.etl.enrich_articles import _normalize_text
+
+    df = synthetic_articles(args.articles)
+    raw = df["title"] + " " + df["summary"]
+
+    t0 = time.perf_counter()
+    old = [_old_normalize(s) for s in raw]
+    t_old = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    new = search_text.normalize_series(raw)
+    t_new = time.perf_counter() - t0
+
+    assert [s.lower() for s in new] == old, "vectorized normalization differs from the old rules"
+    assert all(_normalize_text(s) == o for s, o in zip(raw[:1000], old[:1000]))
+    assert all(search_text.normalize(s) == v for s, v in zip(raw[:1000], new[:1000]))
+    print("Parity with the old per-article normalization: OK")
+    print(f"{args.articles} articles: per-article {t_old:.2f}s ({args.articles / t_old:,.0f}/s), "
+          f"column {t_new:.2f}s ({args.articles / t_new:,.0f}/s), x{t_old / t_new:.1f}")
+
+    # Stored text: computed once, then read back by every later pass
+    from finnews_sentiment.db import Base, get_engine, upsert_frame, Article
+    from datetime import datetime
+
+    Base.metadata.create_all(get_engine())
+    rows = df.assign(source="bench", url="https://example.com/" + df["id"].astype(str), author="",
+                     tickers="", published_at=datetime(2024, 1, 1))
+    with get_engine().begin() as conn:
+        upsert_frame(conn, Article.__table__, rows, ["id"])
+    t0 = time.perf_counter()
+    n = search_text.refresh()
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    search_text.refresh()
+    t_again = time.perf_counter() - t0
+    print(f"refresh: {n} rows in {t_first:.2f}s, up-to-date check {t_again * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# scripts/benchmark_workers.py
+"""
+Throughput of N queue workers on a fresh SQLite database. Each unit sleeps
+for --unit-ms (standing in for a feed download or a price request), so the
+numbers show how well claiming/leasing scales, not how fast a stage is.
+
+    python scripts/benchmark_workers.py --units 400 --unit-ms 50 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _sleep_unit(payload: dict) -> None:
+    time.sleep(payload["ms"] / 1000)
+
+
+def _worker(n: int) -> None:
+    import contextlib
+    import io
+
+    from finnews_sentiment import jobs
+
+    jobs.HANDLERS["sleep"] = _sleep_unit
+    with contextlib.redirect_stdout(io.StringIO()):
+        jobs.work(stages=["sleep"], owner=f"bench-{n}", lease_seconds=60, exit_when_empty=True)
+
+
+def run_once(n_workers: int, units: int, unit_ms: int) -> tuple[float, float]:
+    """
+    (wall seconds, drain seconds) for n_workers processes to work off `units`
+    sleep units. Drain time runs from the first claim to the last completion,
+    leaving out interpreter start-up.
+    """
+    from sqlalchemy import func, select
+
+    from finnews_sentiment import jobs
+    from finnews_sentiment.db import Job, get_engine
+
+    batch = f"bench-{n_workers}"
+    jobs.enqueue("sleep", [(str(i), {"ms": unit_ms}) for i in range(units)], batch=batch)
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_worker, args=(i,)) for i in range(n_workers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    with get_engine().connect() as conn:
+        done, first, last = conn.execute(
+            select(func.count(), func.min(Job.heartbeat_at), func.max(Job.finished_at))
+            .where(Job.batch == batch, Job.status == "done")).one()
+    if done != units:
+        raise RuntimeError(f"{n_workers} worker(s) completed {done} of {units} units")
+    return elapsed, (last - first).total_seconds()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--units", type=int, default=400)
+    parser.add_argument("--unit-ms", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_workers_"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'finnews.db'}"
+
+    ideal = args.units * args.unit_ms / 1000
+    base = None
+    print(f"{args.units} units of {args.unit_ms} ms ({ideal:.1f}s of work), {os.cpu_count()} CPU(s)")
+    for n in args.workers:
+        elapsed, drain = run_once(n, args.units, args.unit_ms)
+        rate = args.units / drain
+        base = base or rate / n
+        print(f"{n:>3} worker(s): wall {elapsed:6.2f}s  drain {drain:6.2f}s  {rate:7.1f} units/s  "
+              f"speedup x{rate / base:.1f} (efficiency {rate / (base * n):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/check_report_cache.py
+"""
+Figure-cache check for the sentiment report on synthetic data.
+
+The overall bar chart's bootstrap CI is drawn together with the per-ticker
+groups, so switching --per-ticker on or off changes it even though the
+overall rows do not. The check renders the report, then changes only the
+per-ticker input, and fails if an overall figure whose drawn values changed
+is reported "unchanged" (or if an untouched one is re-rendered).
+
+    python scripts/check_report_cache.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def synthetic(n: int, n_tickers: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    sentiment = rng.uniform(-1, 1, n)
+    sentiment[rng.random(n) < 0.2] = 0.0
+    df = pd.DataFrame({"ticker": rng.choice([f"T{i}" for i in range(n_tickers)], n), "sentiment": sentiment})
+    for k, col in enumerate(("ret_1d", "ret_2d", "ret_5d"), 1):
+        df[col] = 0.002 * k * sentiment + rng.normal(0, 0.01 * k, n)
+    return df
+
+
+def mtimes(fig_dir: Path) -> dict:
+    return {str(p.relative_to(fig_dir)): p.stat().st_mtime_ns for p in fig_dir.rglob("*.png")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--tickers", type=int, default=4)
+    args = parser.parse_args()
+    os.chdir(tempfile.mkdtemp(prefix="finnews_report_"))
+
+    from finnews_sentiment.analysis.sentiment_report import build_report
+
+    fig_dir = Path("figures")
+    df = synthetic(args.rows, args.tickers)
+    overall = ["means_ret_1d_by_label.png", "scatter_sent_ret_1d.png", "box_ret_1d_by_label.png"]
+
+    def run(frame, per_ticker):
+        before = mtimes(fig_dir) if fig_dir.exists() else {}
+        stats = build_report(frame.copy(), fig_dir, per_ticker=per_ticker, workers=1)
+        after = mtimes(fig_dir)
+        ci = stats[(stats["ticker"] == "__all__") & (stats["ret_col"] == "ret_1d")][["ci_low", "ci_high"]]
+        return {p for p, t in after.items() if before.get(p) != t}, ci.to_numpy()
+
+    failures = []
+    _, ci = run(df, per_ticker=False)
+    steps = [("--per-ticker switched on", True), ("same input again", True),
+             ("--per-ticker switched off", False), ("same input again", False)]
+    for label, per_ticker in steps:
+        rendered, new_ci = run(df, per_ticker)
+        ci_changed = not np.array_equal(ci, new_ci, equal_nan=True)
+        ci = new_ci
+        expect = {"means_ret_1d_by_label.png"} if ci_changed else set()
+        got = rendered & set(overall)
+        status = "OK" if got == expect else "FAIL"
+        if got != expect:
+            failures.append(label)
+        print(f"{status:<4} {label:<28} overall CI changed: {str(ci_changed):<5} "
+              f"overall figures re-rendered: {sorted(got) or 'none'}")
+
+    if failures:
+        sys.exit(f"Stale or needlessly re-rendered figures after: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
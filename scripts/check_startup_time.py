@@ -0,0 +1,83 @@
+# scripts/check_startup_time.py
+"""
+Startup-time check for the `finnews` CLI using `python -X importtime`.
+
+Runs `--help` for the CLI and for every subcommand in a fresh interpreter,
+sums the import time of everything finnews_sentiment pulls in and fails if
+it exceeds the budget or if a heavy library is imported at all.
+
+    python scripts/check_startup_time.py --budget-ms 150
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Libraries that must only be imported inside the subcommand that needs them
+HEAVY = ("pandas", "numpy", "pyarrow", "sqlalchemy", "pydantic", "pydantic_settings", "torch",
+         "transformers", "matplotlib", "sklearn", "yfinance", "duckdb", "vaderSentiment",
+         "newspaper", "feedparser", "spacy", "nltk")
+
+COMMANDS = [[], ["ingest"], ["enrich"], ["search-text"], ["dedup"], ["archive"], ["prices"], ["import-prices"], ["import-bars"],
+            ["price-store"], ["dataset"], ["intraday"], ["sentiment"], ["entities"], ["daily"], ["join"], ["report"],
+            ["evaluate"], ["init-db"], ["worker"], ["jobs"], ["backtest"]]
+
+# import time: self [us] | cumulative | imported package
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _parse(stderr: str) -> tuple[int, list[str]]:
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            total += int(m.group(1))
+            modules.append(m.group(4))
+    return total, modules
+
+
+def import_profile(argv: list[str]) -> tuple[int, list[str]]:
+    """(summed import self-time in us, imported modules) of `python -m finnews_sentiment.cli <argv>`."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "finnews_sentiment.cli", *argv],
+                          capture_output=True, text=True, env=env, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"finnews {' '.join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+    return _parse(proc.stderr)
+
+
+def baseline_profile() -> int:
+    """Import time of a bare interpreter (site, encodings, ...), subtracted from every measurement."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+    return _parse(proc.stderr)[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check `finnews` CLI startup time")
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="max import time per command on top of a bare interpreter (default: 150)")
+    args = parser.parse_args()
+
+    baseline = baseline_profile()
+    failed = False
+    for cmd in COMMANDS:
+        argv = [*cmd, "--help"]
+        total, modules = import_profile(argv)
+        ms = max(total - baseline, 0) / 1000
+        heavy = sorted({m.split(".")[0] for m in modules} & set(HEAVY))
+        ok = ms <= args.budget_ms and not heavy
+        failed |= not ok
+        extra = f"  heavy imports: {', '.join(heavy)}" if heavy else ""
+        print(f"{'OK  ' if ok else 'FAIL'} finnews {' '.join(argv):<24} {ms:7.1f} ms{extra}")
+
+    print(f"Budget: {args.budget_ms:.0f} ms per command")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
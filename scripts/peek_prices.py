@@ -1,11 +1,10 @@
-import sqlite3
-import pandas as pd
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect("data/finnews.db")
-df = pd.read_sql(
-    "SELECT * FROM prices WHERE ticker='TSLA' ORDER BY date DESC LIMIT 5",
-    conn,
-    parse_dates=["date"]
-)
-print(df)
-conn.close()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from finnews_sentiment.price_store import open_store
+
+store = open_store()
+df = store.ticker_frame("TSLA", columns=("open", "high", "low", "close", "adj_close", "volume"))
+print(df.sort_index(ascending=False).head(5))
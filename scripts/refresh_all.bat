@@ -13,6 +13,9 @@ REM ==== Step 2: Enrich articles with tickers ====
 echo Enriching articles...
 python -m finnews_sentiment.etl.enrich_articles
 
+echo Detecting near-duplicate articles...
+python -m finnews_sentiment.etl.dedup_articles
+
 REM ==== Step 3: Fetch latest prices ====
 echo Fetching latest prices...
 python -m finnews_sentiment.etl.fetch_prices
@@ -24,6 +27,9 @@ python -m finnews_sentiment.features.build_dataset
 echo  Compute sentiment...
 python -m finnews_sentiment.features.compute_sentiment
 
+echo  Update daily per-ticker sentiment...
+python -m finnews_sentiment.features.daily_sentiment
+
 echo  Join sentiment + returns...
 python scripts\join_sentiment_returns.py
 
@@ -0,0 +1,343 @@
+# scripts/soak_test.py
+"""
+End-to-end soak test: ingest -> enrich -> prices -> dataset -> sentiment,
+repeated for a fixed duration against local stand-ins for the RSS feeds
+and the price provider.
+
+    python scripts/soak_test.py --duration 600 --feeds 2000 --items 20 --churn 0.1 --dup-rate 0.05
+
+A ThreadingHTTPServer on 127.0.0.1 serves
+    /feed/<f>.xml              RSS feed f; each fetch replaces a `churn` share of its items
+    /prices/<TICKER>.csv       daily OHLCV (deterministic random walk), fetched through
+                               fetch_prices' `download` hook instead of Yahoo
+A `dup-rate` share of items re-post a story of another feed under the same URL,
+which ingest has to skip. Everything runs in a temporary directory with its own
+SQLite DB. Per cycle the harness prints stage times, rows, DB size and RSS and
+appends them to soak_metrics.csv; at the end it reports throughput and stage
+latency percentiles.
+"""
+import argparse
+import contextlib
+import csv
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+STAGES = ("ingest", "enrich", "prices", "dataset", "sentiment")
+SYLLABLES = "ka lo mi ne ra so tu va be di fo gu ha ji ku le mo ni pa re si to ve xa yo ze".split()
+SUFFIXES = ("Corp", "Holdings", "Group", "Systems", "Industries", "Labs")
+GOOD = ("soars", "beats estimates", "raises guidance", "wins record contract", "rallies", "upgraded")
+BAD = ("plunges", "misses estimates", "cuts guidance", "faces lawsuit", "slumps", "downgraded")
+FILLER = ("analysts said the quarter showed demand across regions while costs stayed in line "
+          "with expectations and management repeated its outlook for the year").split()
+HISTORY_START = np.datetime64("2015-01-01")
+
+
+# --- synthetic world ----------------------------------------------------------
+
+class World:
+    """Deterministic feeds and prices; only the per-feed fetch counters change."""
+
+    def __init__(self, n_feeds: int, items: int, churn: float, dup_rate: float, n_tickers: int,
+                 backfill_days: int, seed: int = 0):
+        self.n_feeds, self.items, self.dup_rate = n_feeds, items, dup_rate
+        self.step = int(round(churn * items))
+        self.backfill = backfill_days * 86400
+        self.seed = seed
+        self.now = datetime.now(timezone.utc)
+        self.fetches = [0] * n_feeds
+        self.lock = threading.Lock()
+        self.companies = self._companies(n_tickers)
+        self.series = {}
+
+    def _companies(self, n: int) -> list[tuple[str, str]]:
+        rng = np.random.default_rng(self.seed)
+        names, tickers = set(), set()
+        out = []
+        while len(out) < n:
+            word = "".join(rng.choice(SYLLABLES, 3)).capitalize()
+            name = f"{word} {SUFFIXES[len(out) % len(SUFFIXES)]}"
+            symbol = word[:4].upper()
+            if word in names or symbol in tickers:
+                continue
+            names.add(word)
+            tickers.add(symbol)
+            out.append((symbol, name))
+        return out
+
+    def _rng(self, *key) -> np.random.Generator:
+        return np.random.default_rng([self.seed, *key])
+
+    def item(self, feed: int, seq: int) -> dict:
+        rng = self._rng(feed, seq, 3)
+        if self.n_feeds > 1 and rng.random() < self.dup_rate:
+            # Re-post of another feed's story: same URL, so ingest must skip it
+            other = int(rng.integers(0, self.n_feeds - 1))
+            return self._story(other + (other >= feed), seq)
+        return self._story(feed, seq)
+
+    def _story(self, feed: int, seq: int) -> dict:
+        rng = self._rng(feed, seq)
+        _, name = self.companies[int(rng.integers(0, len(self.companies)))]
+        words = GOOD if rng.random() < 0.5 else BAD
+        mention = name.split()[0] if rng.random() < 0.5 else name
+        title = f"{mention} {words[int(rng.integers(0, len(words)))]}" if rng.random() < 0.8 \
+            else f"Markets {words[int(rng.integers(0, len(words)))]} as rates move"
+        summary = " ".join(rng.choice(FILLER, 25))
+        age = float(rng.uniform(0, self.backfill))
+        return {"url": f"/article/{feed}/{seq}.html", "title": title, "summary": summary,
+                "published": self.now - timedelta(seconds=age)}
+
+    def feed_xml(self, feed: int, base: str) -> str:
+        with self.lock:
+            k = self.fetches[feed]
+            self.fetches[feed] += 1
+        first = k * self.step
+        entries = []
+        for seq in range(first, first + self.items):
+            it = self.item(feed, seq)
+            entries.append(
+                f"<item><title>{escape(it['title'])}</title><link>{base}{it['url']}</link>"
+                f"<description>{escape(it['summary'])}</description>"
+                f"<pubDate>{format_datetime(it['published'])}</pubDate></item>")
+        return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                f"<title>Synthetic feed {feed}</title><link>{base}/</link>"
+                f"<description>soak test</description>{''.join(entries)}</channel></rss>")
+
+    def prices_csv(self, symbol: str, start: str, end: str) -> str:
+        dates, px = self._series(symbol)
+        lo, hi = np.searchsorted(dates, np.datetime64(start)), np.searchsorted(dates, np.datetime64(end))
+        rng = self._rng(zlib.crc32(symbol.encode()), 2)
+        rows = ["Date,Open,High,Low,Close,Adj Close,Volume"]
+        for d, c in zip(dates[lo:hi], px[lo:hi]):
+            o = c * (1 + rng.normal(0, 0.005))
+            rows.append(f"{d},{o:.4f},{max(o, c) * 1.005:.4f},{min(o, c) * 0.995:.4f},{c:.4f},{c:.4f},"
+                        f"{int(rng.integers(100_000, 5_000_000))}")
+        return "\n".join(rows) + "\n"
+
+    def _series(self, symbol: str):
+        if symbol not in self.series:
+            dates = np.arange(HISTORY_START, np.datetime64(self.now.date()) + 1, dtype="datetime64[D]")
+            dates = dates[np.is_busday(dates)]
+            rng = self._rng(zlib.crc32(symbol.encode()))
+            px = 50 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, len(dates))))
+            self.series[symbol] = (dates, px)
+        return self.series[symbol]
+
+
+def serve(world: World) -> tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in server on an ephemeral port; returns (server, base URL)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            try:
+                if parts[0] == "feed":
+                    body, ctype = world.feed_xml(int(parts[1].split(".")[0]), base), "application/rss+xml"
+                elif parts[0] == "prices":
+                    q = parse_qs(url.query)
+                    body = world.prices_csv(parts[1].split(".")[0], q["start"][0], q["end"][0])
+                    ctype = "text/csv"
+                else:
+                    self.send_error(404)
+                    return
+            except (IndexError, ValueError, KeyError):
+                self.send_error(400)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base
+
+
+def local_downloader(base: str):
+    """fetch_prices `download` hook reading the stand-in's CSV instead of Yahoo."""
+    import pandas as pd
+
+    def download(ticker, start, end):
+        url = f"{base}/prices/{ticker}.csv?start={start:%Y-%m-%d}&end={end:%Y-%m-%d}"
+        with urlopen(url) as resp:
+            return pd.read_csv(resp, index_col="Date", parse_dates=["Date"])
+    return download
+
+
+def write_configs(world: World, base: str) -> tuple[str, str]:
+    import yaml
+
+    Path("configs").mkdir(exist_ok=True)
+    sources = {"rss": [{"name": f"feed{f}", "url": f"{base}/feed/{f}.xml"} for f in range(world.n_feeds)]}
+    tickers = {"universe": [s for s, _ in world.companies],
+               "map": {s: n for s, n in world.companies},
+               "aliases": {s: [n.split()[0], s] for s, n in world.companies}}
+    with open("configs/sources.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(sources, f)
+    with open("configs/tickers.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(tickers, f)
+    return "configs/sources.yaml", "configs/tickers.yaml"
+
+
+# --- measurements -------------------------------------------------------------
+
+def rss_mb() -> float:
+    """Current resident set size (peak on platforms without /proc)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def counts(db_path: Path) -> dict:
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    q = lambda sql: conn.execute(sql).fetchone()[0]   # noqa: E731
+    out = {"articles": q("SELECT COUNT(*) FROM articles"),
+           "tagged": q("SELECT COUNT(*) FROM articles WHERE tickers != ''"),
+           "prices": q("SELECT COUNT(*) FROM prices"),
+           "scored": q("SELECT COUNT(*) FROM article_sentiment")}
+    conn.close()
+    out["db_mb"] = sum(p.stat().st_size for p in db_path.parent.glob(db_path.name + "*")) / 1e6
+    return out
+
+
+def percentile(values, q) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+# --- main loop ----------------------------------------------------------------
+
+def run_cycle(cfg: dict, log) -> dict:
+    """One pass of the chain; returns seconds per stage and rows per stage."""
+    from finnews_sentiment.etl import enrich_articles, fetch_prices, ingest_rss
+    from finnews_sentiment.features import build_dataset, compute_sentiment
+
+    before = counts(cfg["db_path"])
+    times, rows = {}, {}
+
+    def timed(stage, fn):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            result = fn()
+        times[stage] = time.perf_counter() - t0
+        return result
+
+    timed("ingest", lambda: ingest_rss.run(cfg["sources"], rate_limit_sec=0))
+    after_ingest = counts(cfg["db_path"])
+    rows["ingest"] = after_ingest["articles"] - before["articles"]
+    timed("enrich", lambda: enrich_articles.run(cfg["tickers"]))
+    rows["enrich"] = after_ingest["articles"] - after_ingest["tagged"]   # untagged articles examined
+    rows["prices"] = timed("prices", lambda: fetch_prices.run(cfg["tickers"], lookback_days=cfg["lookback"],
+                                                              download=cfg["download"]))
+    rows["dataset"] = timed("dataset", lambda: build_dataset.write_dataset(
+        build_dataset.OUT_PATH, chunk_size=cfg["chunk_size"]))
+    timed("sentiment", lambda: compute_sentiment.run(chunk_size=cfg["chunk_size"]))
+    after = counts(cfg["db_path"])
+    rows["sentiment"] = after["tagged"]
+    return {"times": times, "rows": rows, "counts": after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=600, help="seconds; the running cycle is finished")
+    parser.add_argument("--feeds", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=20, help="items per feed")
+    parser.add_argument("--churn", type=float, default=0.1, help="share of a feed's items replaced per fetch")
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="share of items re-posted from another feed")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--backfill-days", type=int, default=180, help="spread of article publication dates")
+    parser.add_argument("--lookback-days", type=int, default=365)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="finnews_soak_"))
+    os.chdir(workdir)
+    db_path = workdir / "data" / "finnews.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    world = World(args.feeds, args.items, args.churn, args.dup_rate, args.tickers, args.backfill_days, args.seed)
+    server, base = serve(world)
+    sources, tickers = write_configs(world, base)
+
+    from finnews_sentiment.db import Base, get_engine
+    Base.metadata.create_all(get_engine())
+
+    cfg = {"db_path": db_path, "sources": sources, "tickers": tickers,
+           "lookback": args.lookback_days, "chunk_size": args.chunk_size, "download": local_downloader(base)}
+    print(f"Soak test in {workdir}: {args.feeds} feeds x {args.items} items, churn {args.churn:.0%}, "
+          f"duplicates {args.dup_rate:.0%}, {args.tickers} tickers, {args.duration:.0f}s")
+    print(f"{'cycle':>5} {'t[s]':>7} " + " ".join(f"{s:>9}" for s in STAGES)
+          + f" {'+articles':>9} {'articles':>9} {'DB MB':>8} {'RSS MB':>8}")
+
+    history = []
+    t_start = time.perf_counter()
+    with open(workdir / "soak.log", "w") as log, open(workdir / "soak_metrics.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cycle", "t_s", *[f"{s}_s" for s in STAGES], *[f"{s}_rows" for s in STAGES],
+                         "articles", "tagged", "prices", "scored", "db_mb", "rss_mb"])
+        cycle = 0
+        while cycle == 0 or time.perf_counter() - t_start < args.duration:
+            cycle += 1
+            res = run_cycle(cfg, log)
+            t, c = time.perf_counter() - t_start, res["counts"]
+            mem = rss_mb()
+            history.append({**res, "t": t, "rss_mb": mem})
+            writer.writerow([cycle, f"{t:.1f}", *[f"{res['times'][s]:.3f}" for s in STAGES],
+                             *[res["rows"][s] for s in STAGES],
+                             c["articles"], c["tagged"], c["prices"], c["scored"], f"{c['db_mb']:.2f}", f"{mem:.1f}"])
+            f.flush()
+            print(f"{cycle:>5} {t:>7.1f} " + " ".join(f"{res['times'][s]:>8.2f}s" for s in STAGES)
+                  + f" {res['rows']['ingest']:>9} {c['articles']:>9} {c['db_mb']:>8.1f} {mem:>8.1f}")
+    server.shutdown()
+
+    elapsed = time.perf_counter() - t_start
+    first, last = history[0], history[-1]
+    print(f"\n{len(history)} cycle(s) in {elapsed:.0f}s; {last['counts']['articles']} articles "
+          f"({last['counts']['articles'] / elapsed:.1f}/s end to end)")
+    print(f"{'stage':<10} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'rows/s':>10}")
+    for s in STAGES:
+        secs = [h["times"][s] for h in history]
+        n_rows = sum(h["rows"][s] for h in history)
+        print(f"{s:<10} {percentile(secs, 50):>8.2f} {percentile(secs, 95):>8.2f} {max(secs):>8.2f} "
+              f"{n_rows / max(sum(secs), 1e-9):>10.0f}")
+    growth = (last["counts"]["db_mb"] - first["counts"]["db_mb"]) / max(last["t"] - first["t"], 1e-9) * 3600
+    print(f"DB: {first['counts']['db_mb']:.1f} MB -> {last['counts']['db_mb']:.1f} MB ({growth:.0f} MB/h after cycle 1)")
+    print(f"RSS: {first['rss_mb']:.0f} MB -> {last['rss_mb']:.0f} MB (max {max(h['rss_mb'] for h in history):.0f} MB)")
+    print(f"Per-cycle metrics: {workdir / 'soak_metrics.csv'}, stage output: {workdir / 'soak.log'}")
+
+
+if __name__ == "__main__":
+    main()
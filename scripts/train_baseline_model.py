@@ -1,27 +1,22 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, roc_auc_score
+import sys
+from pathlib import Path
 
-df = pd.read_parquet("data/dataset_with_sentiment.parquet")
-returns = pd.read_parquet("data/dataset.parquet")
-data = returns.merge(df[["article_id", "sentiment"]], on="article_id", how="inner")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-data = data.dropna(subset=["ret_1d", "sentiment"])
-data["target"] = (data["ret_1d"] > 0).astype(int)  # 1 = positive return
+from finnews_sentiment.analysis.walk_forward import evaluate, summarize
 
-X = data[["sentiment"]]
-y = data["target"]
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+def main():
+    # Walk-forward (expanding window) instead of a random split, which leaks future data
+    results = evaluate(features=["sentiment"], param_grid={"C": [0.1, 1.0, 10.0]}, n_splits=5)
 
-model = LogisticRegression()
-model.fit(X_train, y_train)
+    if results.empty:
+        print("Not enough data for walk-forward evaluation.")
+    else:
+        results.to_csv("data/walk_forward_folds.csv", index=False)
+        print(summarize(results).to_string(index=False))
 
-preds = model.predict(X_test)
-probs = model.predict_proba(X_test)[:, 1]
 
-acc = accuracy_score(y_test, preds)
-auc = roc_auc_score(y_test, probs)
-
-print(f" Accuracy: {acc:.3f} | AUC: {auc:.3f}")
+# Folds run in a process pool; under spawn (Windows, macOS) children re-import this file
+if __name__ == "__main__":
+    main()